@@ -5,25 +5,64 @@ import logging
 import os
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
+from .routing import ReplicaRouter, RoutingSession
+from .snapshot import snapshot_uri, configure_snapshot_engine
+from .json_provider import create_json_provider
+from .admission import configure_statement_timeout
+from .resilience import create_circuit_breaker, watch_engine
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
-def create_website():
+def _mysql_uri(host):
+    return 'mysql+pymysql://' + os.getenv("MYSQL_USER") + \
+        ':' + quote_plus(os.getenv("MYSQL_PASSWORD")) + '@' + host + '/' + os.getenv("MYSQL_DB")
+
+def create_website(use_snapshot=True):
     website = Flask(__name__)
 
     load_dotenv()
 
+    website.json = create_json_provider(website)
+
     website.config["MYSQL_HOST"] = os.getenv("MYSQL_HOST")
     website.config["MYSQL_USER"] = os.getenv("MYSQL_USER")
     website.config["MYSQL_PASSWORD"] = os.getenv("MYSQL_PASSWORD")
     website.config["MYSQL_DB"] = os.getenv("MYSQL_DB")
 
-    website.config["SQLALCHEMY_DATABASE_URI"] = 'mysql+pymysql://' + os.getenv("MYSQL_USER") + \
-        ':' + quote_plus(os.getenv("MYSQL_PASSWORD")) + '@' + os.getenv("MYSQL_HOST") + '/' + os.getenv("MYSQL_DB")
-    
+    # DATABASE_URL / DATABASE_READ_URLS take any SQLAlchemy URL (e.g. SQLite stand-ins);
+    # otherwise the primary and replicas are built from the MYSQL_* settings
+    # SNAPSHOT_PATH serves everything from a read-only SQLite snapshot instead (see snapshot.py)
+    snapshot_path = os.getenv("SNAPSHOT_PATH") if use_snapshot else None
+    website.config["SNAPSHOT_MODE"] = bool(snapshot_path)
+
+    if snapshot_path:
+        website.config["SQLALCHEMY_DATABASE_URI"] = snapshot_uri(snapshot_path)
+        read_uris = []
+    else:
+        website.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL") or _mysql_uri(os.getenv("MYSQL_HOST"))
+
+        read_uris = [uri.strip() for uri in os.getenv("DATABASE_READ_URLS", "").split(',') if uri.strip()]
+        read_uris += [_mysql_uri(host.strip()) for host in os.getenv("MYSQL_READ_HOSTS", "").split(',') if host.strip()]
+    website.config["SQLALCHEMY_READ_URIS"] = read_uris
+
     db.init_app(website)
 
+    if read_uris:
+        website.extensions['replica_router'] = ReplicaRouter(
+            read_uris,
+            health_interval=int(os.getenv("REPLICA_HEALTH_INTERVAL", 30)),
+            engine_options=website.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+        )
+
+    # ETag-validated API responses, kept with their gzip/brotli variants (see response_cache.py)
+    from .response_cache import create_response_store, TrackingRequest
+    website.extensions['response_store'] = create_response_store()
+    website.request_class = TrackingRequest  # records which query arguments each route reads, for cache keys
+
+    from .coalescing import create_lock_backend
+    website.extensions['coalesce_lock'] = create_lock_backend()
+
     # Register API blueprints
     from .api import api_bp
     website.register_blueprint(api_bp)
@@ -31,6 +70,21 @@ def create_website():
     with website.app_context():
        from .models import User, Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords, TeacherQuality, NAEPAssessments, Books
        
-       db.create_all()
+       # Server-side time limit for every SELECT (MySQL only)
+       for engine in [db.engine] + getattr(website.extensions.get('replica_router'), 'engines', []):
+           configure_statement_timeout(engine)
+
+       # Circuit breaker fed by connectivity failures of the primary; replica failures are handled by
+       # ReplicaRouter failing over, and statement timeouts reject single queries rather than signal an outage
+       website.extensions['circuit_breaker'] = create_circuit_breaker()
+       watch_engine(db.engine, website.extensions['circuit_breaker'])
+
+       if snapshot_path:
+           configure_snapshot_engine(db.engine)
+       else:
+           db.create_all()
+           # create_all() never alters existing tables; scripts/build_rollups.py adds columns introduced since the last import
+           from .weighting import check_weight_columns
+           check_weight_columns()
        
        return website
\ No newline at end of file
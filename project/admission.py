@@ -0,0 +1,159 @@
+#This file keeps single expensive requests from degrading the API for everyone else.
+#It rejects oversized limit/offset values, caps how many heavy analytics requests compute at once (queueing a
+#bounded number and shedding the rest), and gives every MySQL SELECT a server-side execution time limit.
+
+"""
+Admission control and query-cost guardrails for the API blueprint
+"""
+
+import logging
+import os
+import threading
+from collections import namedtuple
+from flask import current_app, g, jsonify, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# max_limit: largest ?limit= accepted; max_window: largest offset + limit, i.e. rows the database walks through
+RouteLimit = namedtuple('RouteLimit', 'max_limit max_window')
+
+ROUTE_LIMITS = {
+    'api.get_performance_data': RouteLimit(5000, 5000),
+    'api.get_books': RouteLimit(500, 10000),
+    'api.get_district_rankings': RouteLimit(200, 200),
+    'api.get_authors': RouteLimit(1000, 1000),
+    'api.get_teacher_quality': RouteLimit(500, 5000),
+    'api.get_naep_assessments': RouteLimit(500, 5000),
+    'api.get_cube_slice': RouteLimit(5000, 5000),
+    'api.get_book_recommendations': RouteLimit(100, 100)
+}
+
+# Multi-join aggregates over the fact table, and routes that build a large in-memory index on their first call per
+# dataset version; at most HEAVY_CONCURRENCY of them compute at a time per process. Every route under these paths is
+# gated by default, so a new analytics, map or profile route cannot ship without it; mark heavy routes elsewhere @heavy.
+HEAVY_PATH_PREFIXES = (
+    '/api/analytics/',
+    '/api/map/',
+    '/api/profiles/',
+    '/api/books/recommendations',
+    '/api/filters/facets'
+)
+
+def heavy(view):
+    """Route decorator (below @api_bp.route): send a route outside HEAVY_PATH_PREFIXES through the heavy-request gate"""
+    view.heavy = True
+    return view
+
+def is_heavy():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'heavy', False) or request.path.startswith(HEAVY_PATH_PREFIXES)
+
+class HeavyRequestGate:
+    """A semaphore with a bounded waiting line: requests beyond the line are turned away immediately"""
+
+    def __init__(self, concurrency, queue_size, queue_timeout):
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """Returns 'admitted', 'queue_full' or 'timeout'"""
+        if self._slots.acquire(blocking=False):
+            return 'admitted'
+
+        with self._lock:
+            if self._waiting >= self._queue_size:
+                return 'queue_full'
+            self._waiting += 1
+
+        try:
+            return 'admitted' if self._slots.acquire(timeout=self._queue_timeout) else 'timeout'
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def leave(self):
+        self._slots.release()
+
+_gate = None
+_gate_lock = threading.Lock()
+
+def _get_gate():
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = HeavyRequestGate(
+                int(os.getenv('HEAVY_CONCURRENCY', 4)),
+                int(os.getenv('HEAVY_QUEUE_SIZE', 16)),
+                float(os.getenv('HEAVY_QUEUE_TIMEOUT', 5))
+            )
+        return _gate
+
+def _reject(status, message, reason, retry_after=None):
+    logger.warning("Rejected %s %s with %s (%s) from %s", request.method, request.full_path, status, reason, request.remote_addr)
+    response = jsonify({
+        'success': False,
+        'error': message
+    })
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def check_limits():
+    """Validate limit/offset against the route's caps; returns a 400 response or None"""
+    route_limit = ROUTE_LIMITS.get(request.endpoint)
+    if route_limit is None:
+        return None
+
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', default=0, type=int)
+
+    # SQLite and MySQL read a negative LIMIT as "no limit"
+    if limit is not None and limit < 1:
+        return _reject(400, 'limit must be a positive integer', 'non-positive limit')
+    if offset < 0:
+        return _reject(400, 'offset must not be negative', 'negative offset')
+    if limit is not None and limit > route_limit.max_limit:
+        return _reject(400, f'limit may be at most {route_limit.max_limit}', 'limit over cap')
+    if offset + (limit or 0) > route_limit.max_window:
+        return _reject(400, f'offset + limit may be at most {route_limit.max_window}', 'row window over budget')
+    return None
+
+def admit_request():
+    """before_request hook (after the cache and coalescing hooks): enforce the limits and take a heavy-route slot"""
+    rejected = check_limits()
+    if rejected is not None:
+        return rejected
+
+    if not is_heavy():
+        return None
+
+    outcome = _get_gate().enter()
+    if outcome == 'queue_full':
+        return _reject(429, 'Too many analytics requests in progress, please retry shortly', 'heavy queue full', retry_after=1)
+    if outcome == 'timeout':
+        return _reject(503, 'Analytics requests are backed up, please retry shortly', 'heavy queue timeout', retry_after=5)
+
+    g.heavy_slot = True
+    return None
+
+def release_request(exc=None):
+    """teardown_request hook: give back the heavy-route slot"""
+    if g.pop('heavy_slot', False):
+        _get_gate().leave()
+
+def configure_statement_timeout(engine, timeout_ms=None):
+    """Have MySQL abort any SELECT on this engine that runs longer than DB_STATEMENT_TIMEOUT_MS (0 disables)"""
+    timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 10000)) if timeout_ms is None else timeout_ms
+    if engine.dialect.name != 'mysql' or timeout_ms <= 0:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_max_execution_time(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET SESSION max_execution_time = {int(timeout_ms)}')
+        cursor.close()
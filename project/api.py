@@ -5,30 +5,80 @@
 API endpoints for Mississippi Literacy Database
 """
 
-from flask import Blueprint, jsonify, request
-from sqlalchemy import func, or_
-from .models import Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords, TeacherQuality, NAEPAssessments, Books
+from itertools import groupby
+import numpy as np
+import pandas as pd
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import case, func, or_
+from .models import Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords, TeacherQuality, NAEPAssessments, Books, PerformanceRollups
+from .routing import route_reads_to_replica
+from .response_cache import mark_handler_reached, serve_cached_response, store_cached_response
+from .coalescing import join_flight, leave_flight
+from .admission import admit_request, release_request, heavy
+from .dimensions import get_dimensions
+from .serializers import PERFORMANCE_API, BOOK_API, TEACHER_QUALITY_API, TEACHER_METRICS, POVERTY_LEVELS, NAEP_API, NAEP_GRADES
+from .fanout import fan_out
+from .weighting import WEIGHTINGS, average, has_value, students_tested
+from .cube import CUBE_DIMENSIONS, DEFAULT_SCHOOL_TYPE, get_cube, parse_measures, slice_cube
+from .correlation import OUTCOMES, TEACHER_COLUMNS, outliers, paired_matrices, pairwise_regression
+from .similarity import FEATURES, FEATURE_SETS, get_feature_index, nearest
+from .recommendations import get_book_index, get_reading_profiles, recommend
+from .profiles import get_district_profile, get_school_profile
+from .facets import FACET_KEYS, INTEGER_FACETS, facet_counts, get_facet_index
+from .search import SEARCH_TYPES, get_search_index, suggest
+from .geo import ZOOM_TOLERANCES, get_county_geojson, zoom_level
+from .gaps import DEFAULT_GAP_TYPES, GAP_SCOPES, gap_groups, gap_statistics, get_gap_matrix
+from .distribution import DISTRIBUTION_METRICS, DISTRIBUTION_SCOPES, get_distribution_index, histogram, percentile_rank, quantiles, rank_from_top
 from . import db
 
 # Create API blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Levels /analytics/trends can report on (see rollups.py)
+TREND_SCOPES = ['state', 'county', 'district', 'school']
+
+# Display order for book grade levels
+BOOK_GRADE_LEVELS = [
+    'Kindergarten', '1st Grade', '2nd Grade', '3rd Grade',
+    '4th Grade', '5th Grade', '6th Grade', '7th Grade',
+    '8th Grade', '9th Grade', '10th Grade', '11th Grade', '12th Grade'
+]
+
+# All GET handlers are read-only, so they run against a read replica when one is configured
+api_bp.before_request(route_reads_to_replica)
+
+# Unchanged responses are answered with 304 or from the response store before any route query runs
+api_bp.before_request(serve_cached_response)
+api_bp.after_request(store_cached_response)
+
+# Identical requests that miss the store together wait for one of them to compute the response
+api_bp.before_request(join_flight)
+api_bp.teardown_request(leave_flight)
+
+# Requests that will compute are checked against limit/offset caps and the heavy-route concurrency cap
+api_bp.before_request(admit_request)
+api_bp.teardown_request(release_request)
+
+# Registered last: reached only by requests whose handler runs, the ones that can show the database has recovered
+api_bp.before_request(mark_handler_reached)
+
 @api_bp.route('/districts', methods=['GET'])  # Get all districts
 def get_districts():
     """Get all districts with basic information"""
     try:
-        districts = Districts.query.all()
+        dims = get_dimensions()
         
         result = []
-        for district in districts:
+        for district in dims.districts.values():
+            location = dims.locations.get(district.location_id)
             result.append({
                 'district_id': district.district_id,
                 'district_number': district.district_number,
                 'district_name': district.district_name,
-                'school_count': len(district.schools),
-                'county': district.location.county if district.location else None,
-                'city': district.location.city if district.location else None,
-                'zip_code': district.location.zip_code if district.location else None
+                'school_count': len(dims.schools_by_district.get(district.district_id, [])),
+                'county': location.county if location else None,
+                'city': location.city if location else None,
+                'zip_code': location.zip_code if location else None
             })
         
         return jsonify({
@@ -48,13 +98,12 @@ def get_schools():
     """Get all schools with optional district filtering"""
     try:
         district_id = request.args.get('district_id', type=int)
-        
-        query = Schools.query.join(Districts)
+        dims = get_dimensions()
         
         if district_id:
-            query = query.filter(Schools.district_id == district_id)
-        
-        schools = query.all()
+            schools = dims.schools_by_district.get(district_id, [])
+        else:
+            schools = dims.schools.values()
         
         result = []
         for school in schools:
@@ -63,7 +112,7 @@ def get_schools():
                 'school_number': school.school_number,
                 'school_name': school.school_name,
                 'district_id': school.district_id,
-                'district_name': school.district.district_name,
+                'district_name': dims.districts[school.district_id].district_name,
                 'school_type': school.school_type,
                 'grade_span': school.grade_span
             })
@@ -79,20 +128,71 @@ def get_schools():
             'success': False,
             'error': str(e)
         }), 500
+
+#Everything a district page needs in one call: identity, schools, yearly subgroup performance, level distribution,
+#teacher quality, NAEP and rank context. Assembled in a fixed handful of queries and kept per dataset version.
+@api_bp.route('/profiles/district/<int:district_id>', methods=['GET'])
+def get_district_profile_detail(district_id):
+    """Get the full profile of one district"""
+    try:
+        profile = get_district_profile(district_id)
+        if profile is None:
+            return jsonify({
+                'success': False,
+                'error': f'District {district_id} not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': profile
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/profiles/school/<int:school_id>', methods=['GET'])
+def get_school_profile_detail(school_id):
+    """Get the full profile of one school, ranked statewide and within its district"""
+    try:
+        profile = get_school_profile(school_id)
+        if profile is None:
+            return jsonify({
+                'success': False,
+                'error': f'School {school_id} not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': profile
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 #the endpoint returns a list of demographic groups along with the count of associated performance records.
 @api_bp.route('/demographic-groups', methods=['GET'])
 def get_demographic_groups():
     """Get all demographic groups"""
     try:
-        groups = DemographicGroups.query.all()
+        # One grouped count instead of loading every group's performance records
+        record_counts = dict(db.session.query(
+            PerformanceRecords.group_id,
+            func.count(PerformanceRecords.record_id)
+        ).group_by(PerformanceRecords.group_id).all())
         
         result = []
-        for group in groups:
+        for group in get_dimensions().groups.values():
             result.append({
                 'group_id': group.group_id,
                 'subgroup_name': group.subgroup_name,
                 'subgroup_type': group.subgroup_type,
-                'record_count': len(group.performance_records)
+                'record_count': record_counts.get(group.group_id, 0)
             })
         
         return jsonify({
@@ -108,6 +208,7 @@ def get_demographic_groups():
         }), 500
 
 @api_bp.route('/performance', methods=['GET'])
+@heavy
 def get_performance_data():
     """Get performance data with filtering options"""
     try:
@@ -118,9 +219,10 @@ def get_performance_data():
         school_year = request.args.get('school_year', type=int)
         subgroup_type = request.args.get('subgroup_type')
         limit = request.args.get('limit', default=100, type=int)
+        output_format = request.args.get('format')
         
-        # Build query with proper joins
-        query = PerformanceRecords.query.join(Schools).join(Districts).join(DemographicGroups).join(AcademicYears)
+        # One projected query with the joins the output needs; rows are shaped from tuples
+        query = PERFORMANCE_API.query()
         
         # Apply filters
         if district_id:
@@ -130,65 +232,256 @@ def get_performance_data():
         if group_id:
             query = query.filter(PerformanceRecords.group_id == group_id)
         if school_year:
-            query = query.filter(AcademicYears.school_year == school_year)
+            query = query.filter(PerformanceRecords.year_id == get_dimensions().year_id(school_year))
         if subgroup_type:
             query = query.filter(DemographicGroups.subgroup_type == subgroup_type)
         
+        filters_applied = {
+            'district_id': district_id,
+            'school_id': school_id,
+            'group_id': group_id,
+            'school_year': school_year,
+            'subgroup_type': subgroup_type,
+            'limit': limit
+        }
+        
+        # format=rows returns column names once plus one array per record, skipping per-row dicts
+        if output_format == 'rows':
+            columns, rows = PERFORMANCE_API.table(query.limit(limit))
+            return jsonify({
+                'success': True,
+                'columns': columns,
+                'data': rows,
+                'count': len(rows),
+                'filters_applied': filters_applied
+            })
+        
         # Limit results
-        performance_data = query.limit(limit).all()
+        result = PERFORMANCE_API.rows(query.limit(limit))
         
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'filters_applied': filters_applied
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/teacher-quality', methods=['GET'])
+def get_teacher_quality():
+    """Get district teacher quality metrics with filtering and pagination"""
+    try:
+        district_id = request.args.get('district_id', type=int)
+        county = request.args.get('county')
+        school_year = request.args.get('school_year', type=int)
+        poverty = request.args.get('poverty')
+        limit = request.args.get('limit', default=100, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+
+        if poverty and poverty not in POVERTY_LEVELS:
+            return jsonify({
+                'success': False,
+                'error': f"poverty must be one of: {', '.join(POVERTY_LEVELS)}"
+            }), 400
+
+        # One projected query; ?poverty= drops the other level's columns from the SELECT
+        projection = TEACHER_QUALITY_API[poverty or None]
+        query = projection.query()
+
+        if district_id:
+            query = query.filter(TeacherQuality.district_id == district_id)
+        if county:
+            query = query.filter(Locations.county == county)
+        if school_year:
+            query = query.filter(TeacherQuality.year_id == get_dimensions().year_id(school_year))
+
+        total_count = query.count()
+        result = projection.rows(
+            query.order_by(AcademicYears.school_year.desc(), Districts.district_name).limit(limit).offset(offset)
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'total': total_count,
+            'filters_applied': {
+                'district_id': district_id,
+                'county': county,
+                'school_year': school_year,
+                'poverty': poverty,
+                'limit': limit,
+                'offset': offset
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/teacher-quality/comparison', methods=['GET'])
+@heavy
+def get_teacher_quality_comparison():
+    """Compare a district's or county's teacher quality with the statewide average, by poverty level"""
+    try:
+        district_id = request.args.get('district_id', type=int)
+        county = request.args.get('county')
+        school_year = request.args.get('school_year', type=int)
+
+        dims = get_dimensions()
+        district = None
+        if district_id:
+            district = dims.districts.get(district_id)
+            if not district:
+                return jsonify({
+                    'success': False,
+                    'error': 'District not found'
+                }), 404
+
+        if district_id:
+            selected = TeacherQuality.district_id == district_id
+        elif county:
+            selected = Locations.county == county
+        else:
+            selected = None
+
+        # Statewide and selection averages for every metric come from one grouped query: the selection's
+        # averages are AVG(CASE WHEN <selected> THEN column END) over the same rows
+        columns = [AcademicYears.school_year, func.count(TeacherQuality.quality_id)]
+        if selected is not None:
+            columns.append(func.count(case((selected, TeacherQuality.quality_id))))
+        for metric in TEACHER_METRICS:
+            for level in POVERTY_LEVELS:
+                column = getattr(TeacherQuality, f'{metric}_teachers_{level}_poverty')
+                columns.append(func.avg(column))
+                if selected is not None:
+                    columns.append(func.avg(case((selected, column))))
+
+        query = db.session.query(*columns)\
+            .join(AcademicYears, TeacherQuality.year_id == AcademicYears.year_id)\
+            .join(Districts, TeacherQuality.district_id == Districts.district_id)\
+            .outerjoin(Locations, Districts.location_id == Locations.location_id)
+        if school_year:
+            query = query.filter(TeacherQuality.year_id == dims.year_id(school_year))
+        rows = query.group_by(AcademicYears.school_year).order_by(AcademicYears.school_year.desc()).all()
+
+        def rounded(value):
+            return round(float(value), 1) if value is not None else None
+
+        def difference(a, b):
+            return round(float(a) - float(b), 1) if a is not None and b is not None else None
+
         result = []
-        for perf in performance_data:
-            result.append({
-                'record_id': perf.record_id,
-                'school_year': perf.academic_year.school_year,
-                'district_name': perf.school.district.district_name,
-                'school_name': perf.school.school_name,
-                'school_type': perf.school.school_type,
-                'subgroup_name': perf.demographic_group.subgroup_name,
-                'subgroup_type': perf.demographic_group.subgroup_type,
-                'grade_level': perf.grade_level,
-                'english_proficiency': perf.english_proficiency,
-                'english_growth': perf.english_growth,
-                'performance_levels': {
-                    'level_1': {
-                        'percent': perf.performance_level_1_pct,
-                        'count': perf.performance_level_1_count
-                    },
-                    'level_2': {
-                        'percent': perf.performance_level_2_pct,
-                        'count': perf.performance_level_2_count
-                    },
-                    'level_3': {
-                        'percent': perf.performance_level_3_pct,
-                        'count': perf.performance_level_3_count
-                    },
-                    'level_4': {
-                        'percent': perf.performance_level_4_pct,
-                        'count': perf.performance_level_4_count
-                    },
-                    'level_5': {
-                        'percent': perf.performance_level_5_pct,
-                        'count': perf.performance_level_5_count
+        for row in rows:
+            values = iter(row)
+            year = next(values)
+            entry = {
+                'school_year': year,
+                'districts_reporting': next(values),
+                'selection_reporting': next(values) if selected is not None else None,
+                'metrics': {}
+            }
+            for metric in TEACHER_METRICS:
+                levels = {}
+                for level in POVERTY_LEVELS:
+                    statewide = next(values)
+                    chosen = next(values) if selected is not None else None
+                    levels[level] = (statewide, chosen)
+                entry['metrics'][metric] = {
+                    **{f'{level}_poverty': {
+                        'statewide': rounded(statewide),
+                        'selection': rounded(chosen),
+                        'difference': difference(chosen, statewide)
+                    } for level, (statewide, chosen) in levels.items()},
+                    # Low-poverty minus high-poverty schools
+                    'poverty_gap': {
+                        'statewide': difference(levels['low'][0], levels['high'][0]),
+                        'selection': difference(levels['low'][1], levels['high'][1])
                     }
-                },
-                'chronic_absenteeism_pct': perf.chronic_absenteeism_pct
-            })
-        
+                }
+            result.append(entry)
+
         return jsonify({
             'success': True,
             'data': result,
             'count': len(result),
+            'selection': {
+                'district_id': district_id,
+                'district_name': district.district_name if district else None,
+                'county': county if not district_id else None
+            },
+            'filters': {
+                'district_id': district_id,
+                'county': county,
+                'school_year': school_year
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/naep', methods=['GET'])
+def get_naep_assessments():
+    """Get NAEP reading results with filtering and pagination"""
+    try:
+        scope = request.args.get('scope')
+        district_id = request.args.get('district_id', type=int)
+        school_id = request.args.get('school_id', type=int)
+        school_year = request.args.get('school_year', type=int)
+        grade = request.args.get('grade', type=int)
+        limit = request.args.get('limit', default=100, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+
+        if grade and grade not in NAEP_GRADES:
+            return jsonify({
+                'success': False,
+                'error': f"grade must be one of: {', '.join(str(g) for g in NAEP_GRADES)}"
+            }), 400
+
+        # One projected query; ?grade= drops the other grade's columns from the SELECT
+        projection = NAEP_API[grade or None]
+        query = projection.query()
+
+        if scope:
+            query = query.filter(NAEPAssessments.scope == scope)
+        if district_id:
+            query = query.filter(NAEPAssessments.district_id == district_id)
+        if school_id:
+            query = query.filter(NAEPAssessments.school_id == school_id)
+        if school_year:
+            query = query.filter(NAEPAssessments.year_id == get_dimensions().year_id(school_year))
+
+        total_count = query.count()
+        result = projection.rows(
+            query.order_by(AcademicYears.school_year.desc(), NAEPAssessments.assessment_id).limit(limit).offset(offset)
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'total': total_count,
             'filters_applied': {
+                'scope': scope,
                 'district_id': district_id,
                 'school_id': school_id,
-                'group_id': group_id,
                 'school_year': school_year,
-                'subgroup_type': subgroup_type,
-                'limit': limit
+                'grade': grade,
+                'limit': limit,
+                'offset': offset
             }
         })
-    
+
     except Exception as e:
         return jsonify({
             'success': False,
@@ -199,8 +492,15 @@ def get_performance_data():
 def get_county_performance():
     """Get performance data grouped by county"""
     try:
+        weighting = request.args.get('weighting', default='records')
+        if weighting not in WEIGHTINGS:
+            return jsonify({
+                'success': False,
+                'error': f"weighting must be one of: {', '.join(WEIGHTINGS)}"
+            }), 400
+
         # Get 'All' subgroup for fair comparison
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
+        all_subgroup = get_dimensions().group_named('All')
         
         if not all_subgroup:
             return jsonify({
@@ -209,9 +509,10 @@ def get_county_performance():
             }), 404
         
         # Calculate average English proficiency by county
+        proficiency = average('english_proficiency', weighting)
         county_performance = db.session.query(
             Locations.county,
-            func.avg(PerformanceRecords.english_proficiency).label('avg_english_proficiency'),
+            proficiency.label('avg_english_proficiency'),
             func.count(PerformanceRecords.record_id).label('record_count'),
             func.count(func.distinct(Districts.district_id)).label('district_count')
         ).join(Districts, Locations.location_id == Districts.location_id)\
@@ -219,12 +520,12 @@ def get_county_performance():
          .join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
          .filter(
             PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None),
+            has_value('english_proficiency', weighting),
             Locations.county.isnot(None)
         ).group_by(
             Locations.county
         ).order_by(
-            func.avg(PerformanceRecords.english_proficiency).desc()
+            proficiency.desc()
         ).all()
         
         result = []
@@ -239,7 +540,8 @@ def get_county_performance():
         return jsonify({
             'success': True,
             'data': result,
-            'count': len(result)
+            'count': len(result),
+            'weighting': weighting
         })
     
     except Exception as e:
@@ -254,11 +556,19 @@ def get_subgroup_performance():
     try:
         county = request.args.get('county')
         school_year = request.args.get('school_year', type=int)
+        weighting = request.args.get('weighting', default='records')
+        if weighting not in WEIGHTINGS:
+            return jsonify({
+                'success': False,
+                'error': f"weighting must be one of: {', '.join(WEIGHTINGS)}"
+            }), 400
+
+        proficiency = average('english_proficiency', weighting)
         
         # For statewide data (no county filter), use official state-level records
         if not county:
             # Get state-level school (Mississippi/Mississippi)
-            state_school = Schools.query.filter_by(school_number=0).first()
+            state_school = get_dimensions().state_school
             
             if state_school:
                 # Use official state-level data - use MAX since there should be only one record per subgroup
@@ -276,20 +586,20 @@ def get_subgroup_performance():
                 query = db.session.query(
                     DemographicGroups.subgroup_name,
                     DemographicGroups.subgroup_type,
-                    func.avg(PerformanceRecords.english_proficiency).label('avg_english_proficiency'),
+                    proficiency.label('avg_english_proficiency'),
                     func.count(PerformanceRecords.record_id).label('record_count')
                 ).join(PerformanceRecords).filter(
-                    PerformanceRecords.english_proficiency.isnot(None)
+                    has_value('english_proficiency', weighting)
                 )
         else:
             # For county-specific data, use aggregated district/school data
             query = db.session.query(
                 DemographicGroups.subgroup_name,
                 DemographicGroups.subgroup_type,
-                func.avg(PerformanceRecords.english_proficiency).label('avg_english_proficiency'),
+                proficiency.label('avg_english_proficiency'),
                 func.count(PerformanceRecords.record_id).label('record_count')
             ).join(PerformanceRecords).filter(
-                PerformanceRecords.english_proficiency.isnot(None)
+                has_value('english_proficiency', weighting)
             )
             
             query = query.join(Schools, PerformanceRecords.school_id == Schools.school_id)\
@@ -298,8 +608,7 @@ def get_subgroup_performance():
                         .filter(Locations.county == county, Schools.school_number != 0)  # Exclude state-level data
         
         if school_year:
-            query = query.join(AcademicYears, PerformanceRecords.year_id == AcademicYears.year_id)\
-                        .filter(AcademicYears.school_year == school_year)
+            query = query.filter(PerformanceRecords.year_id == get_dimensions().year_id(school_year))
         
         if not county and state_school:
             # For state-level data, group by subgroup only
@@ -313,7 +622,7 @@ def get_subgroup_performance():
             subgroup_performance = query.group_by(
                 DemographicGroups.group_id, DemographicGroups.subgroup_name, DemographicGroups.subgroup_type
             ).order_by(
-                DemographicGroups.subgroup_type, func.avg(PerformanceRecords.english_proficiency).desc()
+                DemographicGroups.subgroup_type, proficiency.desc()
             ).all()
         
         result = []
@@ -331,7 +640,8 @@ def get_subgroup_performance():
             'count': len(result),
             'filters': {
                 'county': county,
-                'school_year': school_year
+                'school_year': school_year,
+                'weighting': weighting
             }
         })
     
@@ -345,7 +655,7 @@ def get_subgroup_performance():
 def get_district_rankings():
     """Get districts ranked by performance with filtering options"""
     try:
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
+        all_subgroup = get_dimensions().group_named('All')
         
         if not all_subgroup:
             return jsonify({
@@ -357,20 +667,27 @@ def get_district_rankings():
         county = request.args.get('county')
         performance_range = request.args.get('performance_range')
         limit = request.args.get('limit', default=20, type=int)
+        weighting = request.args.get('weighting', default='records')
+        if weighting not in WEIGHTINGS:
+            return jsonify({
+                'success': False,
+                'error': f"weighting must be one of: {', '.join(WEIGHTINGS)}"
+            }), 400
+        proficiency = average('english_proficiency', weighting)
 
         # Build query with filters
         query = db.session.query(
             Districts.district_id,
             Districts.district_name,
             Locations.county,
-            func.avg(PerformanceRecords.english_proficiency).label('avg_english_proficiency'),
+            proficiency.label('avg_english_proficiency'),
             func.count(PerformanceRecords.record_id).label('record_count')
         ).join(Schools, Districts.district_id == Schools.district_id)\
          .join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
          .join(Locations, Districts.location_id == Locations.location_id)\
          .filter(
             PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None),
+            has_value('english_proficiency', weighting),
             Schools.school_number != 0  # Exclude state-level school
         )
 
@@ -382,22 +699,22 @@ def get_district_rankings():
         district_performance = query.group_by(
             Districts.district_id, Districts.district_name, Locations.county
         ).order_by(
-            func.avg(PerformanceRecords.english_proficiency).desc()
+            proficiency.desc()
         )
 
         # Apply performance range filter after grouping
         if performance_range:
             if performance_range == 'high':
                 district_performance = district_performance.having(
-                    func.avg(PerformanceRecords.english_proficiency) >= 47.6
+                    proficiency >= 47.6
                 )
             elif performance_range == 'medium':
                 district_performance = district_performance.having(
-                    func.avg(PerformanceRecords.english_proficiency).between(35, 47.5)
+                    proficiency.between(35, 47.5)
                 )
             elif performance_range == 'low':
                 district_performance = district_performance.having(
-                    func.avg(PerformanceRecords.english_proficiency) < 35
+                    proficiency < 35
                 )
 
         district_performance = district_performance.limit(limit).all()
@@ -420,7 +737,8 @@ def get_district_rankings():
             'filters': {
                 'county': county,
                 'performance_range': performance_range,
-                'limit': limit
+                'limit': limit,
+                'weighting': weighting
             }
         })
     
@@ -434,7 +752,14 @@ def get_district_rankings():
 def get_performance_metrics():
     """Get advanced performance metrics and insights"""
     try:
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
+        weighting = request.args.get('weighting', default='records')
+        if weighting not in WEIGHTINGS:
+            return jsonify({
+                'success': False,
+                'error': f"weighting must be one of: {', '.join(WEIGHTINGS)}"
+            }), 400
+
+        all_subgroup = get_dimensions().group_named('All')
         
         if not all_subgroup:
             return jsonify({
@@ -442,218 +767,918 @@ def get_performance_metrics():
                 'error': "'All' subgroup not found"
             }), 404
 
-        # Method 1: Official state-level record (preferred)
-        state_school = Schools.query.filter_by(school_number=0).first()
-        state_avg_official = None
-        if state_school:
-            state_record = PerformanceRecords.query.filter_by(
+        group_id = all_subgroup.group_id
+        state_school = get_dimensions().state_school
+        proficiency = average('english_proficiency', weighting)
+        reported = has_value('english_proficiency', weighting)
+
+        # The statements below are independent, so they run concurrently (see fanout.py)
+        results = fan_out(
+            # Method 1: Official state-level record (preferred)
+            state_avg_official=lambda session: session.query(
+                PerformanceRecords.english_proficiency
+            ).filter_by(
                 school_id=state_school.school_id,
-                group_id=all_subgroup.group_id
-            ).first()
-            state_avg_official = state_record.english_proficiency if state_record else None
+                group_id=group_id
+            ).limit(1).scalar() if state_school else None,
+
+            # Method 2: Average of individual records (All subgroup only)
+            state_avg_records=lambda session: session.query(
+                proficiency.label('state_avg')
+            ).filter(
+                PerformanceRecords.group_id == group_id,
+                reported
+            ).scalar(),
+
+            # Method 3: Average of district averages (weighted by districts, or by students with ?weighting=students)
+            district_averages=lambda session: session.query(
+                Districts.district_id,
+                proficiency.label('district_avg'),
+                students_tested('english_proficiency').label('students')
+            ).join(Schools, Districts.district_id == Schools.district_id)\
+             .join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
+             .filter(
+                PerformanceRecords.group_id == group_id,
+                reported,
+                Schools.school_number != 0  # Exclude state-level school
+            ).group_by(Districts.district_id).all(),
+
+            # Method 4: All records regardless of subgroup
+            state_avg_all_records=lambda session: session.query(
+                proficiency
+            ).filter(
+                reported
+            ).scalar(),
+
+            # Latest statewide year-over-year change, precomputed at import (None until there are two years)
+            proficiency_trend=lambda session: session.query(
+                PerformanceRollups.proficiency_delta
+            ).filter(
+                PerformanceRollups.scope == 'state',
+                PerformanceRollups.group_id == group_id
+            ).order_by(PerformanceRollups.school_year.desc()).limit(1).scalar(),
+
+            # Subgroup averages for the achievement gap (highest and lowest subgroups)
+            subgroup_averages=lambda session: session.query(
+                proficiency.label('avg_proficiency')
+            ).join(DemographicGroups, PerformanceRecords.group_id == DemographicGroups.group_id)\
+             .filter(
+                reported,
+                DemographicGroups.subgroup_name != 'All'
+            ).group_by(DemographicGroups.group_id)\
+             .order_by(proficiency.desc())\
+             .all()
+        )
+
+        state_avg_official = results['state_avg_official']
+        state_avg_records = results['state_avg_records']
+        district_averages = results['district_averages']
+        state_avg_all_records = results['state_avg_all_records']
+        subgroup_averages = results['subgroup_averages']
+        proficiency_trend = results['proficiency_trend']
+
+        if weighting == 'students':
+            # Pooling district averages by their tested students gives the student-weighted state average
+            total_students = sum(students for _, _, students in district_averages)
+            state_avg_districts = sum(avg * students for _, avg, students in district_averages) / total_students if total_students else 0
+        else:
+            state_avg_districts = sum(avg for _, avg, _ in district_averages) / len(district_averages) if district_averages else 0
+
+        # Calculate districts above state average (use official state average)
+        comparison_avg = state_avg_official if state_avg_official else state_avg_records
+        districts_above_avg = sum(1 for _, avg, _ in district_averages if comparison_avg is not None and avg > comparison_avg)
+
+        # Total districts
+        total_districts = len(get_dimensions().districts)
+
+        achievement_gap = None
+        if len(subgroup_averages) >= 2:
+            highest = float(subgroup_averages[0].avg_proficiency)
+            lowest = float(subgroup_averages[-1].avg_proficiency)
+            achievement_gap = highest - lowest
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'state_average': round(float(state_avg_official), 1) if state_avg_official else round(float(state_avg_records), 1) if state_avg_records else None,
+                'state_average_official': round(float(state_avg_official), 1) if state_avg_official else None,
+                'state_average_calculated': round(float(state_avg_records), 1) if state_avg_records else None,
+                'state_average_by_districts': round(float(state_avg_districts), 1) if state_avg_districts else None,
+                'state_average_all_records': round(float(state_avg_all_records), 1) if state_avg_all_records else None,
+                'districts_above_average': districts_above_avg,
+                'total_districts': total_districts,
+                'achievement_gap': round(achievement_gap, 1) if achievement_gap else None,
+                'proficiency_trend': round(float(proficiency_trend), 1) if proficiency_trend is not None else None,
+                'avg_class_size_impact': 0.8  # Placeholder - would need class size data
+            },
+            'weighting': weighting
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/analytics/school-performance', methods=['GET'])
+def get_school_performance():
+    """Get school performance data within a district"""
+    try:
+        district_id = request.args.get('district_id', type=int)
+        grade_span = request.args.get('grade_span')
+        weighting = request.args.get('weighting', default='records')
+        if weighting not in WEIGHTINGS:
+            return jsonify({
+                'success': False,
+                'error': f"weighting must be one of: {', '.join(WEIGHTINGS)}"
+            }), 400
+        proficiency = average('english_proficiency', weighting)
         
-        # Method 2: Average of individual records (All subgroup only)
-        state_avg_records = db.session.query(
-            func.avg(PerformanceRecords.english_proficiency).label('state_avg')
-        ).filter(
-            PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None)
-        ).scalar()
+        if not district_id:
+            return jsonify({
+                'success': False,
+                'error': 'district_id parameter is required'
+            }), 400
 
-        # Method 3: Average of district averages (weighted by districts)
-        district_averages = db.session.query(
-            Districts.district_id,
-            func.avg(PerformanceRecords.english_proficiency).label('district_avg')
-        ).join(Schools, Districts.district_id == Schools.district_id)\
-         .join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
+        all_subgroup = get_dimensions().group_named('All')
+        if not all_subgroup:
+            return jsonify({
+                'success': False,
+                'error': "'All' subgroup not found"
+            }), 404
+
+        # Get district information
+        district = get_dimensions().districts.get(district_id)
+        if not district:
+            return jsonify({
+                'success': False,
+                'error': 'District not found'
+            }), 404
+
+        # Build school performance query
+        query = db.session.query(
+            Schools.school_id,
+            Schools.school_name,
+            Schools.grade_span,
+            Schools.school_type,
+            proficiency.label('avg_english_proficiency'),
+            func.count(PerformanceRecords.record_id).label('record_count')
+        ).join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
          .filter(
+            Schools.district_id == district_id,
+            Schools.school_number != 0,  # Exclude district-level aggregates
             PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None),
-            Schools.school_number != 0  # Exclude state-level school
-        ).group_by(Districts.district_id).all()
+            has_value('english_proficiency', weighting)
+        )
+
+        # Apply grade span filter if provided
+        if grade_span:
+            query = query.filter(Schools.grade_span == grade_span)
+
+        school_performance_query = query.group_by(
+            Schools.school_id, Schools.school_name, Schools.grade_span, Schools.school_type
+        ).order_by(
+            proficiency.desc()
+        )
+
+        # The school ranking, district average and grade span list are independent, so they run concurrently
+        results = fan_out(
+            school_performance=lambda session: school_performance_query.with_session(session).all(),
+
+            # Calculate district average
+            district_avg=lambda session: session.query(
+                proficiency
+            ).join(Schools, PerformanceRecords.school_id == Schools.school_id)\
+             .filter(
+                Schools.district_id == district_id,
+                Schools.school_number != 0,
+                PerformanceRecords.group_id == all_subgroup.group_id,
+                has_value('english_proficiency', weighting)
+            ).scalar(),
+
+            # Get available grade spans for filtering
+            grade_spans=lambda session: session.query(Schools.grade_span)\
+                .filter(Schools.district_id == district_id, Schools.school_number != 0, Schools.grade_span.isnot(None))\
+                .distinct().all()
+        )
+
+        school_performance = results['school_performance']
+        district_avg_query = results['district_avg']
+
+        district_average = round(float(district_avg_query), 1) if district_avg_query else 0
+
+        # Prepare results
+        result = []
+        schools_above_avg = 0
+        
+        for rank, (school_id, school_name, grade_span, school_type, avg_proficiency, record_count) in enumerate(school_performance, 1):
+            proficiency = round(float(avg_proficiency), 1)
+            vs_district = proficiency - district_average
+            
+            if proficiency > district_average:
+                schools_above_avg += 1
+                vs_district_indicator = 'above'
+            elif proficiency == district_average:
+                vs_district_indicator = 'equal'
+            else:
+                vs_district_indicator = 'below'
+
+            result.append({
+                'rank': rank,
+                'school_id': school_id,
+                'school_name': school_name,
+                'grade_span': grade_span or 'Not specified',
+                'school_type': school_type,
+                'average_english_proficiency': proficiency,
+                'record_count': record_count,
+                'vs_district_avg': round(vs_district, 1),
+                'vs_district_indicator': vs_district_indicator
+            })
+
+        available_grade_spans = [span[0] for span in results['grade_spans'] if span[0]]
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'district_info': {
+                'district_id': district.district_id,
+                'district_name': district.district_name,
+                'district_average': district_average,
+                'total_schools': len(result),
+                'schools_above_district_avg': schools_above_avg,
+                'available_grade_spans': available_grade_spans
+            },
+            'filters': {
+                'district_id': district_id,
+                'grade_span': grade_span,
+                'weighting': weighting
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/analytics/trends', methods=['GET'])
+def get_trends():
+    """Get year-over-year proficiency and growth trends from the precomputed rollups"""
+    try:
+        scope = request.args.get('scope', default='state')
+        entity_id = request.args.get('entity_id', type=int)
+        county = request.args.get('county')
+        subgroup = request.args.get('subgroup', default='All')
+        group_id = request.args.get('group_id', type=int)
+
+        if scope not in TREND_SCOPES:
+            return jsonify({
+                'success': False,
+                'error': f"scope must be one of: {', '.join(TREND_SCOPES)}"
+            }), 400
+
+        dims = get_dimensions()
+        group = dims.groups.get(group_id) if group_id else dims.group_named(subgroup)
+        if not group:
+            return jsonify({
+                'success': False,
+                'error': 'Demographic group not found'
+            }), 404
+
+        query = db.session.query(
+            PerformanceRollups.entity_id,
+            PerformanceRollups.entity_name,
+            PerformanceRollups.school_year,
+            PerformanceRollups.avg_proficiency,
+            PerformanceRollups.avg_growth,
+            PerformanceRollups.proficiency_delta,
+            PerformanceRollups.growth_delta,
+            PerformanceRollups.record_count
+        ).filter(
+            PerformanceRollups.scope == scope,
+            PerformanceRollups.group_id == group.group_id
+        )
+
+        # Optional single-entity filters
+        if entity_id and scope in ('district', 'school'):
+            query = query.filter(PerformanceRollups.entity_id == entity_id)
+        if county and scope == 'county':
+            query = query.filter(PerformanceRollups.entity_name == county)
+
+        rows = query.order_by(
+            PerformanceRollups.entity_name, PerformanceRollups.entity_id, PerformanceRollups.school_year
+        ).all()
+
+        def rounded(value):
+            return round(float(value), 1) if value is not None else None
+
+        result = []
+        for (entity_id_value, entity_name), entity_rows in groupby(rows, key=lambda row: (row.entity_id, row.entity_name)):
+            series = [{
+                'school_year': row.school_year,
+                'average_english_proficiency': rounded(row.avg_proficiency),
+                'average_english_growth': rounded(row.avg_growth),
+                'proficiency_delta': rounded(row.proficiency_delta),
+                'growth_delta': rounded(row.growth_delta),
+                'record_count': row.record_count
+            } for row in entity_rows]
+
+            result.append({
+                'scope': scope,
+                'entity_id': entity_id_value,
+                'entity_name': entity_name,
+                'series': series,
+                'latest_proficiency_delta': series[-1]['proficiency_delta'],
+                'latest_growth_delta': series[-1]['growth_delta']
+            })
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'subgroup': {
+                'group_id': group.group_id,
+                'subgroup_name': group.subgroup_name,
+                'subgroup_type': group.subgroup_type
+            },
+            'years': sorted(dims.years_by_school_year),
+            'filters': {
+                'scope': scope,
+                'entity_id': entity_id,
+                'county': county,
+                'subgroup': group.subgroup_name
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/analytics/distribution', methods=['GET'])
+def get_distribution():
+    """Get percentiles, quantiles and a histogram of a metric across schools, districts or counties"""
+    try:
+        scope = request.args.get('scope', default='district')
+        metric = request.args.get('metric', default='english_proficiency')
+        school_year = request.args.get('school_year', type=int)
+        subgroup = request.args.get('subgroup', default='All')
+        group_id = request.args.get('group_id', type=int)
+        bins = request.args.get('bins', default=10, type=int)
+        entity_id = request.args.get('entity_id', type=int)
+        county = request.args.get('county')
+        value = request.args.get('value', type=float)
+
+        if scope not in DISTRIBUTION_SCOPES:
+            return jsonify({
+                'success': False,
+                'error': f"scope must be one of: {', '.join(DISTRIBUTION_SCOPES)}"
+            }), 400
+        if metric not in DISTRIBUTION_METRICS:
+            return jsonify({
+                'success': False,
+                'error': f"metric must be one of: {', '.join(DISTRIBUTION_METRICS)}"
+            }), 400
+        if not 1 <= bins <= 50:
+            return jsonify({
+                'success': False,
+                'error': 'bins must be between 1 and 50'
+            }), 400
+
+        dims = get_dimensions()
+        group = dims.groups.get(group_id) if group_id else dims.group_named(subgroup)
+        if not group:
+            return jsonify({
+                'success': False,
+                'error': 'Demographic group not found'
+            }), 404
+
+        school_year = school_year or dims.latest_school_year
+        year_id = dims.year_id(school_year)
+
+        distribution = get_distribution_index().get(scope, year_id, group.group_id, metric)
+        values = distribution.values if distribution else []
+
+        def rounded(number):
+            return round(number, 1) if number is not None else None
+
+        # Where one entity (entity_id for schools/districts, county for counties) or an arbitrary value falls
+        position = None
+        lookup_key = county if scope == 'county' else entity_id
+        if lookup_key is not None and distribution:
+            entity_value = distribution.by_entity.get(lookup_key)
+            if entity_value is None:
+                return jsonify({
+                    'success': False,
+                    'error': f'No {metric} data for that {scope}'
+                }), 404
+            position = {
+                'entity': lookup_key,
+                'value': rounded(entity_value),
+                'percentile_rank': rounded(percentile_rank(values, entity_value)),
+                'rank': rank_from_top(values, entity_value),
+                'of': len(values)
+            }
+        elif value is not None:
+            position = {
+                'value': value,
+                'percentile_rank': rounded(percentile_rank(values, value)),
+                'rank': rank_from_top(values, value) if len(values) else None,
+                'of': len(values)
+            }
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'count': len(values),
+                'min': rounded(float(values[0])) if len(values) else None,
+                'max': rounded(float(values[-1])) if len(values) else None,
+                'mean': rounded(float(sum(values) / len(values))) if len(values) else None,
+                'quantiles': {name: rounded(q) for name, q in quantiles(values).items()},
+                'histogram': [
+                    {'min': rounded(bin['min']), 'max': rounded(bin['max']), 'count': bin['count']}
+                    for bin in histogram(values, bins)
+                ],
+                'position': position
+            },
+            'filters': {
+                'scope': scope,
+                'metric': metric,
+                'school_year': school_year,
+                'subgroup': group.subgroup_name,
+                'bins': bins
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/analytics/achievement-gaps', methods=['GET'])
+def get_achievement_gaps():
+    """Get the district (or school) x subgroup proficiency matrix with gap statistics"""
+    try:
+        scope = request.args.get('scope', default='district')
+        school_year = request.args.get('school_year', type=int)
+        subgroup_types = request.args.get('subgroup_type')
+        subgroup_names = request.args.get('subgroups')
+        district_id = request.args.get('district_id', type=int)
+
+        if scope not in GAP_SCOPES:
+            return jsonify({
+                'success': False,
+                'error': f"scope must be one of: {', '.join(GAP_SCOPES)}"
+            }), 400
+
+        dims = get_dimensions()
+        school_year = school_year or dims.latest_school_year
+        year_id = dims.year_id(school_year)
+
+        # Columns: named subgroups, or every subgroup of the requested (default: demographic) types
+        if subgroup_names:
+            names = [name.strip() for name in subgroup_names.split(',') if name.strip()]
+            groups = [dims.group_named(name) for name in names]
+            if None in groups:
+                return jsonify({
+                    'success': False,
+                    'error': 'Demographic group not found: ' + ', '.join(name for name, group in zip(names, groups) if group is None)
+                }), 404
+        else:
+            types = [t.strip() for t in (subgroup_types or '').split(',') if t.strip()] or DEFAULT_GAP_TYPES
+            valid_types = sorted({
+                group.subgroup_type for group in dims.groups.values()
+                if group.subgroup_type and group.subgroup_type != 'All'
+            })
+            unknown = [t for t in types if t not in valid_types]
+            if unknown:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown subgroup_type: {', '.join(unknown)}; subgroup_type must be drawn from: {', '.join(valid_types)}"
+                }), 400
+            groups = gap_groups(list(dims.groups.values()), types)
+
+        all_subgroup = dims.group_named('All')
+        group_ids = [group.group_id for group in groups]
+
+        matrix = get_gap_matrix(scope, year_id)
+        if scope == 'school' and district_id:
+            school_ids = {school.school_id for school in dims.schools_by_district.get(district_id, [])}
+            matrix = matrix[matrix.index.get_level_values('entity_id').isin(school_ids)]
+
+        values, counts, highest, lowest, gaps = gap_statistics(matrix, group_ids)
+        all_values = matrix.reindex(columns=[all_subgroup.group_id] if all_subgroup else []).to_numpy(dtype=float)
+
+        def rounded(value):
+            return round(float(value), 1) if value is not None and not np.isnan(value) else None
+
+        result = []
+        for row, (entity_name, entity_id) in enumerate(matrix.index):
+            entry = {
+                'entity_id': int(entity_id),
+                'entity_name': entity_name,
+                'all_students': rounded(all_values[row, 0]) if all_values.shape[1] else None,
+                'proficiency': {group.subgroup_name: rounded(values[row, column]) for column, group in enumerate(groups)},
+                'gap': rounded(gaps[row]),
+                'highest_subgroup': groups[highest[row]].subgroup_name if highest[row] >= 0 else None,
+                'lowest_subgroup': groups[lowest[row]].subgroup_name if lowest[row] >= 0 else None,
+                'subgroups_reported': int(counts[row])
+            }
+            if scope == 'school':
+                school = dims.schools.get(int(entity_id))
+                entry['district_id'] = school.district_id if school else None
+            result.append(entry)
+
+        # Statewide reference row from the official state record
+        state_values = dict(db.session.query(
+            PerformanceRollups.group_id, PerformanceRollups.avg_proficiency
+        ).filter(
+            PerformanceRollups.scope == 'state',
+            PerformanceRollups.year_id == year_id,
+            PerformanceRollups.group_id.in_(group_ids)
+        ).all()) if group_ids else {}
+        state_reported = {group.subgroup_name: state_values[group.group_id] for group in groups if state_values.get(group.group_id) is not None}
+
+        valid_gaps = gaps[~np.isnan(gaps)]
+        largest = int(np.nanargmax(gaps)) if len(valid_gaps) else None
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'subgroups': [{
+                'group_id': group.group_id,
+                'subgroup_name': group.subgroup_name,
+                'subgroup_type': group.subgroup_type
+            } for group in groups],
+            'statewide': {
+                'proficiency': {name: rounded(value) for name, value in state_reported.items()},
+                'gap': rounded(max(state_reported.values()) - min(state_reported.values())) if len(state_reported) >= 2 else None
+            },
+            'summary': {
+                'entities_with_gap': int(len(valid_gaps)),
+                'average_gap': rounded(valid_gaps.mean()) if len(valid_gaps) else None,
+                'median_gap': rounded(np.median(valid_gaps)) if len(valid_gaps) else None,
+                'largest_gap': {
+                    'entity_name': result[largest]['entity_name'],
+                    'gap': result[largest]['gap']
+                } if largest is not None else None
+            },
+            'filters': {
+                'scope': scope,
+                'school_year': school_year,
+                'subgroup_type': subgroup_types,
+                'subgroups': subgroup_names,
+                'district_id': district_id
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/analytics/teacher-quality-correlation', methods=['GET'])
+def get_teacher_quality_correlation():
+    """Get correlations and regression slopes between district teacher quality and literacy outcomes"""
+    try:
+        school_year = request.args.get('school_year', type=int)
+        subgroup = request.args.get('subgroup', default='All')
+        x_metric = request.args.get('x')
+        y_metric = request.args.get('y', default='english_proficiency')
+        outlier_count = request.args.get('outliers', default=10, type=int)
+
+        if x_metric and x_metric not in TEACHER_COLUMNS:
+            return jsonify({
+                'success': False,
+                'error': f"x must be one of: {', '.join(TEACHER_COLUMNS)}"
+            }), 400
+        if y_metric not in OUTCOMES:
+            return jsonify({
+                'success': False,
+                'error': f"y must be one of: {', '.join(OUTCOMES)}"
+            }), 400
+        if not 0 <= outlier_count <= 50:
+            return jsonify({
+                'success': False,
+                'error': 'outliers must be between 0 and 50'
+            }), 400
+
+        dims = get_dimensions()
+        group = dims.group_named(subgroup)
+        if not group:
+            return jsonify({
+                'success': False,
+                'error': 'Demographic group not found'
+            }), 404
+
+        school_year = school_year or dims.latest_school_year
+        district_ids, district_names, x, y = paired_matrices(dims.year_id(school_year), group.group_id)
+        r, slope, intercept, n = pairwise_regression(x, y)
+
+        def rounded(value, digits=3):
+            return round(float(value), digits) if not np.isnan(value) else None
+
+        correlations = {
+            column: {
+                outcome: {
+                    'r': rounded(r[i, j]),
+                    'slope': rounded(slope[i, j]),
+                    'intercept': rounded(intercept[i, j]),
+                    'n': int(n[i, j])
+                } for j, outcome in enumerate(OUTCOMES)
+            } for i, column in enumerate(TEACHER_COLUMNS)
+        }
+
+        # Strongest relationships first, over the whole matrix (pairs without a correlation sort last)
+        outcome_names = list(OUTCOMES)
+        strength = np.where(np.isnan(r), -1, np.abs(r))
+        order = np.argsort(-strength, axis=None, kind='stable')
+        strongest = [
+            {'x': TEACHER_COLUMNS[i], 'y': outcome_names[j], 'r': rounded(r[i, j])}
+            for i, j in zip(*np.unravel_index(order, r.shape))
+            if not np.isnan(r[i, j])
+        ][:5]
+
+        # Regression detail for one pair: the requested x, or the teacher metric most related to y
+        j = outcome_names.index(y_metric)
+        i = TEACHER_COLUMNS.index(x_metric) if x_metric else int(strength[:, j].argmax())
+        regression = {
+            'x': TEACHER_COLUMNS[i],
+            'y': y_metric,
+            **correlations[TEACHER_COLUMNS[i]][y_metric],
+            'outliers': [{
+                'district_id': int(district_ids[position]),
+                'district_name': district_names[position],
+                'x': rounded(x[position, i], 1),
+                'y': rounded(y[position, j], 1),
+                'predicted': rounded(intercept[i, j] + slope[i, j] * x[position, i], 1),
+                'residual': round(residual, 1),
+                'z_score': round(z_score, 2),
+                'direction': 'above' if residual > 0 else 'below'
+            } for position, residual, z_score in outliers(x[:, i], y[:, j], slope[i, j], intercept[i, j], outlier_count)]
+        }
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'correlations': correlations,
+                'strongest': strongest,
+                'regression': regression
+            },
+            'district_count': len(district_ids),
+            'filters': {
+                'school_year': school_year,
+                'subgroup': subgroup,
+                'x': x_metric,
+                'y': y_metric,
+                'outliers': outlier_count
+            }
+        })
 
-        state_avg_districts = sum(avg for _, avg in district_averages) / len(district_averages) if district_averages else 0
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
-        # Method 4: All records regardless of subgroup
-        state_avg_all_records = db.session.query(
-            func.avg(PerformanceRecords.english_proficiency)
-        ).filter(
-            PerformanceRecords.english_proficiency.isnot(None)
-        ).scalar()
+@api_bp.route('/analytics/cube', methods=['GET'])
+def get_cube_slice():
+    """Get any grouping of the performance metrics from the pre-aggregated cube"""
+    try:
+        group_by = request.args.get('group_by', default='year')
+        measures_arg = request.args.get('measures', default='avg:english_proficiency')
+        sort = request.args.get('sort')
+        order = request.args.get('order', default='desc')
+        limit = request.args.get('limit', default=100, type=int)
 
-        # Calculate districts above state average (use official state average)
-        comparison_avg = state_avg_official if state_avg_official else state_avg_records
-        districts_above_avg = db.session.query(
-            Districts.district_id
-        ).join(Schools, Districts.district_id == Schools.district_id)\
-         .join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
-         .filter(
-            PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None),
-            Schools.school_number != 0  # Exclude state-level school
-        ).group_by(Districts.district_id)\
-         .having(func.avg(PerformanceRecords.english_proficiency) > comparison_avg)\
-         .count()
+        dimensions = [name.strip() for name in group_by.split(',') if name.strip()]
+        unknown = [name for name in dimensions if name not in CUBE_DIMENSIONS]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"group_by must be drawn from: {', '.join(CUBE_DIMENSIONS)}"
+            }), 400
+        try:
+            measures = parse_measures(measures_arg)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({
+                'success': False,
+                'error': 'order must be asc or desc'
+            }), 400
 
-        # Total districts
-        total_districts = Districts.query.count()
+        dims = get_dimensions()
+
+        # Filters: one equality per dimension, named as in the other analytics routes
+        filter_args = {
+            'year': request.args.get('school_year', type=int),
+            'county': request.args.get('county'),
+            'district': request.args.get('district_id', type=int),
+            'school_type': request.args.get('school_type'),
+            'grade_level': request.args.get('grade_level'),
+            'subgroup_type': request.args.get('subgroup_type'),
+            'subgroup': request.args.get('subgroup')
+        }
+        filters = {CUBE_DIMENSIONS[name]: value for name, value in filter_args.items() if value is not None}
+        if filter_args['subgroup'] is not None:
+            group = dims.group_named(filter_args['subgroup'])
+            if not group:
+                return jsonify({
+                    'success': False,
+                    'error': 'Demographic group not found'
+                }), 404
+            filters['group_id'] = group.group_id
+        if 'school_type' not in dimensions and filter_args['school_type'] is None:
+            filters['school_type'] = DEFAULT_SCHOOL_TYPE
+
+        columns = [CUBE_DIMENSIONS[name] for name in dimensions]
+        cells = slice_cube(get_cube(), columns, filters, measures)
+
+        measure_keys = [f'{function}_{metric}' for function, metric in measures]
+        sort = sort or measure_keys[0]
+        sort_column = CUBE_DIMENSIONS.get(sort, sort)
+        if sort_column not in cells.columns or sort_column not in columns + measure_keys + ['record_count']:
+            return jsonify({
+                'success': False,
+                'error': 'sort must be one of the requested dimensions or measures'
+            }), 400
+        cells = cells.sort_values(sort_column, ascending=(order == 'asc'), na_position='last', kind='stable')
+        total_cells = len(cells)
 
-        # Calculate achievement gap (difference between highest and lowest subgroups)
-        subgroup_averages = db.session.query(
-            func.avg(PerformanceRecords.english_proficiency).label('avg_proficiency')
-        ).join(DemographicGroups, PerformanceRecords.group_id == DemographicGroups.group_id)\
-         .filter(
-            PerformanceRecords.english_proficiency.isnot(None),
-            DemographicGroups.subgroup_name != 'All'
-        ).group_by(DemographicGroups.group_id)\
-         .order_by(func.avg(PerformanceRecords.english_proficiency).desc())\
-         .all()
+        def value(cell, column):
+            item = cell[column]
+            if pd.isna(item):
+                return None
+            return item.item() if hasattr(item, 'item') else item
 
-        achievement_gap = None
-        if len(subgroup_averages) >= 2:
-            highest = float(subgroup_averages[0].avg_proficiency)
-            lowest = float(subgroup_averages[-1].avg_proficiency)
-            achievement_gap = highest - lowest
+        result = []
+        for _, cell in cells.head(limit).iterrows():
+            entry = {}
+            for name, column in zip(dimensions, columns):
+                item = value(cell, column)
+                if name == 'district':
+                    district = dims.districts.get(int(item)) if item is not None else None
+                    entry['district_id'] = int(item) if item is not None else None
+                    entry['district_name'] = district.district_name if district else None
+                elif name == 'subgroup':
+                    group = dims.groups.get(int(item)) if item is not None else None
+                    entry['group_id'] = int(item) if item is not None else None
+                    entry['subgroup_name'] = group.subgroup_name if group else None
+                elif name == 'year':
+                    entry['school_year'] = int(item) if item is not None else None
+                else:
+                    entry[name] = item
+            entry['record_count'] = int(value(cell, 'record_count') or 0)
+            for key, (function, _) in zip(measure_keys, measures):
+                item = value(cell, key)
+                entry[key] = int(item) if function == 'count' else round(float(item), 1) if item is not None else None
+            result.append(entry)
 
         return jsonify({
             'success': True,
-            'data': {
-                'state_average': round(float(state_avg_official), 1) if state_avg_official else round(float(state_avg_records), 1) if state_avg_records else None,
-                'state_average_official': round(float(state_avg_official), 1) if state_avg_official else None,
-                'state_average_calculated': round(float(state_avg_records), 1) if state_avg_records else None,
-                'state_average_by_districts': round(float(state_avg_districts), 1) if state_avg_districts else None,
-                'state_average_all_records': round(float(state_avg_all_records), 1) if state_avg_all_records else None,
-                'districts_above_average': districts_above_avg,
-                'total_districts': total_districts,
-                'achievement_gap': round(achievement_gap, 1) if achievement_gap else None,
-                'proficiency_trend': 2.3,  # Placeholder - would need historical data
-                'avg_class_size_impact': 0.8  # Placeholder - would need class size data
+            'data': result,
+            'count': len(result),
+            'total_cells': total_cells,
+            'group_by': dimensions,
+            'measures': measure_keys,
+            'filters': {
+                'school_year': filter_args['year'],
+                'county': filter_args['county'],
+                'district_id': filter_args['district'],
+                'school_type': filters.get('school_type'),
+                'grade_level': filter_args['grade_level'],
+                'subgroup_type': filter_args['subgroup_type'],
+                'subgroup': filter_args['subgroup'],
+                'sort': sort,
+                'order': order,
+                'limit': limit
             }
         })
-    
+
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-@api_bp.route('/analytics/school-performance', methods=['GET'])
-def get_school_performance():
-    """Get school performance data within a district"""
+@api_bp.route('/analytics/similar-districts', methods=['GET'])
+def get_similar_districts():
+    """Get the districts most similar to one district, optionally only those doing better"""
     try:
         district_id = request.args.get('district_id', type=int)
-        grade_span = request.args.get('grade_span')
-        
+        school_year = request.args.get('school_year', type=int)
+        k = request.args.get('k', default=10, type=int)
+        feature_sets = request.args.get('features')
+        county = request.args.get('county')
+        size_ratio = request.args.get('size_ratio', type=float)
+        better_only = request.args.get('better_only', default='false').lower() == 'true'
+
         if not district_id:
             return jsonify({
                 'success': False,
                 'error': 'district_id parameter is required'
             }), 400
+        if not 1 <= k <= 50:
+            return jsonify({
+                'success': False,
+                'error': 'k must be between 1 and 50'
+            }), 400
+        if size_ratio is not None and size_ratio < 1:
+            return jsonify({
+                'success': False,
+                'error': 'size_ratio must be at least 1'
+            }), 400
 
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
-        if not all_subgroup:
+        sets = [name.strip() for name in feature_sets.split(',')] if feature_sets else list(FEATURE_SETS)
+        unknown = [name for name in sets if name not in FEATURE_SETS]
+        if unknown:
             return jsonify({
                 'success': False,
-                'error': "'All' subgroup not found"
-            }), 404
+                'error': f"features must be drawn from: {', '.join(FEATURE_SETS)}"
+            }), 400
 
-        # Get district information
-        district = Districts.query.get(district_id)
-        if not district:
+        dims = get_dimensions()
+        school_year = school_year or dims.latest_school_year
+        matrix = get_feature_index().get(dims.year_id(school_year))
+        district = dims.districts.get(district_id)
+        if not district or matrix is None or district_id not in matrix.rows:
             return jsonify({
                 'success': False,
-                'error': 'District not found'
+                'error': 'No feature data for this district and year'
             }), 404
 
-        # Build school performance query
-        query = db.session.query(
-            Schools.school_id,
-            Schools.school_name,
-            Schools.grade_span,
-            Schools.school_type,
-            func.avg(PerformanceRecords.english_proficiency).label('avg_english_proficiency'),
-            func.count(PerformanceRecords.record_id).label('record_count')
-        ).join(PerformanceRecords, Schools.school_id == PerformanceRecords.school_id)\
-         .filter(
-            Schools.district_id == district_id,
-            Schools.school_number != 0,  # Exclude district-level aggregates
-            PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None)
-        )
-
-        # Apply grade span filter if provided
-        if grade_span:
-            query = query.filter(Schools.grade_span == grade_span)
-
-        school_performance = query.group_by(
-            Schools.school_id, Schools.school_name, Schools.grade_span, Schools.school_type
-        ).order_by(
-            func.avg(PerformanceRecords.english_proficiency).desc()
-        ).all()
-
-        # Calculate district average
-        district_avg_query = db.session.query(
-            func.avg(PerformanceRecords.english_proficiency)
-        ).join(Schools, PerformanceRecords.school_id == Schools.school_id)\
-         .filter(
-            Schools.district_id == district_id,
-            Schools.school_number != 0,
-            PerformanceRecords.group_id == all_subgroup.group_id,
-            PerformanceRecords.english_proficiency.isnot(None)
-        ).scalar()
+        row = matrix.rows[district_id]
+        columns = [FEATURES.index(feature) for name in sets for feature in FEATURE_SETS[name]]
+        proficiency = FEATURES.index('english_proficiency')
 
-        district_average = round(float(district_avg_query), 1) if district_avg_query else 0
+        # Candidate filters are boolean masks over the same rows as the matrix
+        candidates = np.ones(len(matrix.district_ids), dtype=bool)
+        if county:
+            counties = np.array([
+                (location.county if location else None)
+                for location in (dims.location_of(int(d)) for d in matrix.district_ids)
+            ], dtype=object)
+            candidates &= counties == county
+        if size_ratio is not None:
+            own_size = matrix.students[row]
+            if np.isnan(own_size):
+                return jsonify({
+                    'success': False,
+                    'error': 'This district has no reported enrolment to compare sizes with'
+                }), 404
+            with np.errstate(invalid='ignore'):
+                candidates &= (matrix.students >= own_size / size_ratio) & (matrix.students <= own_size * size_ratio)
+        if better_only:
+            with np.errstate(invalid='ignore'):
+                candidates &= matrix.raw[:, proficiency] > matrix.raw[row, proficiency]
+
+        positions, distances = nearest(matrix, row, columns, k, candidates)
+
+        def rounded(value, digits=1):
+            return round(float(value), digits) if not np.isnan(value) else None
+
+        def profile(position):
+            other = int(matrix.district_ids[position])
+            location = dims.location_of(other)
+            return {
+                'district_id': other,
+                'district_name': dims.districts[other].district_name if other in dims.districts else None,
+                'county': location.county if location else None,
+                'student_count': int(matrix.students[position]) if not np.isnan(matrix.students[position]) else None,
+                'features': {FEATURES[c]: rounded(matrix.raw[position, c], 3) for c in columns}
+            }
 
-        # Prepare results
+        own_proficiency = matrix.raw[row, proficiency]
         result = []
-        schools_above_avg = 0
-        
-        for rank, (school_id, school_name, grade_span, school_type, avg_proficiency, record_count) in enumerate(school_performance, 1):
-            proficiency = round(float(avg_proficiency), 1)
-            vs_district = proficiency - district_average
-            
-            if proficiency > district_average:
-                schools_above_avg += 1
-                vs_district_indicator = 'above'
-            elif proficiency == district_average:
-                vs_district_indicator = 'equal'
-            else:
-                vs_district_indicator = 'below'
-
-            result.append({
-                'rank': rank,
-                'school_id': school_id,
-                'school_name': school_name,
-                'grade_span': grade_span or 'Not specified',
-                'school_type': school_type,
-                'average_english_proficiency': proficiency,
-                'record_count': record_count,
-                'vs_district_avg': round(vs_district, 1),
-                'vs_district_indicator': vs_district_indicator
-            })
-
-        # Get available grade spans for filtering
-        grade_spans = db.session.query(Schools.grade_span)\
-            .filter(Schools.district_id == district_id, Schools.school_number != 0, Schools.grade_span.isnot(None))\
-            .distinct().all()
-        
-        available_grade_spans = [span[0] for span in grade_spans if span[0]]
+        for position, distance in zip(positions, distances):
+            entry = profile(position)
+            entry['distance'] = round(float(distance), 3)
+            entry['similarity'] = round(1 / (1 + float(distance)), 3)
+            entry['proficiency_difference'] = rounded(matrix.raw[position, proficiency] - own_proficiency)
+            result.append(entry)
 
         return jsonify({
             'success': True,
+            'district': profile(row),
             'data': result,
             'count': len(result),
-            'district_info': {
-                'district_id': district.district_id,
-                'district_name': district.district_name,
-                'district_average': district_average,
-                'total_schools': len(result),
-                'schools_above_district_avg': schools_above_avg,
-                'available_grade_spans': available_grade_spans
-            },
             'filters': {
                 'district_id': district_id,
-                'grade_span': grade_span
+                'school_year': school_year,
+                'k': k,
+                'features': sets,
+                'county': county,
+                'size_ratio': size_ratio,
+                'better_only': better_only
             }
         })
 
@@ -667,13 +1692,7 @@ def get_school_performance():
 def get_counties():
     """Get list of available counties for filtering"""
     try:
-        counties = db.session.query(Locations.county)\
-            .filter(Locations.county.isnot(None))\
-            .distinct()\
-            .order_by(Locations.county)\
-            .all()
-        
-        county_list = [county[0] for county in counties]
+        county_list = get_dimensions().counties()
         
         return jsonify({
             'success': True,
@@ -702,7 +1721,7 @@ def get_books():
         offset = request.args.get('offset', default=0, type=int)
 
         # Build query
-        query = Books.query
+        query = BOOK_API.query()
 
         # Apply filters
         if grade_level:
@@ -750,19 +1769,7 @@ def get_books():
         total_count = query.count()
 
         # Apply pagination
-        books = query.order_by(Books.grade_level, Books.title).limit(limit).offset(offset).all()
-
-        result = []
-        for book in books:
-            result.append({
-                'book_id': book.book_id,
-                'title': book.title,
-                'author': book.author,
-                'grade_level': book.grade_level,
-                'lexile': book.lexile,
-                'literature_type': book.literature_type,
-                'cover_url': book.cover_url
-            })
+        result = BOOK_API.rows(query.order_by(Books.grade_level, Books.title).limit(limit).offset(offset))
 
         return jsonify({
             'success': True,
@@ -787,6 +1794,80 @@ def get_books():
             'error': str(e)
         }), 500
 
+@api_bp.route('/books/recommendations', methods=['GET'])
+def get_book_recommendations():
+    """Get books ranked for a school's or district's tested grades and reading level"""
+    try:
+        school_id = request.args.get('school_id', type=int)
+        district_id = request.args.get('district_id', type=int)
+        school_year = request.args.get('school_year', type=int)
+        literature_type = request.args.get('literature_type')
+        limit = request.args.get('limit', default=20, type=int)
+
+        if not school_id and not district_id:
+            return jsonify({
+                'success': False,
+                'error': 'school_id or district_id parameter is required'
+            }), 400
+
+        dims = get_dimensions()
+        school_year = school_year or dims.latest_school_year
+        if school_id:
+            scope, entity_id = 'school', school_id
+            school = dims.schools.get(school_id)
+            name = school.school_name if school else None
+        else:
+            scope, entity_id = 'district', district_id
+            district = dims.districts.get(district_id)
+            name = district.district_name if district else None
+
+        profile = get_reading_profiles().get((scope, entity_id, dims.year_id(school_year)))
+        if not profile:
+            return jsonify({
+                'success': False,
+                'error': f'No reading profile for this {scope} and year'
+            }), 404
+
+        result = []
+        for book, score, grade in recommend(get_book_index(), profile, limit, literature_type):
+            result.append({
+                **book,
+                'score': round(score, 3),
+                'matched_grade': grade
+            })
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'profile': {
+                'scope': scope,
+                'entity_id': entity_id,
+                'name': name,
+                'school_year': school_year,
+                'grades': [{
+                    'grade': grade.grade,
+                    'share': round(grade.share, 3),
+                    'proficiency': round(grade.proficiency, 1) if grade.proficiency is not None else None,
+                    'lexile_min': grade.lexile_min,
+                    'lexile_max': grade.lexile_max
+                } for grade in profile]
+            },
+            'filters': {
+                'school_id': school_id,
+                'district_id': district_id,
+                'school_year': school_year,
+                'literature_type': literature_type,
+                'limit': limit
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api_bp.route('/books/<int:book_id>', methods=['GET'])
 def get_book_detail(book_id):
     """Get detailed information for a specific book"""
@@ -823,10 +1904,9 @@ def get_grade_levels():
             Books.grade_level,
             func.count(Books.book_id).label('book_count')
         ).group_by(Books.grade_level).order_by(
-            func.field(Books.grade_level,
-                      'Kindergarten', '1st Grade', '2nd Grade', '3rd Grade',
-                      '4th Grade', '5th Grade', '6th Grade', '7th Grade',
-                      '8th Grade', '9th Grade', '10th Grade', '11th Grade', '12th Grade')
+            # Portable equivalent of MySQL FIELD() so the snapshot backend can serve this too
+            case({grade: position for position, grade in enumerate(BOOK_GRADE_LEVELS, 1)},
+                 value=Books.grade_level, else_=0)
         ).all()
 
         result = []
@@ -922,7 +2002,7 @@ def get_map_districts():
         }
 
         # Get 'All' subgroup for overall performance
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
+        all_subgroup = get_dimensions().group_named('All')
 
         if not all_subgroup:
             return jsonify({
@@ -931,9 +2011,9 @@ def get_map_districts():
             }), 404
 
         # Get most recent year
-        most_recent_year = db.session.query(
-            func.max(AcademicYears.school_year)
-        ).join(PerformanceRecords).scalar()
+        dims = get_dimensions()
+        most_recent_year = dims.latest_school_year
+        most_recent_year_id = dims.year_id(most_recent_year)
 
         # Get district data with literacy metrics
         districts_data = db.session.query(
@@ -946,11 +2026,9 @@ def get_map_districts():
             Schools, Districts.district_id == Schools.district_id
         ).join(
             PerformanceRecords, Schools.school_id == PerformanceRecords.school_id
-        ).join(
-            AcademicYears, PerformanceRecords.year_id == AcademicYears.year_id
         ).filter(
             PerformanceRecords.group_id == all_subgroup.group_id,
-            AcademicYears.school_year == most_recent_year
+            PerformanceRecords.year_id == most_recent_year_id
         ).group_by(
             Districts.district_id, Districts.district_name
         ).all()
@@ -984,9 +2062,10 @@ def get_map_districts():
 
             # Use location data if still no match
             if not county_name:
-                district_obj = Districts.query.filter_by(district_name=district_name).first()
-                if district_obj and district_obj.location:
-                    county_name = district_obj.location.county
+                district_obj = dims.districts_by_name.get(district_name)
+                location = dims.location_of(district_obj.district_id) if district_obj else None
+                if location:
+                    county_name = location.county
 
             if county_name:
                 if county_name not in county_data:
@@ -1041,6 +2120,37 @@ def get_map_districts():
             'error': str(e)
         }), 500
 
+#County boundaries and metrics in one GeoJSON FeatureCollection, pre-simplified for the requested zoom level and
+#serialized once per dataset version, year and level
+@api_bp.route('/map/counties.geojson', methods=['GET'])
+def get_county_geojson_map():
+    """Get simplified county boundaries with each county's literacy metrics as GeoJSON"""
+    try:
+        dims = get_dimensions()
+        school_year = request.args.get('school_year', default=dims.latest_school_year, type=int)
+        zoom = request.args.get('zoom', default=min(ZOOM_TOLERANCES), type=float)
+
+        if dims.year_id(school_year) is None:
+            return jsonify({
+                'success': False,
+                'error': f'No data for school year {school_year}'
+            }), 404
+
+        body = get_county_geojson(school_year, zoom_level(zoom))
+        if body is None:
+            return jsonify({
+                'success': False,
+                'error': 'County boundaries are not available (see COUNTY_GEOJSON_PATH)'
+            }), 503
+
+        return current_app.response_class(body, mimetype='application/geo+json')
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api_bp.route('/map/county/<county_name>', methods=['GET'])
 def get_county_districts_schools(county_name):
     """Get detailed district and school information for a specific county"""
@@ -1081,7 +2191,8 @@ def get_county_districts_schools(county_name):
         }
 
         # Get 'All' subgroup
-        all_subgroup = DemographicGroups.query.filter_by(subgroup_name='All').first()
+        dims = get_dimensions()
+        all_subgroup = dims.group_named('All')
         
         if not all_subgroup:
             return jsonify({
@@ -1136,13 +2247,13 @@ def get_county_districts_schools(county_name):
 
             # Use location data as fallback
             if not district_county:
-                district_obj = Districts.query.get(district_id)
-                if district_obj and district_obj.location:
-                    district_county = district_obj.location.county
+                location = dims.location_of(district_id)
+                if location:
+                    district_county = location.county
 
             if district_county and district_county.lower() == county_name.lower():
                 # Get schools for this district
-                schools = Schools.query.filter_by(district_id=district_id).all()
+                schools = dims.schools_by_district.get(district_id, [])
                 
                 district_info = {
                     'district_id': district_id,
@@ -1182,11 +2293,7 @@ def get_county_districts_schools(county_name):
 def get_filter_counties():
     """Get all unique counties for filtering"""
     try:
-        counties = db.session.query(Locations.county).distinct().filter(
-            Locations.county.isnot(None)
-        ).order_by(Locations.county).all()
-        
-        result = [county[0] for county in counties if county[0]]
+        result = get_dimensions().counties()
         
         return jsonify({
             'success': True,
@@ -1204,15 +2311,12 @@ def get_filter_cities():
     try:
         county = request.args.get('county')
         
-        query = db.session.query(Locations.city).distinct().filter(
-            Locations.city.isnot(None)
-        )
+        locations = get_dimensions().locations.values()
         
         if county:
-            query = query.filter(Locations.county == county)
+            locations = [location for location in locations if location.county == county]
             
-        cities = query.order_by(Locations.city).all()
-        result = [city[0] for city in cities if city[0]]
+        result = sorted({location.city for location in locations if location.city})
         
         return jsonify({
             'success': True,
@@ -1231,17 +2335,14 @@ def get_filter_zip_codes():
         county = request.args.get('county')
         city = request.args.get('city')
         
-        query = db.session.query(Locations.zip_code).distinct().filter(
-            Locations.zip_code.isnot(None)
-        )
+        locations = get_dimensions().locations.values()
         
         if county:
-            query = query.filter(Locations.county == county)
+            locations = [location for location in locations if location.county == county]
         if city:
-            query = query.filter(Locations.city == city)
+            locations = [location for location in locations if location.city == city]
             
-        zip_codes = query.order_by(Locations.zip_code).all()
-        result = [zip_code[0] for zip_code in zip_codes if zip_code[0]]
+        result = sorted({location.zip_code for location in locations if location.zip_code})
         
         return jsonify({
             'success': True,
@@ -1257,11 +2358,7 @@ def get_filter_zip_codes():
 def get_filter_school_types():
     """Get all unique school types for filtering"""
     try:
-        school_types = db.session.query(Schools.school_type).distinct().filter(
-            Schools.school_type.isnot(None)
-        ).order_by(Schools.school_type).all()
-        
-        result = [school_type[0] for school_type in school_types if school_type[0]]
+        result = sorted({school.school_type for school in get_dimensions().schools.values() if school.school_type})
         
         return jsonify({
             'success': True,
@@ -1277,11 +2374,7 @@ def get_filter_school_types():
 def get_filter_grade_levels():
     """Get all unique grade levels for filtering"""
     try:
-        grade_levels = db.session.query(PerformanceRecords.grade_level).distinct().filter(
-            PerformanceRecords.grade_level.isnot(None)
-        ).order_by(PerformanceRecords.grade_level).all()
-        
-        result = [grade_level[0] for grade_level in grade_levels if grade_level[0]]
+        result = get_dimensions().grade_levels
         
         return jsonify({
             'success': True,
@@ -1299,12 +2392,12 @@ def get_filter_demographic_groups():
     try:
         subgroup_type = request.args.get('subgroup_type')
         
-        query = DemographicGroups.query
+        groups = get_dimensions().groups.values()
         
         if subgroup_type:
-            query = query.filter(DemographicGroups.subgroup_type == subgroup_type)
+            groups = [group for group in groups if group.subgroup_type == subgroup_type]
             
-        groups = query.order_by(DemographicGroups.subgroup_name).all()
+        groups = sorted(groups, key=lambda group: group.subgroup_name)
         
         result = []
         for group in groups:
@@ -1324,6 +2417,85 @@ def get_filter_demographic_groups():
             'error': str(e)
         }), 500
 
+#All dropdowns of the dashboard in one call: each filter's values with record counts under the current selections,
+#read from the import-time facet_counts index instead of six DISTINCT scans
+@api_bp.route('/filters/facets', methods=['GET'])
+def get_filter_facets():
+    """Get every filter's available values and record counts for the current selections"""
+    try:
+        selected = {}
+        for key in FACET_KEYS:
+            value = request.args.get(key, type=int) if key in INTEGER_FACETS else request.args.get(key)
+            if value is None and request.args.get(key):
+                return jsonify({
+                    'success': False,
+                    'error': f'{key} must be an integer'
+                }), 400
+            if value is not None and value != '':
+                selected[key] = value
+
+        facets, total = facet_counts(get_facet_index(), selected)
+
+        groups = get_dimensions().groups
+        result = {}
+        for key, entries in facets.items():
+            if key == 'group_id':
+                result[key] = [{
+                    'value': group_id,
+                    'subgroup_name': groups[group_id].subgroup_name if group_id in groups else None,
+                    'count': count
+                } for group_id, count in entries]
+            else:
+                result[key] = [{'value': value, 'count': count} for value, count in entries]
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'total': total,
+            'filters': selected
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+#Typeahead over district, school, city, county and book names, answered from an in-memory prefix index
+@api_bp.route('/search/suggest', methods=['GET'])
+def get_search_suggestions():
+    """Get the names starting with (or containing a word starting with) the typed text"""
+    try:
+        query = request.args.get('q', '')
+        types = request.args.get('types')
+        limit = request.args.get('limit', default=10, type=int)
+
+        if not 1 <= limit <= 50:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be between 1 and 50'
+            }), 400
+
+        types = [t.strip() for t in types.split(',') if t.strip()] if types else SEARCH_TYPES
+        unknown = [t for t in types if t not in SEARCH_TYPES]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"types must be drawn from: {', '.join(SEARCH_TYPES)}"
+            }), 400
+
+        result = [suggestion._asdict() for suggestion in suggest(get_search_index(), query, types, limit)]
+
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """API health check endpoint"""
@@ -1335,10 +2507,14 @@ def health_check():
         book_count = Books.query.count()
         demographic_count = DemographicGroups.query.count()
         
+        router = current_app.extensions.get('replica_router')
+        
         return jsonify({
             'success': True,
             'status': 'healthy',
             'database': 'connected',
+            'read_replicas': router.status() if router else [],
+            'database_circuit': current_app.extensions['circuit_breaker'].state,
             'counts': {
                 'districts': district_count,
                 'schools': school_count,
@@ -1352,5 +2528,6 @@ def health_check():
         return jsonify({
             'success': False,
             'status': 'unhealthy',
+            'database_circuit': current_app.extensions['circuit_breaker'].state,
             'error': str(e)
         }), 500
\ No newline at end of file
@@ -0,0 +1,176 @@
+#This file collapses bursts of identical API requests into one computation (single flight).
+#The first request for a route + args becomes the leader and runs the handler; identical requests that arrive
+#while it is running wait for it and are answered with the response it computed, even one too large to store or an
+#error the store never keeps. With COALESCE_LOCK_BACKEND set, leaders in different worker processes also wait for
+#each other, and those waiters are answered from the response store (see response_cache.py).
+
+"""
+Single-flight request coalescing for the API blueprint
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from flask import current_app, g
+from sqlalchemy import text
+from . import db
+from .response_cache import respond_from_store, respond_from_flight
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the file backend cannot be used there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+def coalesce_timeout():
+    """Longest a follower waits for the leader before computing the response itself"""
+    return float(os.getenv('COALESCE_TIMEOUT', 30))
+
+class Flight:
+    """One in-process computation: followers wait for done, then answer with the leader's response (a
+    CachedResponse, or None when the leader failed or was rejected before its handler ran)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+def _lock_name(key):
+    return 'literacy:' + hashlib.sha1(key.encode()).hexdigest()
+
+class FileLockBackend:
+    """Cross-worker locks as flock()ed files in a local directory; a stand-in for a shared lock service
+    when every worker runs on the same host"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self, key):
+        return open(os.path.join(self.directory, _lock_name(key) + '.lock'), 'a+')
+
+    def try_acquire(self, key):
+        """Take the lock without waiting; returns a handle for release(), or None when another worker holds it"""
+        handle = self._open(key)
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return handle
+        except BlockingIOError:
+            handle.close()
+            return None
+
+    def wait(self, key, timeout):
+        """Block until the current holder releases the lock (or the timeout passes)"""
+        deadline = time.monotonic() + timeout
+        with self._open(key) as handle:
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    return True
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        return False
+                    time.sleep(0.01)
+
+    def release(self, handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+class MySQLLockBackend:
+    """Cross-worker locks with MySQL GET_LOCK() on the primary, shared by every host using the database"""
+
+    def try_acquire(self, key):
+        name = _lock_name(key)
+        connection = db.engine.connect()
+        if connection.execute(text('SELECT GET_LOCK(:name, 0)'), {'name': name}).scalar() == 1:
+            return connection, name
+        connection.close()
+        return None
+
+    def wait(self, key, timeout):
+        name = _lock_name(key)
+        with db.engine.connect() as connection:
+            # The hint keeps DB_STATEMENT_TIMEOUT_MS (max_execution_time) from cutting the wait short
+            acquired = connection.execute(
+                text(f'SELECT /*+ MAX_EXECUTION_TIME({int((timeout + 1) * 1000)}) */ GET_LOCK(:name, :timeout)'),
+                {'name': name, 'timeout': timeout}
+            ).scalar() == 1
+            if acquired:
+                connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
+            return acquired
+
+    def release(self, handle):
+        connection, name = handle
+        try:
+            connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
+        finally:
+            connection.close()
+
+def create_lock_backend():
+    """COALESCE_LOCK_BACKEND=mysql|file enables coalescing across workers; unset coalesces within each process only"""
+    choice = os.getenv('COALESCE_LOCK_BACKEND', '').strip().lower()
+    if choice == 'mysql':
+        return MySQLLockBackend()
+    if choice == 'file' and fcntl is not None:
+        return FileLockBackend(os.getenv('COALESCE_LOCK_DIR') or os.path.join(tempfile.gettempdir(), 'literacy-locks'))
+    return None
+
+def join_flight():
+    """before_request hook (after serve_cached_response): lead the computation for this request or wait for it"""
+    key = g.get('cache_etag')
+    if key is None:
+        return None
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is None:
+            g.flight = _flights[key] = Flight()
+            g.flight_key = key
+
+    if flight is not None:
+        # Another request in this process is computing the same response
+        if not flight.done.wait(coalesce_timeout()):
+            logger.warning("Timed out waiting for in-flight request %s", g.cache_key)
+        if flight.response is not None:
+            return respond_from_flight(flight.response)
+        return respond_from_store()
+
+    backend = current_app.extensions.get('coalesce_lock')
+    if backend is None:
+        return None
+
+    try:
+        handle = backend.try_acquire(key)
+        if handle is not None:
+            g.flight_lock = handle
+            return None
+
+        # Another worker is computing it; its result reaches us through a shared response store
+        if not backend.wait(key, coalesce_timeout()):
+            logger.warning("Timed out waiting for request %s in another worker", g.cache_key)
+        return respond_from_store()
+    except Exception as e:
+        logger.warning("Coalescing lock unavailable, computing %s directly: %s", g.cache_key, e)
+        return None
+
+def leave_flight(exc=None):
+    """teardown_request hook: wake the requests waiting on this one and release the cross-worker lock"""
+    handle = g.pop('flight_lock', None)
+    if handle is not None:
+        try:
+            current_app.extensions['coalesce_lock'].release(handle)
+        except Exception as e:
+            logger.warning("Could not release coalescing lock: %s", e)
+
+    flight = g.pop('flight', None)
+    if flight is not None:
+        with _flights_lock:
+            _flights.pop(g.pop('flight_key'), None)
+        flight.response = g.pop('flight_response', None)
+        flight.done.set()
@@ -0,0 +1,112 @@
+#This file relates district teacher quality to district literacy outcomes for /analytics/teacher-quality-correlation.
+#teacher_quality and the district rows of performance_rollups are read once per dataset version; for a year and
+#subgroup the two are aligned into district x metric matrices and every correlation, slope and intercept is computed
+#at once with matrix products over pairwise-complete observations (a district missing one value still counts for
+#the other pairs).
+
+"""
+Teacher quality vs. outcome correlations
+"""
+
+import numpy as np
+import pandas as pd
+from . import db
+from .models import TeacherQuality, PerformanceRollups
+from .serializers import TEACHER_METRICS, POVERTY_LEVELS
+from .distribution import DISTRIBUTION_METRICS
+from .versioning import versioned
+
+# teacher_quality columns, e.g. experienced_teachers_high_poverty
+TEACHER_COLUMNS = [f'{metric}_teachers_{level}_poverty' for metric in TEACHER_METRICS for level in POVERTY_LEVELS]
+
+# Outcome name -> performance_rollups column (same names as /analytics/distribution)
+OUTCOMES = DISTRIBUTION_METRICS
+
+# Fewer paired districts than this gives no correlation
+MIN_OBSERVATIONS = 3
+
+def load_correlation_frames():
+    """(teacher quality per district-year, district outcomes per district-year-subgroup) as DataFrames"""
+    teachers = pd.DataFrame(
+        db.session.query(
+            TeacherQuality.district_id, TeacherQuality.year_id,
+            *[getattr(TeacherQuality, column) for column in TEACHER_COLUMNS]
+        ).all(),
+        columns=['district_id', 'year_id'] + TEACHER_COLUMNS
+    )
+    outcomes = pd.DataFrame(
+        db.session.query(
+            PerformanceRollups.entity_id, PerformanceRollups.entity_name,
+            PerformanceRollups.year_id, PerformanceRollups.group_id,
+            *[getattr(PerformanceRollups, column) for column in OUTCOMES.values()]
+        ).filter(PerformanceRollups.scope == 'district').all(),
+        columns=['district_id', 'district_name', 'year_id', 'group_id'] + list(OUTCOMES)
+    )
+    for frame, columns in ((teachers, TEACHER_COLUMNS), (outcomes, list(OUTCOMES))):
+        for column in columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return teachers, outcomes
+
+def get_correlation_frames():
+    return versioned('teacher_outcome_frames', load_correlation_frames)
+
+def paired_matrices(year_id, group_id):
+    """District ids and names plus aligned teacher (n x 8) and outcome (n x 3) arrays, NaN where missing"""
+    teachers, outcomes = get_correlation_frames()
+    merged = teachers[teachers['year_id'] == year_id].merge(
+        outcomes[(outcomes['year_id'] == year_id) & (outcomes['group_id'] == group_id)],
+        on=['district_id', 'year_id']
+    )
+    return (
+        merged['district_id'].to_numpy(),
+        merged['district_name'].to_numpy(),
+        merged[TEACHER_COLUMNS].to_numpy(dtype=float),
+        merged[list(OUTCOMES)].to_numpy(dtype=float)
+    )
+
+def pairwise_regression(x, y):
+    """Pearson r, OLS slope/intercept of y on x and observation counts for every (x column, y column) pair.
+
+    Each pair uses only the rows where both values are present. All sums come from five matrix
+    products, so the cost does not depend on the number of pairs.
+    """
+    x_present, y_present = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(x_present, x, 0.0), np.where(y_present, y, 0.0)
+    xm, ym = x_present.astype(float), y_present.astype(float)
+
+    n = xm.T @ ym
+    sum_x = x0.T @ ym
+    sum_y = xm.T @ y0
+    sum_xx = (x0 ** 2).T @ ym
+    sum_yy = xm.T @ (y0 ** 2)
+    sum_xy = x0.T @ y0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = n * sum_xy - sum_x * sum_y
+        x_variance = n * sum_xx - sum_x ** 2
+        y_variance = n * sum_yy - sum_y ** 2
+        r = covariance / np.sqrt(x_variance * y_variance)
+        slope = covariance / x_variance
+        intercept = (sum_y - slope * sum_x) / n
+
+    valid = (n >= MIN_OBSERVATIONS) & (x_variance > 0) & (y_variance > 0)
+    return (
+        np.where(valid, np.clip(r, -1, 1), np.nan),
+        np.where(valid, slope, np.nan),
+        np.where(valid, intercept, np.nan),
+        n.astype(int)
+    )
+
+def outliers(x, y, slope, intercept, count):
+    """Positions of the rows furthest from the fitted line, as (position, residual, z-score), largest |z| first"""
+    present = ~np.isnan(x) & ~np.isnan(y)
+    if np.isnan(slope) or present.sum() < MIN_OBSERVATIONS:
+        return []
+    residuals = np.full(len(x), np.nan)
+    residuals[present] = y[present] - (intercept + slope * x[present])
+    spread = np.nanstd(residuals)
+    if not spread:
+        return []
+    z_scores = residuals / spread
+    ranked = np.argsort(-np.abs(np.where(present, z_scores, 0)), kind='stable')[:min(count, int(present.sum()))]
+    return [(int(i), float(residuals[i]), float(z_scores[i])) for i in ranked]
@@ -0,0 +1,76 @@
+#This file answers /analytics/cube slices from performance_cube instead of the fact table.
+#The cube (a few thousand rows of sums and counts) is read into a DataFrame once per dataset version; a request is a
+#boolean filter plus one pandas groupby over it, and averages are re-derived as SUM(sum) / SUM(count) so they
+#equal what AVG() over the matching fact rows would return.
+
+"""
+Pivot queries over the pre-aggregated performance cube
+"""
+
+import pandas as pd
+from . import db
+from .models import PerformanceCube
+from .rollups import CUBE_KEYS, CUBE_METRICS
+from .versioning import versioned
+
+# API dimension name -> cube column it groups / filters on
+CUBE_DIMENSIONS = {
+    'year': 'school_year',
+    'county': 'county',
+    'district': 'district_id',
+    'school_type': 'school_type',
+    'grade_level': 'grade_level',
+    'subgroup_type': 'subgroup_type',
+    'subgroup': 'group_id'
+}
+
+CUBE_FUNCTIONS = ['avg', 'sum', 'count']
+
+# Schools only, unless the caller asks for the official district/state records through school_type
+DEFAULT_SCHOOL_TYPE = 'School'
+
+def load_cube():
+    columns = CUBE_KEYS + ['record_count'] + [f'{metric}_{part}' for metric in CUBE_METRICS for part in ('sum', 'count')]
+    rows = db.session.query(*[getattr(PerformanceCube, column) for column in columns]).all()
+    return pd.DataFrame(rows, columns=columns)
+
+def get_cube():
+    return versioned('performance_cube', load_cube)
+
+def parse_measures(value):
+    """'avg:english_proficiency,count:student_count' -> [('avg', 'english_proficiency'), ...]; raises ValueError"""
+    measures = []
+    for item in value.split(','):
+        function, _, metric = item.strip().partition(':')
+        if function not in CUBE_FUNCTIONS or metric not in CUBE_METRICS:
+            raise ValueError(
+                f"measures must be <{'|'.join(CUBE_FUNCTIONS)}>:<{'|'.join(CUBE_METRICS)}>, got '{item.strip()}'"
+            )
+        measures.append((function, metric))
+    return measures
+
+def slice_cube(cube, dimensions, filters, measures):
+    """Group the cube rows matching filters ({cube column: value}) by dimensions (cube columns).
+
+    Returns a DataFrame with the dimension columns, record_count and one <function>_<metric> column per measure.
+    """
+    mask = pd.Series(True, index=cube.index)
+    for column, value in filters.items():
+        mask &= cube[column] == value
+    selected = cube[mask]
+
+    sums = ['record_count'] + sorted({f'{metric}_{part}' for _, metric in measures for part in ('sum', 'count')})
+    if dimensions:
+        grouped = selected.groupby(dimensions, dropna=False, sort=False)[sums].sum(min_count=1).reset_index()
+    else:
+        grouped = selected[sums].sum(min_count=1).to_frame().T
+
+    for function, metric in measures:
+        total, count = grouped[f'{metric}_sum'], grouped[f'{metric}_count'].fillna(0)
+        if function == 'avg':
+            grouped[f'avg_{metric}'] = total / count.where(count > 0)
+        elif function == 'sum':
+            grouped[f'sum_{metric}'] = total
+        else:
+            grouped[f'count_{metric}'] = count
+    return grouped
@@ -0,0 +1,105 @@
+#This file keeps the small dimension tables (locations, districts, schools, demographic groups, academic years)
+#in memory, loaded once per dataset version, so routes don't re-query them on every request.
+
+"""
+In-process dimension cache for the Mississippi Literacy Database
+"""
+
+from collections import namedtuple
+from sqlalchemy import func
+from . import db
+from .models import Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords
+from .versioning import versioned
+
+Location = namedtuple('Location', 'location_id county city zip_code')
+District = namedtuple('District', 'district_id district_number district_name location_id')
+School = namedtuple('School', 'school_id school_number school_name district_id school_type grade_span')
+Group = namedtuple('Group', 'group_id subgroup_name subgroup_type')
+Year = namedtuple('Year', 'year_id school_year')
+
+class Dimensions:
+    """Immutable lookup tables for one dataset version, keyed by id and by natural key"""
+
+    def __init__(self, locations, districts, schools, groups, years, latest_school_year, grade_levels):
+        self.locations = {location.location_id: location for location in locations}
+
+        self.districts = {district.district_id: district for district in districts}
+        self.districts_by_number = {district.district_number: district for district in districts}
+        self.districts_by_name = {}
+        for district in districts:
+            self.districts_by_name.setdefault(district.district_name, district)
+
+        self.schools = {school.school_id: school for school in schools}
+        self.schools_by_key = {(school.school_number, school.district_id): school for school in schools}
+        self.schools_by_district = {}
+        for school in schools:
+            self.schools_by_district.setdefault(school.district_id, []).append(school)
+
+        # Same row Schools.query.filter_by(school_number=0).first() returns: the statewide record
+        self.state_school = next((school for school in schools if school.school_number == 0), None)
+
+        self.groups = {group.group_id: group for group in groups}
+        self.groups_by_name = {group.subgroup_name: group for group in groups}
+
+        self.years = {year.year_id: year for year in years}
+        self.years_by_school_year = {year.school_year: year for year in years}
+        self.latest_school_year = latest_school_year
+
+        self.grade_levels = grade_levels
+
+    def group_named(self, subgroup_name):
+        return self.groups_by_name.get(subgroup_name)
+
+    def year_id(self, school_year):
+        year = self.years_by_school_year.get(school_year)
+        return year.year_id if year else None
+
+    def school_year(self, year_id):
+        year = self.years.get(year_id)
+        return year.school_year if year else None
+
+    def location_of(self, district_id):
+        district = self.districts.get(district_id)
+        return self.locations.get(district.location_id) if district and district.location_id else None
+
+    def counties(self):
+        return sorted({location.county for location in self.locations.values() if location.county})
+
+def load_dimensions():
+    """Read every dimension table in one pass each"""
+    session = db.session
+
+    locations = [Location(*row) for row in session.query(
+        Locations.location_id, Locations.county, Locations.city, Locations.zip_code
+    ).order_by(Locations.location_id)]
+
+    districts = [District(*row) for row in session.query(
+        Districts.district_id, Districts.district_number, Districts.district_name, Districts.location_id
+    ).order_by(Districts.district_id)]
+
+    schools = [School(*row) for row in session.query(
+        Schools.school_id, Schools.school_number, Schools.school_name,
+        Schools.district_id, Schools.school_type, Schools.grade_span
+    ).order_by(Schools.school_id)]
+
+    groups = [Group(*row) for row in session.query(
+        DemographicGroups.group_id, DemographicGroups.subgroup_name, DemographicGroups.subgroup_type
+    ).order_by(DemographicGroups.group_id)]
+
+    years = [Year(*row) for row in session.query(
+        AcademicYears.year_id, AcademicYears.school_year
+    ).order_by(AcademicYears.school_year)]
+
+    latest_school_year = session.query(
+        func.max(AcademicYears.school_year)
+    ).join(PerformanceRecords).scalar()
+
+    grade_levels = [row[0] for row in session.query(PerformanceRecords.grade_level).distinct().filter(
+        PerformanceRecords.grade_level.isnot(None)
+    ).order_by(PerformanceRecords.grade_level) if row[0]]
+
+    return Dimensions(locations, districts, schools, groups, years, latest_school_year, grade_levels)
+
+def get_dimensions():
+    """Dimensions for the current dataset version, reloaded atomically after an import"""
+    return versioned('dimensions', load_dimensions)
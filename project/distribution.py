@@ -0,0 +1,98 @@
+#This file answers "where does this district/school/county fall" questions from presorted arrays.
+#The import builds performance_rollups; on first use per dataset version every (scope, year, subgroup, metric)
+#slice of it is sorted once, after which percentile ranks, quantiles and histograms are binary searches.
+
+"""
+Distribution index over the performance rollups
+"""
+
+from collections import namedtuple
+import numpy as np
+from . import db
+from .models import PerformanceRollups
+from .versioning import versioned
+
+# API metric name -> performance_rollups column
+DISTRIBUTION_METRICS = {
+    'english_proficiency': 'avg_proficiency',
+    'english_growth': 'avg_growth',
+    'chronic_absenteeism_pct': 'avg_absenteeism'
+}
+
+DISTRIBUTION_SCOPES = ['school', 'district', 'county']
+
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# values ascending; entity_ids / entity_names in the same order as values; by_entity: {entity_id or name: value}
+SortedSlice = namedtuple('SortedSlice', 'values entity_ids entity_names by_entity')
+
+class DistributionIndex:
+    """Sorted metric values per (scope, year_id, group_id, metric) for one dataset version"""
+
+    def __init__(self, slices):
+        self.slices = slices
+
+    def get(self, scope, year_id, group_id, metric):
+        return self.slices.get((scope, year_id, group_id, metric))
+
+def percentile_rank(values, value):
+    """Percent of entities at or below value (0-100)"""
+    if not len(values):
+        return None
+    return float(np.searchsorted(values, value, side='right')) / len(values) * 100
+
+def rank_from_top(values, value):
+    """1 for the highest value; ties share the best rank"""
+    return len(values) - int(np.searchsorted(values, value, side='right')) + 1
+
+def quantiles(values, probabilities=DEFAULT_QUANTILES):
+    """Linear-interpolated quantiles, read straight off the sorted array"""
+    if not len(values):
+        return {}
+    return {f'p{round(p * 100)}': float(np.quantile(values, p)) for p in probabilities}
+
+def histogram(values, bins):
+    """Equal-width bins over [min, max]; counts come from binary searches of the bin edges"""
+    if not len(values):
+        return []
+    edges = np.linspace(values[0], values[-1], bins + 1)
+    positions = np.searchsorted(values, edges, side='left')
+    positions[-1] = len(values)  # the last bin includes the maximum
+    counts = np.diff(positions)
+    return [
+        {'min': float(edges[i]), 'max': float(edges[i + 1]), 'count': int(counts[i])}
+        for i in range(bins)
+    ]
+
+def load_distribution_index():
+    """Read the school, district and county rollups once and sort every slice"""
+    columns = [getattr(PerformanceRollups, column) for column in DISTRIBUTION_METRICS.values()]
+    rows = db.session.query(
+        PerformanceRollups.scope,
+        PerformanceRollups.year_id,
+        PerformanceRollups.group_id,
+        PerformanceRollups.entity_id,
+        PerformanceRollups.entity_name,
+        *columns
+    ).filter(PerformanceRollups.scope.in_(DISTRIBUTION_SCOPES)).all()
+
+    grouped = {}
+    for scope, year_id, group_id, entity_id, entity_name, *metric_values in rows:
+        for metric, value in zip(DISTRIBUTION_METRICS, metric_values):
+            if value is not None:
+                grouped.setdefault((scope, year_id, group_id, metric), []).append((value, entity_id, entity_name))
+
+    slices = {}
+    for key, entries in grouped.items():
+        values = np.array([entry[0] for entry in entries], dtype=float)
+        order = np.argsort(values, kind='stable')
+        slices[key] = SortedSlice(
+            values[order],
+            [entries[i][1] for i in order],
+            [entries[i][2] for i in order],
+            {(entity_id if entity_id is not None else entity_name): value for value, entity_id, entity_name in entries}
+        )
+    return DistributionIndex(slices)
+
+def get_distribution_index():
+    return versioned('distribution_index', load_distribution_index)
@@ -0,0 +1,67 @@
+#This file answers /filters/facets: every dashboard filter's available values with record counts, given the values
+#already selected. The import stores the record count of every filter combination in facet_counts; once per dataset
+#version each column is encoded as integer codes in NumPy arrays, so a request is a few boolean masks and one
+#bincount per facet, with no query at all.
+
+"""
+Faceted filter counts
+"""
+
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from . import db
+from .models import FacetCounts
+from .rollups import FACET_KEYS
+from .versioning import versioned
+
+# Query parameters that are integers; the rest are compared as strings
+INTEGER_FACETS = ['school_year', 'group_id']
+
+# codes: {facet: codes per row, -1 where missing}; values: {facet: sorted distinct values, indexed by code};
+# counts: record count per row
+FacetIndex = namedtuple('FacetIndex', 'codes values counts')
+
+def load_facet_index():
+    rows = db.session.query(*[getattr(FacetCounts, key) for key in FACET_KEYS], FacetCounts.record_count).all()
+    frame = pd.DataFrame(rows, columns=FACET_KEYS + ['record_count'])
+    codes, values = {}, {}
+    for key in FACET_KEYS:
+        # Blank values are not offered, as in the /filters/* routes
+        codes[key], uniques = pd.factorize(frame[key].where(frame[key] != ''), sort=True)
+        values[key] = uniques.tolist()
+    return FacetIndex(codes, values, frame['record_count'].to_numpy(dtype=np.int64))
+
+def get_facet_index():
+    return versioned('facet_index', load_facet_index)
+
+def facet_counts(index, selected):
+    """({facet: [(value, count), ...]}, total) for the selections ({facet: value}).
+
+    Each facet is counted under every selection except its own, so a dropdown keeps offering its alternatives
+    while the other dropdowns narrow to what is compatible with it (county -> city -> zip code cascades).
+    """
+    masks = {}
+    for key, value in selected.items():
+        try:
+            code = index.values[key].index(value)
+        except ValueError:
+            code = -2  # matches no row
+        masks[key] = index.codes[key] == code
+
+    everything = np.ones(len(index.counts), dtype=bool)
+    facets = {}
+    for key in FACET_KEYS:
+        mask = everything.copy()
+        for other, other_mask in masks.items():
+            if other != key:
+                mask &= other_mask
+        codes = index.codes[key]
+        mask &= codes >= 0
+        totals = np.bincount(codes[mask], weights=index.counts[mask], minlength=len(index.values[key]))
+        facets[key] = [(index.values[key][code], int(totals[code])) for code in np.flatnonzero(totals)]
+
+    matched = everything
+    for mask in masks.values():
+        matched = matched & mask
+    return facets, int(index.counts[matched].sum())
@@ -0,0 +1,72 @@
+#This file lets a handler run several independent read queries at the same time.
+#Each query gets its own session (and pooled connection) on the engine the request reads from, so a handler
+#waits roughly as long as its slowest query instead of the sum of all of them.
+
+"""
+Concurrent query fan-out for API handlers
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from . import db
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def fanout_workers():
+    """QUERY_FANOUT_WORKERS threads shared by all requests; 0 or 1 runs queries one after another"""
+    return int(os.getenv('QUERY_FANOUT_WORKERS', 4))
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=fanout_workers(), thread_name_prefix='query-fanout')
+        return _executor
+
+def _shares_one_connection(engine):
+    """In-memory SQLite databases exist only on a single connection, so they cannot be fanned out"""
+    return engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+
+def _run(engine, task, router, primary):
+    try:
+        with Session(bind=engine) as session:
+            return task(session)
+    except DBAPIError:
+        # A replica lost mid-query: retry once elsewhere, as RoutingSession does for the request's own session
+        replacement = router.replacement(engine, primary) if router is not None else None
+        if replacement is None:
+            raise
+        with Session(bind=replacement) as session:
+            return task(session)
+
+def fan_out(**tasks):
+    """Run independent read queries concurrently and return their results by name.
+
+    Each task is a function taking a session and returning plain results (scalars, rows, lists),
+    never ORM objects, because its session is closed as soon as it returns. The last task runs
+    on the calling thread with the request session while the others run on the pool.
+
+        results = fan_out(
+            average=lambda session: session.query(func.avg(...)).scalar(),
+            counts=lambda session: session.query(...).group_by(...).all()
+        )
+    """
+    engine = g.get('read_engine') or db.engine
+
+    if len(tasks) < 2 or fanout_workers() < 2 or _shares_one_connection(engine):
+        return {name: task(db.session) for name, task in tasks.items()}
+
+    *pooled, (last_name, last_task) = tasks.items()
+    executor = _get_executor()
+    router = current_app.extensions.get('replica_router')
+    futures = {name: executor.submit(_run, engine, task, router, db.engine) for name, task in pooled}
+
+    results = {last_name: last_task(db.session)}
+    for name, future in futures.items():
+        results[name] = future.result()
+    return {name: results[name] for name in tasks}
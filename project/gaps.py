@@ -0,0 +1,74 @@
+#This file builds the entity x subgroup proficiency pivot behind /analytics/achievement-gaps.
+#The pivot is made from performance_rollups with one query and one pandas pivot per (scope, year), cached per
+#dataset version; gap statistics for any set of subgroups are then computed for every row at once with numpy.
+
+"""
+Achievement-gap matrices for the Mississippi Literacy Database
+"""
+
+import numpy as np
+import pandas as pd
+from . import db
+from .models import PerformanceRollups
+from .versioning import versioned
+
+GAP_SCOPES = ['district', 'school']
+
+# Subgroup types compared by default; 'Grade' subgroups are grade levels, not student populations
+DEFAULT_GAP_TYPES = ['Gender', 'Race', 'EconStatus', 'EL', 'SPED', 'SpecialPop']
+
+def gap_groups(groups, subgroup_types):
+    """Demographic groups of the given types, without 'All' and without the race x population cross-tabs
+    (e.g. 'Asian Female') that the Race type also contains"""
+    populations = [group.subgroup_name for group in groups if group.subgroup_type not in ('All', 'Race', 'Grade')]
+    return [
+        group for group in groups
+        if group.subgroup_type in subgroup_types and group.subgroup_name != 'All'
+        and not (group.subgroup_type == 'Race' and any(group.subgroup_name.endswith(' ' + name) for name in populations))
+    ]
+
+def load_gap_matrix(scope, year_id):
+    """Entities as rows (entity_id, entity_name), group_ids as columns, average proficiency as values"""
+    rows = db.session.query(
+        PerformanceRollups.entity_id,
+        PerformanceRollups.entity_name,
+        PerformanceRollups.group_id,
+        PerformanceRollups.avg_proficiency
+    ).filter(
+        PerformanceRollups.scope == scope,
+        PerformanceRollups.year_id == year_id,
+        PerformanceRollups.avg_proficiency.isnot(None)
+    ).all()
+
+    frame = pd.DataFrame(rows, columns=['entity_id', 'entity_name', 'group_id', 'avg_proficiency'])
+    matrix = frame.pivot_table(
+        index=['entity_name', 'entity_id'], columns='group_id', values='avg_proficiency', aggfunc='first'
+    )
+    return matrix.sort_index()
+
+def get_gap_matrix(scope, year_id):
+    return versioned(f'gap_matrix:{scope}:{year_id}', lambda: load_gap_matrix(scope, year_id))
+
+def gap_statistics(matrix, group_ids):
+    """Per-row highest and lowest subgroup and their difference over the given columns.
+
+    Returns (values, counts, highest, lowest, gaps): values is the rows x group_ids array (NaN where a
+    subgroup has no data), highest/lowest are column positions (-1 when a row has no data) and gaps is
+    NaN for rows with fewer than two subgroups.
+    """
+    values = matrix.reindex(columns=group_ids).to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=1)
+
+    if values.shape[1] == 0:
+        empty = np.full(len(values), -1)
+        return values, counts, empty, empty, np.full(len(values), np.nan)
+
+    highest = np.where(present, values, -np.inf).argmax(axis=1)
+    lowest = np.where(present, values, np.inf).argmin(axis=1)
+    rows = np.arange(len(values))
+    gaps = np.where(counts >= 2, values[rows, highest] - values[rows, lowest], np.nan)
+
+    highest = np.where(counts > 0, highest, -1)
+    lowest = np.where(counts > 0, lowest, -1)
+    return values, counts, highest, lowest, gaps
@@ -0,0 +1,190 @@
+#This file serves /map/counties.geojson: Mississippi county boundaries with each county's literacy metrics attached,
+#so the map renders from one response instead of joining /map/districts to a separately fetched geometry file.
+#Boundaries are read from a bundled GeoJSON file and simplified with Douglas-Peucker at a few zoom levels; the merged
+#FeatureCollection is serialized once per dataset version, school year and zoom level, and the response cache stores
+#it precompressed.
+
+"""
+County boundary simplification and the merged county GeoJSON
+"""
+
+import json
+import os
+import numpy as np
+from flask import current_app
+from . import db
+from .models import PerformanceRollups
+from .dimensions import get_dimensions
+from .versioning import versioned
+
+DEFAULT_COUNTY_GEOJSON = os.path.join(os.path.dirname(__file__), 'static', 'ms_counties_dissolved.geojson')
+
+# Leaflet zoom level -> Douglas-Peucker tolerance in degrees (about 1 km, 250 m and 60 m). A request is served the
+# level at or below its zoom; 0 would keep every vertex.
+ZOOM_TOLERANCES = {6: 0.01, 8: 0.0025, 10: 0.0006}
+
+# Properties the boundary files name counties by, in order of preference
+NAME_PROPERTIES = ['name', 'NAME', 'county_name', 'COUNTY']
+
+def county_geojson_path():
+    return os.getenv('COUNTY_GEOJSON_PATH') or DEFAULT_COUNTY_GEOJSON
+
+def zoom_level(zoom):
+    """The largest ZOOM_TOLERANCES level not above zoom (the coarsest one below the first)"""
+    levels = sorted(ZOOM_TOLERANCES)
+    return max((level for level in levels if level <= zoom), default=levels[0])
+
+def county_key(name):
+    """'Hinds County', 'hinds' and the locations table's 'PanolaCounty' / 'Holmes County Consolidated' variants ->
+    the bare lowercase county name, so boundary names match every spelling"""
+    return (name or '').casefold().split('county')[0].strip()
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker: keep the vertices that lie further than tolerance from the simplified line.
+
+    points is an n x 2 array; the first and last points are always kept. Runs with an explicit stack and
+    vectorized perpendicular distances, so long boundaries neither recurse deeply nor loop per vertex in Python.
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = end - start
+        inner = points[first + 1:last]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(*(inner - start).T)
+        else:
+            distances = np.abs(segment[0] * (inner[:, 1] - start[1]) - segment[1] * (inner[:, 0] - start[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+def simplify_ring(ring, tolerance):
+    """Simplify a closed ring, keeping the original when simplification would leave fewer than 4 positions"""
+    points = np.asarray(ring, dtype=float)[:, :2]
+    simplified = simplify_line(points, tolerance)
+    if len(simplified) < 4:
+        return points
+    return np.round(simplified, 5)  # ~1 m; more digits only add bytes
+
+def simplify_geometry(geometry, tolerance):
+    """Polygon or MultiPolygon geometry with every ring simplified; other geometry types pass through"""
+    if geometry['type'] == 'Polygon':
+        coordinates = [simplify_ring(ring, tolerance).tolist() for ring in geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        coordinates = [
+            [simplify_ring(ring, tolerance).tolist() for ring in polygon] for polygon in geometry['coordinates']
+        ]
+    else:
+        return geometry
+    return {'type': geometry['type'], 'coordinates': coordinates}
+
+def load_county_shapes(level):
+    """[(county key, name, simplified geometry)] from the bundled boundary file; None when it is missing"""
+    path = county_geojson_path()
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        collection = json.load(handle)
+
+    shapes = []
+    for feature in collection.get('features', []):
+        properties = feature.get('properties') or {}
+        name = next((properties[key] for key in NAME_PROPERTIES if properties.get(key)), None)
+        if name and feature.get('geometry'):
+            shapes.append((county_key(name), name, simplify_geometry(feature['geometry'], ZOOM_TOLERANCES[level])))
+    return shapes
+
+def get_county_shapes(level):
+    return versioned(f'county_shapes:{level}', lambda: load_county_shapes(level))
+
+def county_metrics(year_id, group_id):
+    """{county key: properties} from the county rollups, with the districts and school count of each county.
+
+    Spellings of one county that the locations table keeps apart ('Panola County', 'PanolaCounty') are combined,
+    each rollup weighted by its record count.
+    """
+    rows = db.session.query(
+        PerformanceRollups.entity_name, PerformanceRollups.avg_proficiency, PerformanceRollups.avg_growth,
+        PerformanceRollups.avg_absenteeism, PerformanceRollups.proficiency_delta, PerformanceRollups.record_count
+    ).filter(
+        PerformanceRollups.scope == 'county',
+        PerformanceRollups.year_id == year_id,
+        PerformanceRollups.group_id == group_id
+    ).all()
+
+    dims = get_dimensions()
+    districts, schools = {}, {}
+    for district in dims.districts.values():
+        location = dims.location_of(district.district_id)
+        if location and location.county:
+            key = county_key(location.county)
+            districts.setdefault(key, []).append(district.district_name)
+            schools[key] = schools.get(key, 0) + sum(
+                1 for school in dims.schools_by_district.get(district.district_id, []) if school.school_number != 0
+            )
+
+    # key -> record-count-weighted sums and weights of each metric, and the total record count
+    totals = {}
+    for name, *values, record_count in rows:
+        total = totals.setdefault(county_key(name), {'sums': [0.0] * 4, 'weights': [0] * 4, 'record_count': 0})
+        for i, value in enumerate(values):
+            if value is not None:
+                total['sums'][i] += float(value) * record_count
+                total['weights'][i] += record_count
+        total['record_count'] += record_count
+
+    metrics = {}
+    for key, total in totals.items():
+        proficiency, growth, absenteeism, change = (
+            round(value / weight, 1) if weight else None for value, weight in zip(total['sums'], total['weights'])
+        )
+        metrics[key] = {
+            'county': f'{key.title()} County',
+            'english_proficiency': proficiency,
+            'english_growth': growth,
+            'chronic_absenteeism_pct': absenteeism,
+            'proficiency_change': change,
+            'record_count': total['record_count'],
+            'districts': sorted(districts.get(key, [])),
+            'district_count': len(districts.get(key, [])),
+            'school_count': schools.get(key, 0)
+        }
+    return metrics
+
+def build_county_geojson(school_year, level):
+    """The serialized FeatureCollection (bytes) for one year and zoom level, or None without boundaries"""
+    shapes = get_county_shapes(level)
+    if shapes is None:
+        return None
+    dims = get_dimensions()
+    all_subgroup = dims.group_named('All')
+    metrics = county_metrics(dims.year_id(school_year), all_subgroup.group_id if all_subgroup else None)
+
+    features = []
+    for key, name, geometry in shapes:
+        properties = {'name': name, 'school_year': school_year, **metrics.get(key, {})}
+        features.append({'type': 'Feature', 'properties': properties, 'geometry': geometry})
+
+    collection = {
+        'type': 'FeatureCollection',
+        'features': features,
+        'school_year': school_year,
+        'zoom': level,
+        'tolerance': ZOOM_TOLERANCES[level]
+    }
+    return current_app.json.dumps(collection).encode()
+
+def get_county_geojson(school_year, level):
+    return versioned(f'county_geojson:{school_year}:{level}', lambda: build_county_geojson(school_year, level))
@@ -0,0 +1,55 @@
+#This file provides an orjson-backed JSON provider for Flask, used for every jsonify() response when orjson is installed.
+#JSON_PROVIDER=default switches back to Flask's built-in provider.
+
+"""
+Fast JSON encoding for the Mississippi Literacy Database API
+"""
+
+import os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to the standard library encoder
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Replacement for DefaultJSONProvider that encodes with orjson.
+
+    Keys are sorted, dates go through the same default() hook and debug mode still pretty-prints, but the
+    output is not byte-identical to the default provider's: non-ASCII characters are written as raw UTF-8
+    instead of \\uXXXX escapes, and NaN / Infinity become null instead of the non-standard NaN / Infinity
+    tokens. Tuples (such as query result rows) and NumPy arrays are encoded directly without converting them
+    to lists first.
+    """
+
+    def _options(self, indent=None):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=None):
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, kwargs.get('indent')).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+def create_json_provider(app):
+    """Pick the JSON provider from JSON_PROVIDER (orjson by default when it is installed)"""
+    choice = os.getenv('JSON_PROVIDER', 'orjson').strip().lower()
+
+    if choice == 'orjson' and orjson is not None:
+        return OrjsonProvider(app)
+
+    return DefaultJSONProvider(app)
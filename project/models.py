@@ -2,6 +2,7 @@
 # It defines the structure of the database tables and their relationships using SQLAlchemy ORM.
 # Each class represents a table in the database with its respective columns and data types.
 from . import db
+from sqlalchemy.orm import deferred
 from flask_login import UserMixin
 from datetime import datetime
 
@@ -16,6 +17,12 @@ class User(UserMixin, db.Model):
     reset_token = db.Column(db.String(100))
     reset_token_expires = db.Column(db.DateTime)
 
+class DatasetVersion(db.Model):
+    __tablename__ = 'dataset_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)  # bumped by every import, see versioning.py
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Locations(db.Model):
     __tablename__ = 'locations'
     location_id = db.Column(db.Integer, primary_key=True)
@@ -44,14 +51,16 @@ class Districts(db.Model):
     teacher_quality = db.relationship('TeacherQuality', backref='district', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
+        from .dimensions import get_dimensions
+        location = get_dimensions().locations.get(self.location_id)
         return {
             'district_id': self.district_id,
             'district_number': self.district_number,
             'district_name': self.district_name,
             'location_id': self.location_id,
-            'county': self.location.county if self.location else None,
-            'city': self.location.city if self.location else None,
-            'zip_code': self.location.zip_code if self.location else None
+            'county': location.county if location else None,
+            'city': location.city if location else None,
+            'zip_code': location.zip_code if location else None
         }
 
 class Schools(db.Model):
@@ -66,6 +75,8 @@ class Schools(db.Model):
     performance_records = db.relationship('PerformanceRecords', backref='school', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
+        from .dimensions import get_dimensions
+        district = get_dimensions().districts.get(self.district_id)
         return {
             'school_id': self.school_id,
             'school_number': self.school_number,
@@ -73,7 +84,7 @@ class Schools(db.Model):
             'district_id': self.district_id,
             'school_type': self.school_type,
             'grade_span': self.grade_span,
-            'district_name': self.district.district_name if self.district else None
+            'district_name': district.district_name if district else None
         }
 
 class DemographicGroups(db.Model):
@@ -108,6 +119,10 @@ class AcademicYears(db.Model):
 
 class PerformanceRecords(db.Model):
     __tablename__ = 'performance_records'
+    __table_args__ = (
+        # year_id leads so year-filtered queries stay inside one partition (see partitioning.py)
+        db.Index('ix_performance_records_year_group_school', 'year_id', 'group_id', 'school_id'),
+    )
     record_id = db.Column(db.Integer, primary_key=True)
     school_id = db.Column(db.Integer, db.ForeignKey('schools.school_id'), nullable=False)
     group_id = db.Column(db.Integer, db.ForeignKey('demographic_groups.group_id'), nullable=False)
@@ -134,7 +149,17 @@ class PerformanceRecords(db.Model):
     # Additional Metrics
     chronic_absenteeism_pct = db.Column(db.Float)
     
+    # Precomputed at import for student-weighted averages (see weighting.py). Deferred, so loading records never
+    # selects them and a database imported before they existed keeps working until they are added at startup
+    student_count = deferred(db.Column(db.Integer))         # sum of the five level counts; None if any is suppressed
+    weighted_proficiency = deferred(db.Column(db.Float))    # english_proficiency * student_count
+    weighted_growth = deferred(db.Column(db.Float))         # english_growth * student_count
+    
     def to_dict(self):
+        from .dimensions import get_dimensions
+        dims = get_dimensions()
+        school = dims.schools.get(self.school_id)
+        group = dims.groups.get(self.group_id)
         return {
             'record_id': self.record_id,
             'school_id': self.school_id,
@@ -155,14 +180,17 @@ class PerformanceRecords(db.Model):
             'performance_level_5_pct': self.performance_level_5_pct,
             'performance_level_5_count': self.performance_level_5_count,
             'chronic_absenteeism_pct': self.chronic_absenteeism_pct,
-            'school_year': self.academic_year.school_year if self.academic_year else None,
-            'school_name': self.school.school_name if self.school else None,
-            'subgroup_name': self.demographic_group.subgroup_name if self.demographic_group else None,
-            'subgroup_type': self.demographic_group.subgroup_type if self.demographic_group else None
+            'school_year': dims.school_year(self.year_id),
+            'school_name': school.school_name if school else None,
+            'subgroup_name': group.subgroup_name if group else None,
+            'subgroup_type': group.subgroup_type if group else None
         }
 
 class TeacherQuality(db.Model):
     __tablename__ = 'teacher_quality'
+    __table_args__ = (
+        db.Index('ix_teacher_quality_year_district', 'year_id', 'district_id'),
+    )
     quality_id = db.Column(db.Integer, primary_key=True)
     district_id = db.Column(db.Integer, db.ForeignKey('districts.district_id'), nullable=False)
     year_id = db.Column(db.Integer, db.ForeignKey('academic_years.year_id'), nullable=False)
@@ -178,6 +206,9 @@ class TeacherQuality(db.Model):
     effective_teachers_low_poverty = db.Column(db.Float)
     
     def to_dict(self):
+        from .dimensions import get_dimensions
+        dims = get_dimensions()
+        district = dims.districts.get(self.district_id)
         return {
             'quality_id': self.quality_id,
             'district_id': self.district_id,
@@ -190,12 +221,15 @@ class TeacherQuality(db.Model):
             'in_field_teachers_low_poverty': self.in_field_teachers_low_poverty,
             'effective_teachers_high_poverty': self.effective_teachers_high_poverty,
             'effective_teachers_low_poverty': self.effective_teachers_low_poverty,
-            'school_year': self.academic_year.school_year if self.academic_year else None,
-            'district_name': self.district.district_name if self.district else None
+            'school_year': dims.school_year(self.year_id),
+            'district_name': district.district_name if district else None
         }
 
 class NAEPAssessments(db.Model):
     __tablename__ = 'naep_assessments'
+    __table_args__ = (
+        db.Index('ix_naep_assessments_year_scope', 'year_id', 'scope'),
+    )
     assessment_id = db.Column(db.Integer, primary_key=True)
     year_id = db.Column(db.Integer, db.ForeignKey('academic_years.year_id'), nullable=False)
     scope = db.Column(db.String(20), nullable=False)  # State/District/School
@@ -215,6 +249,7 @@ class NAEPAssessments(db.Model):
     grade_8_reading_advanced = db.Column(db.Float)
     
     def to_dict(self):
+        from .dimensions import get_dimensions
         return {
             'assessment_id': self.assessment_id,
             'year_id': self.year_id,
@@ -229,9 +264,106 @@ class NAEPAssessments(db.Model):
             'grade_8_reading_basic': self.grade_8_reading_basic,
             'grade_8_reading_proficient': self.grade_8_reading_proficient,
             'grade_8_reading_advanced': self.grade_8_reading_advanced,
-            'school_year': self.academic_year.school_year if self.academic_year else None
+            'school_year': get_dimensions().school_year(self.year_id)
         }
 
+# Per-year averages and year-over-year deltas, rebuilt from performance_records by every import (see rollups.py)
+class PerformanceRollups(db.Model):
+    __tablename__ = 'performance_rollups'
+    __table_args__ = (
+        db.Index('ix_performance_rollups_scope_group_entity', 'scope', 'group_id', 'entity_id', 'school_year'),
+    )
+    rollup_id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # state/county/district/school
+    entity_id = db.Column(db.Integer, nullable=True)  # district_id or school_id; None for state and county
+    entity_name = db.Column(db.String(255), nullable=False)
+    group_id = db.Column(db.Integer, nullable=False)
+    year_id = db.Column(db.Integer, nullable=False)
+    school_year = db.Column(db.Integer, nullable=False)
+
+    avg_proficiency = db.Column(db.Float)
+    avg_growth = db.Column(db.Float)
+    avg_absenteeism = db.Column(db.Float)
+    record_count = db.Column(db.Integer, nullable=False)
+
+    # Change from the entity's previous year with data for the same subgroup; None for its first year
+    proficiency_delta = db.Column(db.Float)
+    growth_delta = db.Column(db.Float)
+
+# Sums and counts of the performance metrics at the finest grain the cube endpoint groups by, rebuilt by every
+# import (see rollups.py and cube.py); any coarser slice is a further sum over these rows
+class PerformanceCube(db.Model):
+    __tablename__ = 'performance_cube'
+    cube_id = db.Column(db.Integer, primary_key=True)
+    year_id = db.Column(db.Integer, nullable=False)
+    school_year = db.Column(db.Integer, nullable=False)
+    county = db.Column(db.String(100))
+    district_id = db.Column(db.Integer, nullable=False)
+    school_type = db.Column(db.String(50))
+    grade_level = db.Column(db.String(50))
+    group_id = db.Column(db.Integer, nullable=False)
+    subgroup_type = db.Column(db.String(50))
+    record_count = db.Column(db.Integer, nullable=False)
+
+    # <metric>_sum / <metric>_count over the non-null values of each metric
+    english_proficiency_sum = db.Column(db.Float)
+    english_proficiency_count = db.Column(db.Integer, nullable=False)
+    english_growth_sum = db.Column(db.Float)
+    english_growth_count = db.Column(db.Integer, nullable=False)
+    english_growth_lowest_25_sum = db.Column(db.Float)
+    english_growth_lowest_25_count = db.Column(db.Integer, nullable=False)
+    chronic_absenteeism_pct_sum = db.Column(db.Float)
+    chronic_absenteeism_pct_count = db.Column(db.Integer, nullable=False)
+    student_count_sum = db.Column(db.Float)
+    student_count_count = db.Column(db.Integer, nullable=False)
+
+# One normalized-input value per district, year and feature, rebuilt by every import (see rollups.py); similarity.py
+# pivots it into a district x feature matrix for nearest-neighbour queries
+class DistrictFeatures(db.Model):
+    __tablename__ = 'district_features'
+    __table_args__ = (
+        db.Index('ix_district_features_year_district', 'year_id', 'district_id'),
+    )
+    feature_id = db.Column(db.Integer, primary_key=True)
+    district_id = db.Column(db.Integer, nullable=False)
+    year_id = db.Column(db.Integer, nullable=False)
+    school_year = db.Column(db.Integer, nullable=False)
+    feature = db.Column(db.String(64), nullable=False)
+    value = db.Column(db.Float, nullable=False)
+
+# Tested grades of each school and district with the Lexile band their readers are matched to, rebuilt by every
+# import (see rollups.py and recommendations.py)
+class ReadingProfiles(db.Model):
+    __tablename__ = 'reading_profiles'
+    __table_args__ = (
+        db.Index('ix_reading_profiles_scope_entity_year', 'scope', 'entity_id', 'year_id'),
+    )
+    profile_id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # school/district
+    entity_id = db.Column(db.Integer, nullable=False)  # school_id or district_id
+    year_id = db.Column(db.Integer, nullable=False)
+    school_year = db.Column(db.Integer, nullable=False)
+    grade = db.Column(db.Integer, nullable=False)
+    share = db.Column(db.Float, nullable=False)  # fraction of the entity's tested grades
+    proficiency = db.Column(db.Float)  # the grade's, or the entity's All-students proficiency when suppressed
+    lexile_min = db.Column(db.Integer, nullable=False)
+    lexile_max = db.Column(db.Integer, nullable=False)
+
+# Performance record counts per combination of the dashboard's filter values, rebuilt by every import (see
+# rollups.py and facets.py)
+class FacetCounts(db.Model):
+    __tablename__ = 'facet_counts'
+    facet_id = db.Column(db.Integer, primary_key=True)
+    school_year = db.Column(db.Integer, nullable=False)
+    county = db.Column(db.String(100))
+    city = db.Column(db.String(100))
+    zip_code = db.Column(db.String(10))
+    school_type = db.Column(db.String(50))
+    grade_level = db.Column(db.String(50))
+    subgroup_type = db.Column(db.String(50))
+    group_id = db.Column(db.Integer, nullable=False)
+    record_count = db.Column(db.Integer, nullable=False)
+
 class Books(db.Model):
     __tablename__ = 'books'
     book_id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,111 @@
+#This file manages year-based partitioning of the fact tables (performance_records, teacher_quality, naep_assessments).
+#Partitioning is MySQL-only and opt-in through the PARTITION_FACT_TABLES environment variable.
+
+"""
+Year partitioning helpers for the Mississippi Literacy Database fact tables
+"""
+
+import os
+from sqlalchemy import inspect, text
+
+# Fact tables and their surrogate primary keys. Each one is partitioned by LIST on year_id,
+# so queries filtering on year_id only touch one partition.
+FACT_TABLES = {
+    'performance_records': 'record_id',
+    'teacher_quality': 'quality_id',
+    'naep_assessments': 'assessment_id'
+}
+
+def partitioning_enabled(engine):
+    """Partitioning is applied only when requested and only on MySQL"""
+    flag = os.getenv('PARTITION_FACT_TABLES', '').strip().lower()
+    return flag in ('1', 'true', 'yes') and engine.dialect.name == 'mysql'
+
+def partition_name(school_year):
+    """Partitions are named after the school year they hold, e.g. p2024"""
+    return f'p{int(school_year)}'
+
+def get_partitions(connection, table):
+    """Return {partition_name: year_id} for a table, or an empty dict if it is not partitioned"""
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+    ), {'table': table}).all()
+    return {name: int(description) for name, description in rows}
+
+def apply_year_partitioning(engine, year_map):
+    """Partition the fact tables by year, adding a partition for every year in year_map.
+
+    year_map maps school_year -> year_id. Tables that are already partitioned only get
+    the missing partitions added, so this is safe to call on every import.
+    """
+    if not partitioning_enabled(engine):
+        return False
+
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, id_column in FACT_TABLES.items():
+            existing = get_partitions(connection, table)
+
+            if not existing:
+                # MySQL does not allow foreign keys on partitioned InnoDB tables, and the
+                # partition key must be part of every unique key, including the primary key
+                foreign_keys = [fk['name'] for fk in inspector.get_foreign_keys(table) if fk.get('name')]
+                if foreign_keys:
+                    drops = ', '.join(f'DROP FOREIGN KEY `{name}`' for name in foreign_keys)
+                    connection.execute(text(f'ALTER TABLE `{table}` {drops}'))
+
+                connection.execute(text(
+                    f'ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY (`{id_column}`, `year_id`)'
+                ))
+
+                partitions = ', '.join(
+                    f'PARTITION {partition_name(school_year)} VALUES IN ({int(year_id)})'
+                    for school_year, year_id in sorted(year_map.items())
+                )
+                connection.execute(text(f'ALTER TABLE `{table}` PARTITION BY LIST (`year_id`) ({partitions})'))
+            else:
+                for school_year, year_id in sorted(year_map.items()):
+                    if partition_name(school_year) not in existing:
+                        connection.execute(text(
+                            f'ALTER TABLE `{table}` ADD PARTITION '
+                            f'(PARTITION {partition_name(school_year)} VALUES IN ({int(year_id)}))'
+                        ))
+
+    return True
+
+def archive_year_partition(engine, school_year):
+    """Move one year out of every fact table into standalone <table>_<year> archive tables.
+
+    Uses EXCHANGE PARTITION, which swaps the partition's data files instead of copying rows,
+    then drops the now-empty partition.
+    """
+    name = partition_name(school_year)
+    archived = []
+
+    with engine.begin() as connection:
+        for table in FACT_TABLES:
+            if name not in get_partitions(connection, table):
+                continue
+
+            archive_table = f'{table}_{int(school_year)}'
+            connection.execute(text(f'CREATE TABLE `{archive_table}` LIKE `{table}`'))
+            connection.execute(text(f'ALTER TABLE `{archive_table}` REMOVE PARTITIONING'))
+            connection.execute(text(f'ALTER TABLE `{table}` EXCHANGE PARTITION {name} WITH TABLE `{archive_table}`'))
+            connection.execute(text(f'ALTER TABLE `{table}` DROP PARTITION {name}'))
+            archived.append(archive_table)
+
+    return archived
+
+def drop_year_partition(engine, school_year):
+    """Drop one year's data from every fact table without scanning or deleting row by row"""
+    name = partition_name(school_year)
+    dropped = []
+
+    with engine.begin() as connection:
+        for table in FACT_TABLES:
+            if name in get_partitions(connection, table):
+                connection.execute(text(f'ALTER TABLE `{table}` DROP PARTITION {name}'))
+                dropped.append(table)
+
+    return dropped
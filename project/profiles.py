@@ -0,0 +1,200 @@
+#This file assembles everything a district or school page shows into one payload for /profiles/district/<id> and
+#/profiles/school/<id>. Identity, ranks and reading profiles come from the per-version in-memory indexes; the rest is
+#a fixed set of at most four queries run concurrently, whatever the number of years or subgroups. Each assembled
+#profile is kept per dataset version, so repeat views of a page never touch the database.
+
+"""
+District and school profile assembly
+"""
+
+from itertools import groupby
+from .models import PerformanceRecords, TeacherQuality, NAEPAssessments, AcademicYears, PerformanceRollups
+from .dimensions import get_dimensions
+from .distribution import get_distribution_index, percentile_rank, rank_from_top
+from .fanout import fan_out
+from .recommendations import get_reading_profiles
+from .serializers import TEACHER_QUALITY_API, NAEP_API
+from .versioning import versioned
+
+# Outcomes ranked against the other districts/schools in the same year
+RANKED_METRICS = ['english_proficiency', 'english_growth']
+
+def _rounded(value, digits=1):
+    return round(float(value), digits) if value is not None else None
+
+def _rollup_query(scope, entity_id):
+    """Yearly rollup rows for every subgroup of one entity"""
+    return lambda session: session.query(
+        PerformanceRollups.school_year, PerformanceRollups.group_id, PerformanceRollups.avg_proficiency,
+        PerformanceRollups.avg_growth, PerformanceRollups.avg_absenteeism, PerformanceRollups.record_count,
+        PerformanceRollups.proficiency_delta, PerformanceRollups.growth_delta
+    ).filter(
+        PerformanceRollups.scope == scope,
+        PerformanceRollups.entity_id == entity_id
+    ).order_by(PerformanceRollups.school_year.desc(), PerformanceRollups.group_id).all()
+
+def _levels_query(school_ids, group_id):
+    """Performance level distribution of the All-students record of the given schools, per year"""
+    columns = [getattr(PerformanceRecords, f'performance_level_{level}_{suffix}')
+               for level in range(1, 6) for suffix in ('pct', 'count')]
+    return lambda session: session.query(
+        AcademicYears.school_year, PerformanceRecords.school_id, PerformanceRecords.student_count, *columns
+    ).join(AcademicYears, PerformanceRecords.year_id == AcademicYears.year_id)\
+     .filter(
+        PerformanceRecords.school_id.in_(school_ids),
+        PerformanceRecords.group_id == group_id
+    ).order_by(AcademicYears.school_year.desc()).all()
+
+def _performance(rows, dims):
+    """Rollup rows -> [{school_year, subgroups: [...]}], newest year first"""
+    years = []
+    for school_year, year_rows in groupby(rows, key=lambda row: row[0]):
+        subgroups = []
+        for _, group_id, proficiency, growth, absenteeism, record_count, proficiency_delta, growth_delta in year_rows:
+            group = dims.groups.get(group_id)
+            subgroups.append({
+                'group_id': group_id,
+                'subgroup_name': group.subgroup_name if group else None,
+                'subgroup_type': group.subgroup_type if group else None,
+                'english_proficiency': _rounded(proficiency),
+                'english_growth': _rounded(growth),
+                'chronic_absenteeism_pct': _rounded(absenteeism),
+                'record_count': record_count,
+                'proficiency_change': _rounded(proficiency_delta),
+                'growth_change': _rounded(growth_delta)
+            })
+        years.append({'school_year': school_year, 'subgroups': subgroups})
+    return years
+
+def _levels(rows):
+    return [{
+        'school_year': school_year,
+        'student_count': student_count,
+        'levels': {
+            f'level_{level}': {'percent': values[2 * (level - 1)], 'count': values[2 * (level - 1) + 1]}
+            for level in range(1, 6)
+        }
+    } for school_year, _, student_count, *values in rows]
+
+def _rank_context(scope, entity_id, year_id, group_id, peers=None):
+    """Percentile and rank of the entity among all entities of its scope (and among peers, if given)"""
+    index = get_distribution_index()
+    context = {}
+    for metric in RANKED_METRICS:
+        ranked = index.get(scope, year_id, group_id, metric)
+        value = ranked.by_entity.get(entity_id) if ranked else None
+        if value is None:
+            context[metric] = None
+            continue
+        entry = {
+            'value': _rounded(value),
+            'rank': rank_from_top(ranked.values, value),
+            'out_of': len(ranked.values),
+            'percentile': _rounded(percentile_rank(ranked.values, value))
+        }
+        if peers is not None:
+            peer_values = sorted(ranked.by_entity[peer] for peer in peers if peer in ranked.by_entity)
+            entry['rank_in_district'] = rank_from_top(peer_values, value) if peer_values else None
+            entry['out_of_in_district'] = len(peer_values)
+        context[metric] = entry
+    return context
+
+def _reading_profile(scope, entity_id, year_id):
+    profile = get_reading_profiles().get((scope, entity_id, year_id)) or []
+    return [{
+        'grade': grade.grade,
+        'lexile_min': grade.lexile_min,
+        'lexile_max': grade.lexile_max
+    } for grade in profile]
+
+def build_district_profile(district_id):
+    dims = get_dimensions()
+    district = dims.districts.get(district_id)
+    all_subgroup = dims.group_named('All')
+    if not district or not all_subgroup:
+        return None
+
+    location = dims.location_of(district_id)
+    schools = dims.schools_by_district.get(district_id, [])
+    official = [school.school_id for school in schools if school.school_number == 0]
+    year_id = dims.year_id(dims.latest_school_year)
+
+    results = fan_out(
+        performance=_rollup_query('district', district_id),
+        levels=_levels_query(official, all_subgroup.group_id),
+        teacher_quality=lambda session: TEACHER_QUALITY_API[None].rows(
+            TEACHER_QUALITY_API[None].query(session).filter(TeacherQuality.district_id == district_id)
+            .order_by(AcademicYears.school_year.desc())
+        ),
+        naep=lambda session: NAEP_API[None].rows(
+            NAEP_API[None].query(session).filter(NAEPAssessments.district_id == district_id)
+            .order_by(AcademicYears.school_year.desc(), NAEPAssessments.assessment_id)
+        )
+    )
+
+    return {
+        'district_id': district.district_id,
+        'district_number': district.district_number,
+        'district_name': district.district_name,
+        'county': location.county if location else None,
+        'city': location.city if location else None,
+        'zip_code': location.zip_code if location else None,
+        'schools': [{
+            'school_id': school.school_id,
+            'school_name': school.school_name,
+            'school_type': school.school_type,
+            'grade_span': school.grade_span
+        } for school in schools if school.school_number != 0],
+        'latest_school_year': dims.latest_school_year,
+        'rank': _rank_context('district', district_id, year_id, all_subgroup.group_id),
+        'performance': _performance(results['performance'], dims),
+        'performance_levels': _levels(results['levels']),
+        'teacher_quality': results['teacher_quality'],
+        'naep': results['naep'],
+        'reading_profile': _reading_profile('district', district_id, year_id)
+    }
+
+def build_school_profile(school_id):
+    dims = get_dimensions()
+    school = dims.schools.get(school_id)
+    all_subgroup = dims.group_named('All')
+    if not school or not all_subgroup:
+        return None
+
+    district = dims.districts.get(school.district_id)
+    location = dims.location_of(school.district_id)
+    peers = [peer.school_id for peer in dims.schools_by_district.get(school.district_id, []) if peer.school_number != 0]
+    year_id = dims.year_id(dims.latest_school_year)
+
+    results = fan_out(
+        performance=_rollup_query('school', school_id),
+        levels=_levels_query([school_id], all_subgroup.group_id),
+        naep=lambda session: NAEP_API[None].rows(
+            NAEP_API[None].query(session).filter(NAEPAssessments.school_id == school_id)
+            .order_by(AcademicYears.school_year.desc(), NAEPAssessments.assessment_id)
+        )
+    )
+
+    return {
+        'school_id': school.school_id,
+        'school_number': school.school_number,
+        'school_name': school.school_name,
+        'school_type': school.school_type,
+        'grade_span': school.grade_span,
+        'district_id': school.district_id,
+        'district_name': district.district_name if district else None,
+        'county': location.county if location else None,
+        'city': location.city if location else None,
+        'latest_school_year': dims.latest_school_year,
+        'rank': _rank_context('school', school_id, year_id, all_subgroup.group_id, peers),
+        'performance': _performance(results['performance'], dims),
+        'performance_levels': _levels(results['levels']),
+        'naep': results['naep'],
+        'reading_profile': _reading_profile('school', school_id, year_id)
+    }
+
+def get_district_profile(district_id):
+    return versioned(f'district_profile:{district_id}', lambda: build_district_profile(district_id))
+
+def get_school_profile(school_id):
+    return versioned(f'school_profile:{school_id}', lambda: build_school_profile(school_id))
@@ -0,0 +1,122 @@
+#This file ranks catalog books for a school's or district's readers for /books/recommendations.
+#The import stores each entity's tested grades and matched Lexile bands in reading_profiles. Once per dataset version
+#the catalog is loaded into NumPy arrays sorted by numeric Lexile, so each grade band selects its candidate books
+#with two binary searches and all candidates are scored in one vectorized pass.
+
+"""
+Reading-profile book recommendations
+"""
+
+from collections import namedtuple
+import numpy as np
+from . import db
+from .models import ReadingProfiles
+from .serializers import BOOK_API
+from .versioning import versioned
+
+# Books this far outside a band (in Lexile points) still score, with a lower fit
+BAND_MARGIN = 100
+
+# Share of a book's score from its Lexile fit; the rest is a base for being near the grade
+LEXILE_WEIGHT = 0.7
+
+# Books whose catalog grade is further than this from a profile grade get nothing for that grade, however close
+# their Lexile, so an 11th-grade title never ranks for 4th graders
+GRADE_WINDOW = 2
+
+ProfileGrade = namedtuple('ProfileGrade', 'grade share proficiency lexile_min lexile_max')
+
+# lexile: ascending numeric Lexile (BR = 0, NaN last for books without one); grades: catalog grade number (K = 0)
+# in the same order; books: projected book dicts in the same order; levelled: how many books have a Lexile
+BookIndex = namedtuple('BookIndex', 'lexile grades books levelled')
+
+def lexile_number(lexile):
+    """'850' -> 850, 'BR' (beginning reader) -> 0, anything else -> NaN"""
+    if lexile is None:
+        return np.nan
+    lexile = lexile.strip().upper()
+    if lexile.startswith('BR'):
+        return 0.0
+    return float(lexile) if lexile.isdigit() else np.nan
+
+def grade_number(grade_level):
+    """'Kindergarten' -> 0, '3rd Grade' -> 3, anything else -> None"""
+    if grade_level == 'Kindergarten':
+        return 0
+    digits = ''.join(ch for ch in grade_level.split()[0] if ch.isdigit()) if grade_level else ''
+    return int(digits) if digits else None
+
+def load_book_index():
+    books = BOOK_API.rows(BOOK_API.query())
+    lexile = np.array([lexile_number(book['lexile']) for book in books], dtype=float)
+    grades = np.array([
+        grade if grade is not None else -100
+        for grade in (grade_number(book['grade_level']) for book in books)
+    ], dtype=float)
+    order = np.argsort(lexile, kind='stable')  # NaN sorts last
+    return BookIndex(lexile[order], grades[order], [books[i] for i in order], int((~np.isnan(lexile)).sum()))
+
+def get_book_index():
+    return versioned('book_index', load_book_index)
+
+def load_reading_profiles():
+    """{(scope, entity_id, year_id): [ProfileGrade, ...]} for every school and district"""
+    rows = db.session.query(
+        ReadingProfiles.scope, ReadingProfiles.entity_id, ReadingProfiles.year_id, ReadingProfiles.grade,
+        ReadingProfiles.share, ReadingProfiles.proficiency, ReadingProfiles.lexile_min, ReadingProfiles.lexile_max
+    ).order_by(ReadingProfiles.grade).all()
+    profiles = {}
+    for scope, entity_id, year_id, *grade in rows:
+        profiles.setdefault((scope, entity_id, year_id), []).append(ProfileGrade(*grade))
+    return profiles
+
+def get_reading_profiles():
+    return versioned('reading_profiles', load_reading_profiles)
+
+def recommend(index, profile, limit, literature_type=None):
+    """Top books for a profile as (book, score, best matching grade), best first.
+
+    A book's score is the share-weighted sum over the profile's grades of its grade fit (1 on grade, falling
+    to 0 beyond GRADE_WINDOW grades away) times LEXILE_WEIGHT x closeness to the band centre (1 at the centre,
+    0 at BAND_MARGIN outside the band) plus the rest. Books without a Lexile only get the grade part.
+    """
+    scores = np.zeros(len(index.books))
+    best = np.zeros(len(index.books))
+    best_grade = np.full(len(index.books), -1)
+    levelled = index.lexile[:index.levelled]
+
+    for grade in profile:
+        centre = (grade.lexile_min + grade.lexile_max) / 2
+        half_width = (grade.lexile_max - grade.lexile_min) / 2 + BAND_MARGIN
+        grade_fit = np.clip(1 - np.abs(index.grades - grade.grade) / (GRADE_WINDOW + 1), 0, 1)
+
+        # Only books inside the widened band can get a Lexile fit; find them with two binary searches
+        start = np.searchsorted(levelled, centre - half_width, side='left')
+        end = np.searchsorted(levelled, centre + half_width, side='right')
+        lexile_fit = np.zeros(len(index.books))
+        lexile_fit[start:end] = 1 - np.abs(levelled[start:end] - centre) / half_width
+        contribution = grade_fit * ((1 - LEXILE_WEIGHT) + LEXILE_WEIGHT * lexile_fit)
+
+        scores += grade.share * contribution
+        better = contribution > best
+        best = np.where(better, contribution, best)
+        best_grade = np.where(better, grade.grade, best_grade)
+
+    if literature_type:
+        scores[[book['literature_type'] != literature_type for book in index.books]] = -1
+
+    candidates = np.flatnonzero(scores > 0)
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    # The catalog lists some titles under several grades; keep each title's best-scoring entry
+    result, seen = [], set()
+    for i in candidates:
+        book = index.books[i]
+        key = (book['title'], book['author'])
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append((book, float(scores[i]), int(best_grade[i])))
+        if len(result) == limit:
+            break
+    return result
@@ -0,0 +1,102 @@
+#This file stops the API from piling more queries onto a database that is already failing.
+#After CIRCUIT_FAILURE_THRESHOLD consecutive connectivity failures of the primary the circuit opens: requests are
+#answered from stale cached copies (or 503) without touching the database until CIRCUIT_RESET_TIMEOUT passes and a
+#trial request succeeds.
+
+"""
+Circuit breaker for database access from the API
+"""
+
+import logging
+import os
+import threading
+import time
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open (one trial request) -> closed or open again"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def retry_after(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(1, int(self.reset_timeout - (time.monotonic() - self._opened_at)) + 1)
+
+    def allow_request(self):
+        """Whether a request may use the database now; in half-open state only one trial request is let through"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.warning("Database circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def end_trial(self):
+        """A trial request finished without showing whether the database recovered; let another one try"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning("Database circuit opened after %s consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+def create_circuit_breaker():
+    return CircuitBreaker(
+        int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+        float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))
+    )
+
+def is_connectivity_failure(context):
+    """Whether a handle_error context means the database is unreachable, rather than one statement failing.
+
+    Lost connections are flagged as disconnects; a refused or timed-out connect raises OperationalError before
+    any Connection exists. Statement errors such as the max_execution_time rejections of slow queries are not.
+    """
+    if context.is_disconnect:
+        return True
+    return context.connection is None and isinstance(context.sqlalchemy_exception, OperationalError)
+
+def watch_engine(engine, breaker):
+    """Count connectivity failures on this engine (connection refused, lost, timed out) as breaker failures"""
+
+    @event.listens_for(engine, 'handle_error')
+    def record_database_error(context):
+        if not is_connectivity_failure(context):
+            return
+        breaker.record_failure()
+        if has_request_context():
+            g.database_failed = True
@@ -0,0 +1,435 @@
+#This file adds HTTP caching to the API: ETags derived from the dataset version, 304 Not Modified responses,
+#a response store holding serialized (and precompressed) bodies, and negotiated gzip/brotli compression.
+
+"""
+Conditional requests, response caching and compression for the API blueprint
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from flask import Request, current_app, g, jsonify, request
+from werkzeug.datastructures import ImmutableMultiDict
+from .versioning import current_dataset_version
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Routes whose responses must always be computed live
+UNCACHED_ENDPOINTS = {'api.health_check'}
+
+# Set on internal requests that recompute a stale entry; they skip the store and always run the handler
+REFRESH_ENVIRON_KEY = 'literacy.cache_refresh'
+
+# version: dataset version the body was computed for; encoded: {'gzip': bytes, 'br': bytes}; stored_at: epoch seconds
+CachedResponse = namedtuple('CachedResponse', 'version etag status body mimetype encoded stored_at')
+
+# endpoint -> names of the query arguments its handler has been seen to read (see TrackedArgs)
+_route_params = {}
+_route_params_lock = threading.Lock()
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_refresh_executor = None
+
+class MemoryResponseStore:
+    """Per-process LRU of cached responses"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def prune(self, version):
+        """Drop the entries computed for any other dataset version"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.version != version]:
+                del self._entries[key]
+
+class FileResponseStore:
+    """Cached responses as files in a directory shared by every worker (and the import scripts).
+
+    Each file starts with a line holding the entry's dataset version, so prune() can drop old versions without
+    unpickling bodies. Past max_entries files the oldest written are removed.
+    """
+
+    def __init__(self, directory, max_entries=5000):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        self._count = None  # files in the directory as of this process's last listing, plus its writes since
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.cache')
+
+    def _files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.cache')]
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                f.readline()
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # truncated or written by an older release
+            logger.warning("Ignoring unreadable cache entry for %s: %s", key, e)
+            return None
+
+    def set(self, key, entry):
+        path = self._path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(f'{entry.version}\n'.encode())
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        is_new = not os.path.exists(path)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._count is None:
+                self._count = len(self._files())
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Remove the oldest written files until a tenth of the capacity is free again"""
+        files = []
+        for path in self._files():
+            try:
+                files.append((os.path.getmtime(path), path))
+            except FileNotFoundError:  # removed by another worker
+                pass
+        files.sort()
+        excess = len(files) - int(self.max_entries * 0.9)
+        for _, path in files[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._count = min(len(files), int(self.max_entries * 0.9))
+
+    def prune(self, version):
+        """Remove the entries computed for any other dataset version; returns how many were removed"""
+        removed = 0
+        for path in self._files():
+            try:
+                with open(path, 'rb') as f:
+                    stored_version = f.readline().strip().decode()
+                if stored_version != str(version):
+                    os.remove(path)
+                    removed += 1
+            except (OSError, UnicodeDecodeError):
+                pass
+        with self._lock:
+            self._count = None
+        return removed
+
+    def clear(self):
+        for path in self._files():
+            os.remove(path)
+        with self._lock:
+            self._count = 0
+
+def create_response_store():
+    """RESPONSE_CACHE_DIR selects the shared file store; otherwise an in-process LRU"""
+    directory = os.getenv('RESPONSE_CACHE_DIR')
+    if directory:
+        return FileResponseStore(directory, int(os.getenv('RESPONSE_CACHE_DIR_SIZE', 5000)))
+    return MemoryResponseStore(int(os.getenv('RESPONSE_CACHE_SIZE', 512)))
+
+class TrackedArgs(ImmutableMultiDict):
+    """Query arguments that remember which names were looked up, so the cache key can leave out the ones a
+    route never reads (otherwise ?x=1, ?x=2, ... would each be cached as a separate response)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read = set()
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.read.add(key)
+        return super().__contains__(key)
+
+    def get(self, key, *args, **kwargs):
+        self.read.add(key)
+        return super().get(key, *args, **kwargs)
+
+    def getlist(self, key, *args, **kwargs):
+        self.read.add(key)
+        return super().getlist(key, *args, **kwargs)
+
+class TrackingRequest(Request):
+    """The app's request class: request.args is a TrackedArgs"""
+    parameter_storage_class = TrackedArgs
+
+def cache_params(endpoint, args):
+    """Names of the arguments to key this request on: the present ones the endpoint's handler reads, or all
+    present ones until the handler has run once in this process"""
+    known = _route_params.get(endpoint)
+    present = set(args.keys())
+    return present if known is None else present & known
+
+def learn_params(endpoint, read):
+    with _route_params_lock:
+        _route_params[endpoint] = _route_params.get(endpoint, frozenset()) | frozenset(read)
+
+def cache_key(path, args, params=None):
+    """Normalized route plus query string (restricted to params, if given), independent of argument order"""
+    query = urlencode(sorted(item for item in args.items(multi=True) if params is None or item[0] in params))
+    return f'{path}?{query}' if query else path
+
+def make_etag(version, key):
+    return f'{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}'
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=9)
+    return gzip.compress(body, compresslevel=9)
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def precompress(body):
+    """Compressed variants of a body worth compressing, built once when it is cached"""
+    if len(body) < int(os.getenv('COMPRESSION_MIN_SIZE', 1024)):
+        return {}
+    return {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+def negotiate_encoding():
+    """Best encoding the client accepts, honouring q-values; None for identity"""
+    return request.accept_encodings.best_match(available_encodings())
+
+def build_response(entry):
+    """Turn a cached entry into a response, picking a precompressed body the client accepts"""
+    response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+    encoding = negotiate_encoding()
+    if encoding in entry.encoded:
+        response.set_data(entry.encoded[encoding])
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _set_validators(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+
+def serve_cached_response():
+    """before_request hook: answer 304 or a cached body before the handler touches the database"""
+    if request.method not in ('GET', 'HEAD') or request.endpoint in UNCACHED_ENDPOINTS or request.endpoint is None:
+        return None
+
+    g.cache_params = cache_params(request.endpoint, request.args)
+    key = cache_key(request.path, request.args, g.cache_params)
+    g.cache_key = key
+    g.cache_refresh = bool(request.environ.get(REFRESH_ENVIRON_KEY))
+
+    # While the database circuit is open, answer from the last good copy without touching it
+    breaker = current_app.extensions['circuit_breaker']
+    if not breaker.allow_request():
+        return respond_stale('STALE-IF-ERROR') or _unavailable(breaker)
+    g.database_admitted = True
+
+    try:
+        version = current_dataset_version()
+    except Exception as e:
+        logger.warning("Could not read the dataset version for %s: %s", key, e)
+        return respond_stale('STALE-IF-ERROR') or _unavailable(breaker)
+
+    etag = make_etag(version, key)
+    g.cache_etag = etag
+    g.dataset_version = version
+
+    if g.cache_refresh:
+        return None
+
+    if request.if_none_match.contains_weak(etag):
+        g.cache_hit = True
+        response = current_app.response_class(status=304)
+        _set_validators(response, etag)
+        response.headers['X-Cache-Status'] = 'HIT'
+        return response
+
+    entry = current_app.extensions['response_store'].get(key)
+    if entry is None:
+        return None
+    if entry.version == version:
+        return respond_from_store(entry)
+
+    # Stale-while-revalidate: answer with the previous version's copy while it is recomputed in the background
+    if os.getenv('STALE_WHILE_REVALIDATE', '1') != '0' and _within_stale_age(entry):
+        schedule_refresh(request.full_path if request.query_string else request.path, key)
+        return _stale_response(entry, 'STALE')
+    return None
+
+def respond_from_store(entry=None):
+    """The stored response for this request's key at the current dataset version, or None"""
+    entry = entry or current_app.extensions['response_store'].get(g.cache_key)
+    if entry is None or entry.version != g.dataset_version:
+        return None
+
+    g.cache_hit = True
+    response = build_response(entry)
+    _set_validators(response, g.cache_etag)
+    response.headers['X-Cache-Status'] = 'HIT'
+    return response
+
+def _within_stale_age(entry):
+    return time.time() - entry.stored_at <= float(os.getenv('STALE_MAX_AGE', 86400))
+
+def _stale_response(entry, status):
+    g.cache_hit = True
+    if request.if_none_match.contains_weak(entry.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = build_response(entry)
+    _set_validators(response, entry.etag)
+    response.headers['X-Cache-Status'] = status
+    return response
+
+def respond_stale(status):
+    """The last good copy of this request's response, whatever dataset version it was built for, or None"""
+    entry = current_app.extensions['response_store'].get(g.cache_key)
+    if entry is None or not _within_stale_age(entry):
+        return None
+    logger.warning("Serving %s copy of %s from dataset version %s", status.lower(), g.cache_key, entry.version)
+    return _stale_response(entry, status)
+
+def _unavailable(breaker):
+    response = jsonify({
+        'success': False,
+        'error': 'The database is temporarily unavailable, please retry shortly'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(breaker.retry_after() or 5)
+    return response
+
+def schedule_refresh(path, key):
+    """Recompute a stale response in the background through the full request pipeline, once per key"""
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    global _refresh_executor
+    with _refresh_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('STALE_REFRESH_WORKERS', 2)), thread_name_prefix='cache-refresh'
+            )
+    _refresh_executor.submit(_refresh, current_app._get_current_object(), path, key)
+
+def _refresh(app, path, key):
+    try:
+        response = app.test_client().get(path, environ_overrides={REFRESH_ENVIRON_KEY: True})
+        if response.status_code != 200:
+            logger.warning("Background refresh of %s returned %s", key, response.status_code)
+    except Exception as e:
+        logger.warning("Background refresh of %s failed: %s", key, e)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(key)
+
+def mark_handler_reached():
+    """before_request hook (registered last): every other hook let this request through to its handler"""
+    g.handler_reached = True
+    # Only the handler's lookups decide what its response depends on (the admission hooks read limit/offset)
+    if isinstance(request.args, TrackedArgs):
+        request.args.read.clear()
+
+def _keyed_on_what_was_read():
+    """Whether the cache key holds exactly the present arguments the handler read, so the response is valid for
+    every request with that key; records what it read for the next requests' keys"""
+    if not g.get('handler_reached') or not isinstance(request.args, TrackedArgs):
+        return False
+    read = request.args.read
+    learn_params(request.endpoint, read)
+    return g.get('cache_params') == {name for name in request.args.keys() if name in read}
+
+def store_cached_response(response):
+    """after_request hook: cache successful bodies with their compressed variants, then compress this response"""
+    if g.pop('database_admitted', False):
+        breaker = current_app.extensions['circuit_breaker']
+        # Database errors were already counted as they happened (see resilience.watch_engine). Only a handler that
+        # ran proves the database works: HITs, 304s, STALE copies and rejected requests leave the state unchanged.
+        if g.get('handler_reached') and response.status_code < 500 and not g.get('database_failed'):
+            breaker.record_success()
+        else:
+            breaker.end_trial()
+
+    key = g.get('cache_key')
+    if key is None or g.get('cache_hit') or response.direct_passthrough:
+        return response
+
+    # Stale-if-error: a failed computation falls back to the last good copy
+    if response.status_code >= 500 and not g.get('cache_refresh'):
+        return respond_stale('STALE-IF-ERROR') or response
+
+    reusable = _keyed_on_what_was_read()
+    if response.status_code == 200:
+        body = response.get_data()
+        entry = CachedResponse(g.dataset_version, g.cache_etag, 200, body, response.mimetype, precompress(body), time.time())
+        if reusable:
+            if len(body) <= int(os.getenv('RESPONSE_CACHE_MAX_BODY', 4 * 1024 * 1024)):
+                current_app.extensions['response_store'].set(key, entry)
+            # Requests coalesced onto this one get the response even when it is too large to store
+            g.flight_response = entry
+
+        encoding = negotiate_encoding()
+        if encoding in entry.encoded:
+            response.set_data(entry.encoded[encoding])
+            response.headers['Content-Encoding'] = encoding
+
+        if reusable:
+            _set_validators(response, g.cache_etag)
+        response.headers['X-Cache-Status'] = 'MISS'
+    elif response.status_code < 500 and reusable:
+        # A handler's 4xx answer is never stored, but it is the answer for identical coalesced requests too
+        g.flight_response = CachedResponse(
+            g.dataset_version, None, response.status_code, response.get_data(), response.mimetype, {}, time.time()
+        )
+
+    return response
+
+def respond_from_flight(entry):
+    """A coalesced request's copy of the response its leader in this process computed (see coalescing.join_flight)"""
+    g.cache_hit = True
+    response = build_response(entry)
+    if entry.etag is not None:
+        _set_validators(response, entry.etag)
+    response.headers['X-Cache-Status'] = 'HIT'
+    return response
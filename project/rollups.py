@@ -0,0 +1,288 @@
+#This file precomputes aggregate tables from the performance facts at import time, so analytics routes read a
+#few hundred prepared rows instead of re-aggregating the fact table on every request.
+#All facts are read in one query and aggregated with pandas; nothing here runs a query per year or per entity.
+
+"""
+Import-time rollups for the Mississippi Literacy Database
+"""
+
+import pandas as pd
+from sqlalchemy import insert, inspect
+from . import db
+from .models import Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords, TeacherQuality, PerformanceRollups, PerformanceCube, DistrictFeatures, ReadingProfiles, FacetCounts
+
+STATE_NAME = 'Mississippi'
+
+# Metrics summed into performance_cube, as <metric>_sum and <metric>_count
+CUBE_METRICS = ['english_proficiency', 'english_growth', 'english_growth_lowest_25', 'chronic_absenteeism_pct', 'student_count']
+
+# Finest grain of performance_cube; every dimension of /analytics/cube is one of these or derived from them
+CUBE_KEYS = ['year_id', 'school_year', 'county', 'district_id', 'school_type', 'grade_level', 'group_id', 'subgroup_type']
+
+# Filters the dashboard offers; facet_counts holds the record count of every combination of them
+FACET_KEYS = ['school_year', 'county', 'city', 'zip_code', 'school_type', 'grade_level', 'subgroup_type', 'group_id']
+
+# district_features: school-level outcome averages, the student mix from the official district record, teacher quality
+OUTCOME_FEATURES = ['english_proficiency', 'english_growth', 'english_growth_lowest_25', 'chronic_absenteeism_pct']
+MIX_SUBGROUPS = {
+    'share_economically_disadvantaged': 'Economically Disadvantaged',
+    'share_black': 'Black or African American',
+    'share_white': 'White',
+    'share_hispanic': 'Hispanic or Latino',
+    'share_disabilities': 'Students with Disabilities',
+    'share_english_learners': 'English Learners'
+}
+TEACHER_FEATURES = [
+    f'{metric}_teachers_{level}_poverty'
+    for metric in ('experienced', 'emergency_provisional', 'in_field', 'effective')
+    for level in ('high', 'low')
+]
+
+# Grade -> (min, max) Lexile of on-grade text, from the Common Core text complexity grade bands (K: beginning reader)
+GRADE_LEXILE_BANDS = {
+    0: (0, 300), 1: (190, 530), 2: (420, 650), 3: (520, 820), 4: (740, 940), 5: (830, 1010), 6: (925, 1070),
+    7: (970, 1120), 8: (1010, 1185), 9: (1050, 1260), 10: (1080, 1335), 11: (1185, 1385), 12: (1185, 1385)
+}
+
+# Lexile points a reading band moves per 50 points of proficiency away from 50%
+LEXILE_SHIFT = 150
+
+# scope: (key columns identifying one entity, column used as entity_id, column used as entity_name)
+ROLLUP_SCOPES = {
+    'county': (['county'], None, 'county'),
+    'district': (['district_id', 'district_name'], 'district_id', 'district_name'),
+    'school': (['school_id', 'school_name'], 'school_id', 'school_name')
+}
+
+def load_fact_frame(session=None):
+    """Every performance record with the dimension columns the rollups group by, as one DataFrame"""
+    session = session or db.session
+    query = session.query(
+        PerformanceRecords.school_id,
+        Schools.school_number,
+        Schools.school_name,
+        Schools.school_type,
+        Schools.district_id,
+        Districts.district_name,
+        Locations.county,
+        Locations.city,
+        Locations.zip_code,
+        PerformanceRecords.group_id,
+        DemographicGroups.subgroup_type,
+        PerformanceRecords.year_id,
+        AcademicYears.school_year,
+        PerformanceRecords.grade_level,
+        PerformanceRecords.english_proficiency,
+        PerformanceRecords.english_growth,
+        PerformanceRecords.english_growth_lowest_25,
+        PerformanceRecords.chronic_absenteeism_pct,
+        PerformanceRecords.student_count
+    ).join(Schools, PerformanceRecords.school_id == Schools.school_id)\
+     .join(Districts, Schools.district_id == Districts.district_id)\
+     .outerjoin(Locations, Districts.location_id == Locations.location_id)\
+     .join(AcademicYears, PerformanceRecords.year_id == AcademicYears.year_id)\
+     .join(DemographicGroups, PerformanceRecords.group_id == DemographicGroups.group_id)
+
+    columns = [
+        'school_id', 'school_number', 'school_name', 'school_type', 'district_id', 'district_name', 'county', 'city',
+        'zip_code', 'group_id', 'subgroup_type', 'year_id', 'school_year', 'grade_level'
+    ] + CUBE_METRICS
+    frame = pd.DataFrame(query.all(), columns=columns)
+    for column in CUBE_METRICS:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return frame
+
+def state_school_id(frame):
+    """The official statewide record: the first school numbered 0, as in Dimensions.state_school"""
+    state_rows = frame.loc[frame['school_number'] == 0, 'school_id']
+    return int(state_rows.min()) if len(state_rows) else None
+
+def _aggregate(frame, keys):
+    grouped = frame.groupby(keys + ['group_id', 'year_id', 'school_year'], dropna=False, sort=False)
+    return grouped.agg(
+        avg_proficiency=('english_proficiency', 'mean'),
+        avg_growth=('english_growth', 'mean'),
+        avg_absenteeism=('chronic_absenteeism_pct', 'mean'),
+        record_count=('english_proficiency', 'count')
+    ).reset_index()
+
+def _with_deltas(rollup, keys):
+    """Add each entity's change from its previous year with data, per subgroup, in one vectorized pass"""
+    rollup = rollup.sort_values(keys + ['group_id', 'school_year'])
+    by_entity = rollup.groupby(keys + ['group_id'], dropna=False, sort=False)
+    rollup['proficiency_delta'] = by_entity['avg_proficiency'].diff()
+    rollup['growth_delta'] = by_entity['avg_growth'].diff()
+    return rollup
+
+def compute_performance_rollups(frame):
+    """State, county, district and school rollups of the fact frame, in performance_rollups' column layout"""
+    parts = []
+
+    state_id = state_school_id(frame)
+    if state_id is not None:
+        state = _with_deltas(_aggregate(frame[frame['school_id'] == state_id], []), [])
+        state['scope'], state['entity_id'], state['entity_name'] = 'state', None, STATE_NAME
+        parts.append(state)
+
+    # Aggregate rows (school number 0) are excluded below the state level, as in the ranking routes
+    schools = frame[frame['school_number'] != 0]
+
+    for scope, (keys, id_column, name_column) in ROLLUP_SCOPES.items():
+        scoped = schools.dropna(subset=[keys[0]])
+        rollup = _with_deltas(_aggregate(scoped, keys), keys)
+        rollup['scope'] = scope
+        rollup['entity_id'] = rollup[id_column] if id_column else None
+        rollup['entity_name'] = rollup[name_column]
+        parts.append(rollup)
+
+    columns = [
+        'scope', 'entity_id', 'entity_name', 'group_id', 'year_id', 'school_year',
+        'avg_proficiency', 'avg_growth', 'avg_absenteeism', 'record_count', 'proficiency_delta', 'growth_delta'
+    ]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([part[columns] for part in parts], ignore_index=True)
+
+def compute_performance_cube(frame):
+    """Sum and non-null count of every cube metric per CUBE_KEYS cell, in performance_cube's column layout.
+
+    Official district and state records (school_type District/State) are kept as their own cells; cube.py
+    leaves them out of a query unless school_type is grouped on or filtered.
+    """
+    aggregations = {'record_count': ('group_id', 'size')}
+    for metric in CUBE_METRICS:
+        aggregations[f'{metric}_sum'] = (metric, 'sum')
+        aggregations[f'{metric}_count'] = (metric, 'count')
+    cube = frame.groupby(CUBE_KEYS, dropna=False, sort=False).agg(**aggregations).reset_index()
+
+    # pandas sums an all-NaN group to 0; keep the sum NULL when nothing was counted
+    for metric in CUBE_METRICS:
+        cube.loc[cube[f'{metric}_count'] == 0, f'{metric}_sum'] = None
+    return cube
+
+def compute_facet_counts(frame):
+    """Number of performance records per FACET_KEYS combination, in facet_counts' column layout"""
+    return frame.groupby(FACET_KEYS, dropna=False, sort=False).size().rename('record_count').reset_index()
+
+def compute_district_features(frame, group_ids, teachers):
+    """Long (district_id, year_id, school_year, feature, value) rows for every district-year.
+
+    group_ids maps subgroup name -> group_id; teachers is teacher_quality as a DataFrame.
+    Missing values (suppressed subgroups, unreported teacher data) are simply absent.
+    """
+    keys = ['district_id', 'year_id', 'school_year']
+    all_id = group_ids.get('All')
+
+    schools = frame[(frame['school_number'] != 0) & (frame['group_id'] == all_id)]
+    parts = [schools.groupby(keys)[OUTCOME_FEATURES].mean()]
+
+    # Enrolment and subgroup shares come from the official district rows, which report student counts far
+    # more often than individual schools do
+    district_rows = frame[frame['school_type'] == 'District']
+    students = district_rows.groupby(keys + ['group_id'])['student_count'].sum(min_count=1).unstack('group_id')
+    if all_id in students.columns:
+        total = students[all_id]
+        mix = pd.DataFrame({'student_count': total})
+        for feature, name in MIX_SUBGROUPS.items():
+            group_id = group_ids.get(name)
+            if group_id in students.columns:
+                mix[feature] = students[group_id] / total.where(total > 0)
+        parts.append(mix)
+
+    if len(teachers):
+        parts.append(teachers.groupby(keys)[TEACHER_FEATURES].mean())
+
+    wide = pd.concat(parts, axis=1)
+    wide.index.names = keys
+    features = wide.reset_index().melt(id_vars=keys, var_name='feature', value_name='value')
+    return features.dropna(subset=['value'])
+
+def compute_reading_profiles(frame, group_ids):
+    """One row per school or district, year and tested grade with the Lexile band matched to its readers.
+
+    Grades come from the 'Grade N' subgroups (weighted equally, as those rows report no student counts); each
+    grade's on-grade band is shifted down for low and up for high proficiency in that grade, falling back to
+    the entity's All-students proficiency when the grade's own is suppressed.
+    """
+    grades = {group_id: int(name.split()[1]) for name, group_id in group_ids.items()
+              if name.startswith('Grade ') and name.split()[1].isdigit()}
+    all_id = group_ids.get('All')
+
+    parts = []
+    scopes = {
+        'school': (frame[frame['school_number'] != 0], 'school_id'),
+        'district': (frame[frame['school_type'] == 'District'], 'district_id')
+    }
+    for scope, (rows, id_column) in scopes.items():
+        keys = [id_column, 'year_id', 'school_year']
+        overall = rows[rows['group_id'] == all_id].groupby(keys)['english_proficiency'].mean().rename('overall')
+        graded = rows[rows['group_id'].isin(grades)].assign(grade=lambda f: f['group_id'].map(grades))
+        profile = graded.groupby(keys + ['grade'])['english_proficiency'].mean().rename('proficiency').reset_index()
+        profile = profile.merge(overall.reset_index(), on=keys, how='left')
+        profile['share'] = 1 / profile.groupby(keys)['grade'].transform('size')
+
+        profile['proficiency'] = profile['proficiency'].fillna(profile['overall'])
+        shift = ((profile['proficiency'] - 50) / 50 * LEXILE_SHIFT).fillna(0)
+        bands = profile['grade'].map(GRADE_LEXILE_BANDS)
+        profile['lexile_min'] = (bands.str[0] + shift).clip(lower=0).round().astype(int)
+        profile['lexile_max'] = (bands.str[1] + shift).clip(lower=0).round().astype(int)
+        profile['scope'] = scope
+        profile['entity_id'] = profile[id_column]
+        parts.append(profile)
+
+    columns = ['scope', 'entity_id', 'year_id', 'school_year', 'grade', 'share', 'proficiency', 'lexile_min', 'lexile_max']
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([part[columns] for part in parts], ignore_index=True)
+
+def load_teacher_frame(session=None):
+    session = session or db.session
+    query = session.query(
+        TeacherQuality.district_id,
+        TeacherQuality.year_id,
+        AcademicYears.school_year,
+        *[getattr(TeacherQuality, column) for column in TEACHER_FEATURES]
+    ).join(AcademicYears, TeacherQuality.year_id == AcademicYears.year_id)
+    frame = pd.DataFrame(query.all(), columns=['district_id', 'year_id', 'school_year'] + TEACHER_FEATURES)
+    for column in TEACHER_FEATURES:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return frame
+
+def _records(frame):
+    """DataFrame rows as dicts with NaN turned into None and NumPy scalars into Python ones"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def _ensure_table(model):
+    """Create the rollup table, or recreate it when an older release built it with different columns"""
+    table = model.__table__
+    inspector = inspect(db.engine)
+    if inspector.has_table(table.name):
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        if existing == {column.name for column in table.columns}:
+            return
+        table.drop(db.engine)
+    table.create(db.engine)
+
+def replace_table(model, frame, batch_size=5000):
+    """Swap the contents of a rollup table for the rows of a DataFrame, in one transaction"""
+    _ensure_table(model)
+    db.session.query(model).delete()
+    records = _records(frame)
+    for start in range(0, len(records), batch_size):
+        db.session.execute(insert(model.__table__), records[start:start + batch_size])
+    db.session.commit()
+    return len(records)
+
+def build_all_rollups():
+    """Rebuild every rollup table from the current facts; returns {table name: row count}"""
+    frame = load_fact_frame()
+    group_ids = dict(db.session.query(DemographicGroups.subgroup_name, DemographicGroups.group_id).all())
+    return {
+        PerformanceRollups.__tablename__: replace_table(PerformanceRollups, compute_performance_rollups(frame)),
+        PerformanceCube.__tablename__: replace_table(PerformanceCube, compute_performance_cube(frame)),
+        DistrictFeatures.__tablename__: replace_table(DistrictFeatures, compute_district_features(
+            frame, group_ids, load_teacher_frame()
+        )),
+        ReadingProfiles.__tablename__: replace_table(ReadingProfiles, compute_reading_profiles(frame, group_ids)),
+        FacetCounts.__tablename__: replace_table(FacetCounts, compute_facet_counts(frame))
+    }
@@ -0,0 +1,142 @@
+#This file routes read-only API traffic to read replicas while writes (imports, scripts) stay on the primary.
+#Replicas are picked round-robin per request and skipped while they are failing health checks. A read that loses its
+#replica mid-request is retried once on the next healthy replica, or on the primary.
+
+"""
+Read replica routing for the Mississippi Literacy Database
+"""
+
+import itertools
+import logging
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+class ReplicaRouter:
+    """Round-robin over read replica engines with health-based failover"""
+
+    def __init__(self, uris, health_interval=30, engine_options=None):
+        self.engines = [create_engine(uri, pool_pre_ping=True, **(engine_options or {})) for uri in uris]
+        self.health_interval = health_interval
+        self._counter = itertools.count()
+        # Every replica starts unverified so it is probed before its first request
+        self._down_until = {engine: 0.0 for engine in self.engines}
+        self._lock = threading.Lock()
+
+        for engine in self.engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        """Take a replica out of rotation when it drops connections or refuses new ones"""
+        if context.engine is not None and (context.is_disconnect or context.connection is None):
+            self.mark_down(context.engine)
+
+    def mark_down(self, engine):
+        with self._lock:
+            # Warn once per outage: on the first failure, including one before the replica's first probe
+            if self._down_until.get(engine, 0.0) <= time.monotonic():
+                logger.warning("Read replica %s marked unhealthy", engine.url.render_as_string(hide_password=True))
+            self._down_until[engine] = time.monotonic() + self.health_interval
+
+    def _probe(self, engine):
+        """Check a replica that was marked down; only one caller probes per interval"""
+        with self._lock:
+            down_until = self._down_until.get(engine)
+            if down_until is None:
+                return True
+            if down_until > time.monotonic():
+                return False
+            self._down_until[engine] = time.monotonic() + self.health_interval
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            logger.warning("Read replica %s failed health check: %s", engine.url.render_as_string(hide_password=True), e)
+            return False
+
+        with self._lock:
+            self._down_until.pop(engine, None)
+        logger.info("Read replica %s is healthy", engine.url.render_as_string(hide_password=True))
+        return True
+
+    def choose(self):
+        """Return the next healthy replica engine, or None to fall back to the primary"""
+        count = len(self.engines)
+        start = next(self._counter)
+
+        for offset in range(count):
+            engine = self.engines[(start + offset) % count]
+            if engine not in self._down_until or self._probe(engine):
+                return engine
+
+        return None
+
+    def is_down(self, engine):
+        with self._lock:
+            return engine in self._down_until
+
+    def replacement(self, engine, primary):
+        """Engine to retry a read on after it failed on engine: the next healthy replica or the primary. None when
+        engine is not a replica taken out of rotation, i.e. the error was not a connectivity failure."""
+        if engine not in self.engines or not self.is_down(engine):
+            return None
+        return self.choose() or primary
+
+    def status(self):
+        return [{
+            'url': engine.url.render_as_string(hide_password=True),
+            'healthy': engine not in self._down_until
+        } for engine in self.engines]
+
+class RoutingSession(Session):
+    """Session that sends statements to the replica chosen for the current request.
+
+    Only requests that went through route_reads_to_replica() carry a read engine, so
+    scripts and anything running outside a request always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            read_engine = g.get('read_engine')
+            if read_engine is not None:
+                return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError:
+            if not _fail_over_request():
+                raise
+            self.rollback()
+            return super().execute(statement, *args, **kwargs)
+
+def _fail_over_request():
+    """Move the current request off a replica that just failed; True when its statement should be retried"""
+    if not has_request_context() or g.get('read_failed_over'):
+        return False
+    engine = g.get('read_engine')
+    router = current_app.extensions.get('replica_router')
+    if engine is None or router is None:
+        return False
+    replacement = router.replacement(engine, current_app.extensions['sqlalchemy'].engine)
+    if replacement is None:
+        return False
+
+    g.read_failed_over = True
+    g.read_engine = replacement if replacement in router.engines else None  # None: the primary
+    logger.warning("Retrying %s on %s after its read replica failed", request.path,
+                   replacement.url.render_as_string(hide_password=True))
+    return True
+
+def route_reads_to_replica():
+    """before_request hook: pin GET/HEAD requests to one replica for their whole lifetime"""
+    router = current_app.extensions.get('replica_router')
+    if router and request.method in ('GET', 'HEAD'):
+        g.read_engine = router.choose()
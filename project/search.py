@@ -0,0 +1,109 @@
+#This file answers /search/suggest typeahead queries from an in-memory prefix index.
+#Once per dataset version every district, school, city, county and book title is indexed under its whole name and
+#under each later word start ("Jackson Public Schools" is also found by "public" and "sch"), as sorted Python lists.
+#A query is two binary searches per entity type plus a scan of about `limit` neighbouring keys, so its cost does not
+#grow with the number of names.
+
+"""
+Prefix autocomplete index over entity names
+"""
+
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from . import db
+from .models import Books
+from .dimensions import get_dimensions
+from .versioning import versioned
+
+# Entity types in the order their results are listed when matches are otherwise equal
+SEARCH_TYPES = ['district', 'school', 'city', 'county', 'book']
+
+WORD = re.compile(r'\w+')
+APOSTROPHES = re.compile("['\u2019]")
+
+# id: district_id / school_id / book_id (None for cities and counties); context: district, county or author
+Suggestion = namedtuple('Suggestion', 'type id name context')
+
+# names / words: sorted normalized whole names / later word starts; name_entries / word_entries: position in
+# suggestions for each key
+PrefixList = namedtuple('PrefixList', 'names name_entries words word_entries suggestions')
+
+def normalize(text):
+    """Casefolded words joined by single spaces, apostrophes dropped: 'St.  Martin' -> 'st martin', "Charlotte's" -> 'charlottes'"""
+    return ' '.join(WORD.findall(APOSTROPHES.sub('', text.casefold()))) if text else ''
+
+def _prefix_list(suggestions):
+    names, words = [], []
+    for position, suggestion in enumerate(suggestions):
+        name = normalize(suggestion.name)
+        names.append((name, position))
+        words.extend((name[word.start():], position) for word in list(WORD.finditer(name))[1:])
+    names.sort()
+    words.sort()
+    return PrefixList(
+        [key for key, _ in names], [position for _, position in names],
+        [key for key, _ in words], [position for _, position in words],
+        suggestions
+    )
+
+def load_search_index():
+    """{entity type: PrefixList} for the current dataset version"""
+    dims = get_dimensions()
+    counties = {}
+    cities = {}
+    for location in dims.locations.values():
+        if location.county:
+            counties.setdefault(location.county, None)
+        if location.city:
+            cities.setdefault(location.city, location.county)
+
+    books = {}
+    for book_id, title, author in db.session.query(Books.book_id, Books.title, Books.author).order_by(Books.book_id):
+        if title:
+            books.setdefault((title, author), book_id)  # the catalog lists some titles under several grades
+
+    return {
+        'district': _prefix_list([
+            Suggestion('district', district.district_id, district.district_name, None)
+            for district in dims.districts.values() if district.district_name
+        ]),
+        'school': _prefix_list([
+            Suggestion('school', school.school_id, school.school_name, dims.districts[school.district_id].district_name)
+            for school in dims.schools.values() if school.school_number != 0 and school.school_name
+        ]),
+        'city': _prefix_list([Suggestion('city', None, city, county) for city, county in cities.items()]),
+        'county': _prefix_list([Suggestion('county', None, county, None) for county in counties]),
+        'book': _prefix_list([Suggestion('book', book_id, title, author) for (title, author), book_id in books.items()])
+    }
+
+def get_search_index():
+    return versioned('search_index', load_search_index)
+
+def _scan(keys, entries, prefix, limit, found, start):
+    """Add (start, key, position) for keys beginning with prefix, in key order, until found holds limit positions"""
+    # Keys are sorted, so every key with the prefix sits in one run beginning at the binary search point
+    for i in range(bisect_left(keys, prefix), len(keys)):
+        if len(found) >= limit or not keys[i].startswith(prefix):
+            break
+        found.setdefault(entries[i], (start, keys[i], entries[i]))
+
+def suggest(index, query, types, limit):
+    """Best suggestions for a typed prefix: whole-name matches before word-start matches, then alphabetical,
+    then in SEARCH_TYPES order"""
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    candidates = []
+    for type_rank, entity_type in enumerate(SEARCH_TYPES):
+        if entity_type not in types:
+            continue
+        prefix_list = index[entity_type]
+        found = {}
+        _scan(prefix_list.names, prefix_list.name_entries, prefix, limit, found, 0)
+        _scan(prefix_list.words, prefix_list.word_entries, prefix, limit, found, 1)
+        candidates.extend(
+            ((start, key, type_rank), prefix_list.suggestions[position]) for start, key, position in found.values()
+        )
+    candidates.sort(key=lambda candidate: candidate[0])
+    return [suggestion for _, suggestion in candidates[:limit]]
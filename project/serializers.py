@@ -0,0 +1,169 @@
+#This file declares the JSON shape of each API resource as a list of (output key, column) pairs.
+#Each projection compiles to one SELECT with the joins it needs, and rows are shaped straight from result tuples
+#without hydrating ORM objects or triggering lazy relationship loads.
+
+"""
+Column-projected serializers for the Mississippi Literacy Database models
+"""
+
+import os
+from operator import itemgetter
+from sqlalchemy import Float, func
+from . import db
+from .models import Locations, Districts, Schools, DemographicGroups, AcademicYears, PerformanceRecords, TeacherQuality, NAEPAssessments, Books
+
+def _compile_shape(tree):
+    """Turn {key: index | subtree} into a function that builds the (possibly nested) dict for one row"""
+    items = [(key, _compile_shape(value) if isinstance(value, dict) else value) for key, value in tree.items()]
+
+    if all(isinstance(value, int) for _, value in items):
+        keys = tuple(key for key, _ in items)
+        if len(items) == 1:
+            index = items[0][1]
+            return lambda row: {keys[0]: row[index]}
+        getter = itemgetter(*[value for _, value in items])
+        return lambda row: dict(zip(keys, getter(row)))
+
+    getters = [(key, value if callable(value) else itemgetter(value)) for key, value in items]
+    return lambda row: {key: getter(row) for key, getter in getters}
+
+def float_precision():
+    """JSON_FLOAT_PRECISION: decimals to round float columns to in the query, or None to return them as stored"""
+    precision = os.getenv('JSON_FLOAT_PRECISION')
+    return int(precision) if precision else None
+
+class Projection:
+    """Output shape of one resource and the single query that produces it.
+
+    fields: list of (key, column) pairs; dotted keys ('performance_levels.level_1.percent') nest.
+    joins:  list of (target, onclause, outer) needed to reach columns outside the base model.
+    """
+
+    def __init__(self, base, fields, joins=()):
+        self.base = base
+        self.keys = [key for key, _ in fields]
+        self.columns = [column for _, column in fields]
+        self.joins = joins
+
+        tree = {}
+        for index, key in enumerate(self.keys):
+            node = tree
+            parts = key.split('.')
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = index
+        self.shape = _compile_shape(tree)
+
+    def query(self, session=None):
+        """A Query selecting exactly this projection's columns; add filters, ordering and limits to it"""
+        precision = float_precision()
+        columns = self.columns if precision is None else [
+            func.round(column, precision).label(column.key) if isinstance(column.type, Float) else column
+            for column in self.columns
+        ]
+        query = (session or db.session).query(*columns).select_from(self.base)
+        for target, onclause, outer in self.joins:
+            query = query.join(target, onclause, isouter=outer)
+        return query
+
+    def rows(self, query):
+        """Execute a query built from query() and shape each result tuple"""
+        shape = self.shape
+        return [shape(row) for row in query]
+
+    def table(self, query):
+        """Execute a query built from query() and return (keys, row tuples) without building any dicts"""
+        return self.keys, [tuple(row) for row in query]
+
+    def row(self, query):
+        """Shape the first row of a query, or None"""
+        result = query.first()
+        return self.shape(result) if result is not None else None
+
+def _columns(model, names):
+    return [(name, getattr(model, name)) for name in names]
+
+# Shapes returned by the API routes; each resource has exactly one
+
+PERFORMANCE_API = Projection(PerformanceRecords, [
+    ('record_id', PerformanceRecords.record_id),
+    ('school_year', AcademicYears.school_year),
+    ('district_name', Districts.district_name),
+    ('school_name', Schools.school_name),
+    ('school_type', Schools.school_type),
+    ('subgroup_name', DemographicGroups.subgroup_name),
+    ('subgroup_type', DemographicGroups.subgroup_type),
+    ('grade_level', PerformanceRecords.grade_level),
+    ('english_proficiency', PerformanceRecords.english_proficiency),
+    ('english_growth', PerformanceRecords.english_growth)
+] + [
+    (f'performance_levels.level_{level}.{key}', getattr(PerformanceRecords, f'performance_level_{level}_{suffix}'))
+    for level in range(1, 6)
+    for key, suffix in (('percent', 'pct'), ('count', 'count'))
+] + [
+    ('chronic_absenteeism_pct', PerformanceRecords.chronic_absenteeism_pct)
+], joins=[
+    (Schools, PerformanceRecords.school_id == Schools.school_id, False),
+    (Districts, Schools.district_id == Districts.district_id, False),
+    (DemographicGroups, PerformanceRecords.group_id == DemographicGroups.group_id, False),
+    (AcademicYears, PerformanceRecords.year_id == AcademicYears.year_id, False)
+])
+
+# Teacher quality metrics, each reported for high- and low-poverty schools as <metric>_teachers_<level>_poverty
+TEACHER_METRICS = ['experienced', 'emergency_provisional', 'in_field', 'effective']
+POVERTY_LEVELS = ['high', 'low']
+
+def _teacher_quality_api(levels):
+    return Projection(TeacherQuality, [
+        ('quality_id', TeacherQuality.quality_id),
+        ('school_year', AcademicYears.school_year),
+        ('district_id', TeacherQuality.district_id),
+        ('district_name', Districts.district_name),
+        ('county', Locations.county)
+    ] + [
+        (f'{level}_poverty.{metric}', getattr(TeacherQuality, f'{metric}_teachers_{level}_poverty'))
+        for level in levels
+        for metric in TEACHER_METRICS
+    ], joins=[
+        (AcademicYears, TeacherQuality.year_id == AcademicYears.year_id, False),
+        (Districts, TeacherQuality.district_id == Districts.district_id, False),
+        (Locations, Districts.location_id == Locations.location_id, True)
+    ])
+
+# Keyed by ?poverty= (None: both levels); only the requested level's columns are selected
+TEACHER_QUALITY_API = {
+    None: _teacher_quality_api(POVERTY_LEVELS),
+    **{level: _teacher_quality_api([level]) for level in POVERTY_LEVELS}
+}
+
+NAEP_GRADES = [4, 8]
+NAEP_LEVELS = ['below_basic', 'basic', 'proficient', 'advanced']
+
+def _naep_api(grades):
+    return Projection(NAEPAssessments, [
+        ('assessment_id', NAEPAssessments.assessment_id),
+        ('school_year', AcademicYears.school_year),
+        ('scope', NAEPAssessments.scope),
+        ('district_id', NAEPAssessments.district_id),
+        ('district_name', Districts.district_name),
+        ('school_id', NAEPAssessments.school_id),
+        ('school_name', Schools.school_name)
+    ] + [
+        (f'grade_{grade}_reading.{level}', getattr(NAEPAssessments, f'grade_{grade}_reading_{level}'))
+        for grade in grades
+        for level in NAEP_LEVELS
+    ], joins=[
+        (AcademicYears, NAEPAssessments.year_id == AcademicYears.year_id, False),
+        (Districts, NAEPAssessments.district_id == Districts.district_id, True),
+        (Schools, NAEPAssessments.school_id == Schools.school_id, True)
+    ])
+
+# Keyed by ?grade= (None: both grades)
+NAEP_API = {
+    None: _naep_api(NAEP_GRADES),
+    **{grade: _naep_api([grade]) for grade in NAEP_GRADES}
+}
+
+BOOK_API = Projection(Books, _columns(Books, [
+    'book_id', 'title', 'author', 'grade_level', 'lexile', 'literature_type', 'cover_url'
+]))
@@ -0,0 +1,75 @@
+#This file answers "which districts are most like this one" for /analytics/similar-districts.
+#The import stores one row per district, year and feature in district_features; once per dataset version each year
+#is pivoted into a z-scored district x feature NumPy matrix, and a query is one vectorized distance computation
+#over that matrix plus a partial sort, so the cost grows linearly with the number of districts.
+
+"""
+Nearest-neighbour index over district feature vectors
+"""
+
+import warnings
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from . import db
+from .models import DistrictFeatures
+from .rollups import OUTCOME_FEATURES, MIX_SUBGROUPS, TEACHER_FEATURES
+from .versioning import versioned
+
+# Groups of features callers can choose to match on (?features=outcomes,demographics)
+FEATURE_SETS = {
+    'outcomes': OUTCOME_FEATURES,
+    'demographics': list(MIX_SUBGROUPS),
+    'teachers': TEACHER_FEATURES
+}
+
+FEATURES = [feature for features in FEATURE_SETS.values() for feature in features]
+
+# district_ids: row order; rows: {district_id: row}; raw: n x len(FEATURES) values (NaN where missing); scaled: z-scores with missing
+# values at 0 (the column mean); students: enrolment per row (NaN where unreported)
+FeatureMatrix = namedtuple('FeatureMatrix', 'district_ids rows raw scaled students')
+
+def _scale(raw):
+    """Column z-scores; missing values are placed at the column mean and constant columns are zeroed"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-missing columns
+        mean = np.nanmean(raw, axis=0) if len(raw) else np.zeros(raw.shape[1])
+        spread = np.nanstd(raw, axis=0) if len(raw) else np.zeros(raw.shape[1])
+    spread = np.where(np.isnan(spread) | (spread == 0), np.inf, spread)
+    return np.nan_to_num((raw - np.nan_to_num(mean)) / spread, nan=0.0)
+
+def load_feature_index():
+    """{year_id: FeatureMatrix} built from district_features in one query"""
+    rows = db.session.query(
+        DistrictFeatures.year_id, DistrictFeatures.district_id, DistrictFeatures.feature, DistrictFeatures.value
+    ).all()
+    frame = pd.DataFrame(rows, columns=['year_id', 'district_id', 'feature', 'value'])
+
+    index = {}
+    for year_id, year in frame.groupby('year_id'):
+        wide = year.pivot_table(index='district_id', columns='feature', values='value', aggfunc='first')
+        raw = wide.reindex(columns=FEATURES).to_numpy(dtype=float)
+        students = wide['student_count'].to_numpy(dtype=float) if 'student_count' in wide else np.full(len(wide), np.nan)
+        district_ids = wide.index.to_numpy()
+        index[int(year_id)] = FeatureMatrix(
+            district_ids, {int(d): i for i, d in enumerate(district_ids)}, raw, _scale(raw), students
+        )
+    return index
+
+def get_feature_index():
+    return versioned('district_feature_index', load_feature_index)
+
+def nearest(matrix, row, columns, k, candidates):
+    """Positions and distances of the k candidates closest to row over the given feature columns.
+
+    Distance is the root-mean-square z-score difference, so it stays comparable across feature sets.
+    candidates is a boolean mask over the rows; the row itself is never returned.
+    """
+    scaled = matrix.scaled[:, columns]
+    distances = np.sqrt(np.mean((scaled - scaled[row]) ** 2, axis=1)) if len(columns) else np.zeros(len(scaled))
+    positions = np.flatnonzero(candidates & (np.arange(len(scaled)) != row))
+    if len(positions) > k:
+        # Partial sort: only the k smallest are ordered
+        positions = positions[np.argpartition(distances[positions], k)[:k]]
+    positions = positions[np.argsort(distances[positions], kind='stable')]
+    return positions, distances[positions]
@@ -0,0 +1,84 @@
+#This file exports the database into a single read-only SQLite snapshot and configures the app to serve from it.
+#Read nodes can then run without a MySQL server by copying one file.
+
+"""
+Read-only SQLite snapshot backend for the Mississippi Literacy Database
+"""
+
+import os
+import sqlite3
+from sqlalchemy import create_engine, event
+
+# Tables that have no business on public read nodes
+EXCLUDED_TABLES = {'users'}
+
+def snapshot_uri(path):
+    """SQLAlchemy URL that opens the snapshot read-only and immutable (no locking, no journal)"""
+    return f'sqlite:///file:{os.path.abspath(path)}?mode=ro&immutable=1&uri=true'
+
+def configure_snapshot_engine(engine, mmap_size=None):
+    """Memory-map the snapshot and refuse writes on every pooled connection"""
+    mmap_size = mmap_size if mmap_size is not None else int(os.getenv('SNAPSHOT_MMAP_SIZE', 512 * 1024 * 1024))
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+        cursor.execute('PRAGMA query_only = 1')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+        cursor.close()
+
+def _index_foreign_keys(connection, tables):
+    """SQLite does not index foreign keys on its own; add one for every FK column that isn't a leading index column"""
+    for table in tables:
+        leading = {index.expressions[0].name for index in table.indexes if index.expressions and hasattr(index.expressions[0], 'name')}
+        leading.update(column.name for column in table.primary_key.columns[:1])
+
+        for column in table.columns:
+            if column.foreign_keys and column.name not in leading:
+                connection.exec_driver_sql(
+                    f'CREATE INDEX IF NOT EXISTS ix_snapshot_{table.name}_{column.name} ON {table.name} ({column.name})'
+                )
+
+def export_snapshot(source_engine, metadata, path, batch_size=5000):
+    """Copy every table in metadata from source_engine into a new snapshot file at path.
+
+    The file is built next to its destination and atomically renamed into place, so
+    a node serving the previous snapshot never sees a half-written file.
+    """
+    temp_path = f'{path}.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    tables = [table for table in metadata.sorted_tables if table.name not in EXCLUDED_TABLES]
+    target_engine = create_engine(f'sqlite:///{os.path.abspath(temp_path)}')
+    metadata.create_all(target_engine, tables=tables)
+
+    counts = {}
+    with source_engine.connect() as source, target_engine.begin() as target:
+        for table in tables:
+            result = source.execution_options(stream_results=True).execute(table.select())
+            counts[table.name] = 0
+
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                target.execute(table.insert(), [dict(row._mapping) for row in rows])
+                counts[table.name] += len(rows)
+
+        _index_foreign_keys(target, tables)
+
+    target_engine.dispose()
+
+    # Planner statistics and a compacted file, then lock it down
+    connection = sqlite3.connect(temp_path, isolation_level=None)
+    connection.execute('PRAGMA journal_mode = DELETE')
+    connection.execute('ANALYZE')
+    connection.execute('VACUUM')
+    connection.close()
+
+    os.chmod(temp_path, 0o444)
+    os.replace(temp_path, path)
+
+    return counts
@@ -55,9 +55,9 @@ function createCountyPopup(countyName, county) {
                      county.english_growth + '%</td></tr>';
     }
 
-    if (county.chronic_absenteeism !== null) {
+    if (county.chronic_absenteeism_pct !== null) {
       popupContent += '<tr><td><strong>Chronic Absenteeism:</strong></td><td style="text-align: right;">' +
-                     county.chronic_absenteeism + '%</td></tr>';
+                     county.chronic_absenteeism_pct + '%</td></tr>';
     }
 
     popupContent += '<tr><td><strong>Schools:</strong></td><td style="text-align: right;">' +
@@ -470,13 +470,18 @@ function toggleView(newView) {
 }
 
 // Load data and initialize map
+// County boundaries arrive with each county's metrics already attached as feature properties
 Promise.all([
-  fetch('/api/map/districts').then(response => response.json()),
-  fetch('/static/ms_counties_dissolved.geojson').then(response => response.json()),
+  fetch('/api/map/counties.geojson?zoom=8').then(response => response.json()),
   fetch('/static/ms_map.geojson').then(response => response.json())
 ])
-  .then(([countyDataResponse, countyGeoJson, districtGeoJson]) => {
-    literacyData = countyDataResponse.data || {};
+  .then(([countyGeoJson, districtGeoJson]) => {
+    literacyData = {};
+    countyGeoJson.features.forEach(feature => {
+      if (feature.properties.county) {
+        literacyData[feature.properties.name] = feature.properties;
+      }
+    });
     geoJsonDataCache.county = countyGeoJson;
     geoJsonDataCache.district = districtGeoJson;
 
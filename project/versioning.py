@@ -0,0 +1,95 @@
+#This file tracks the dataset version: a number every import bumps so in-process caches know when to rebuild.
+#The web process polls it at most once every DATASET_VERSION_TTL seconds instead of on every request.
+
+"""
+Dataset version tracking and per-version in-process caches
+"""
+
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from . import db
+from .models import DatasetVersion
+
+logger = logging.getLogger(__name__)
+
+_locks = {}
+_locks_guard = threading.Lock()
+_version_lock = threading.Lock()
+
+def bump_dataset_version():
+    """Record that the data changed. Called by the import scripts after they commit."""
+    # Milliseconds since the epoch, so versions keep increasing even after drop_all() resets the table
+    version = int(time.time() * 1000)
+
+    row = db.session.get(DatasetVersion, 1)
+    if row is None:
+        db.session.add(DatasetVersion(id=1, version=version))
+    else:
+        row.version = max(version, row.version + 1)
+        version = row.version
+    db.session.commit()
+
+    current_app.extensions['dataset_version'] = (version, time.monotonic())
+    return version
+
+def current_dataset_version():
+    """Return the dataset version, re-reading it from the database only when the local copy has expired"""
+    cached = _fresh_version()
+    if cached is not None:
+        return cached
+
+    # Only one request re-reads the version; requests arriving meanwhile wait and reuse its answer
+    with _version_lock:
+        cached = _fresh_version()
+        if cached is not None:
+            return cached
+
+        cached = current_app.extensions.get('dataset_version')
+        try:
+            row = db.session.get(DatasetVersion, 1)
+            version = row.version if row else 0
+        except Exception as e:
+            db.session.rollback()
+            if cached is None:
+                raise
+            # Keep serving the last known version while the database is unreachable
+            logger.warning("Could not refresh dataset version, keeping %s: %s", cached[0], e)
+            version = cached[0]
+
+        current_app.extensions['dataset_version'] = (version, time.monotonic())
+        return version
+
+def _fresh_version():
+    """The locally known version if it has not expired yet, else None"""
+    cached = current_app.extensions.get('dataset_version')
+    ttl = float(os.getenv('DATASET_VERSION_TTL', 5))
+
+    # A snapshot never changes once it is being served
+    if cached is not None and (current_app.config.get('SNAPSHOT_MODE') or time.monotonic() - cached[1] < ttl):
+        return cached[0]
+    return None
+
+def versioned(name, loader):
+    """Return the value loader() built for the current dataset version, rebuilding it when the version changes.
+
+    The new value is built completely before it replaces the old one, so concurrent readers
+    always see either the previous or the new value, never a partial one.
+    """
+    version = current_dataset_version()
+    values = current_app.extensions.setdefault('versioned_values', {})
+
+    entry = values.get(name)
+    if entry is None or entry[0] != version:
+        with _locks_guard:
+            lock = _locks.setdefault(name, threading.Lock())
+
+        with lock:
+            entry = values.get(name)
+            if entry is None or entry[0] != version:
+                entry = (version, loader())
+                values[name] = entry
+
+    return entry[1]
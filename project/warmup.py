@@ -0,0 +1,178 @@
+#This file precomputes the API responses visitors hit most, so the first requests after an import are served
+#from the response store instead of running cold queries. It walks the same URLs the dashboard and map request:
+#the base routes, every county for the rankings/subgroup/map routes and every district for school performance.
+
+"""
+Response cache warm-up for the Mississippi Literacy Database API
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .response_cache import REFRESH_ENVIRON_KEY, FileResponseStore
+from .versioning import current_dataset_version
+
+WarmupReport = namedtuple('WarmupReport', 'total warmed failed elapsed failures')
+
+# Requested on every dashboard / map page load
+BASE_PATHS = [
+    '/api/districts',
+    '/api/schools',
+    '/api/demographic-groups',
+    '/api/performance?limit=1',
+    '/api/teacher-quality/comparison',
+    '/api/analytics/performance-metrics',
+    '/api/analytics/county-performance',
+    '/api/analytics/subgroup-performance',
+    '/api/analytics/district-rankings',
+    '/api/analytics/counties',
+    '/api/analytics/trends',
+    '/api/analytics/trends?scope=district',
+    '/api/analytics/distribution',
+    '/api/analytics/achievement-gaps',
+    '/api/analytics/teacher-quality-correlation',
+    '/api/analytics/cube',
+    '/api/map/districts',
+    '/api/books/grade-levels',
+    '/api/books/authors',
+    '/api/filters/counties',
+    '/api/filters/cities',
+    '/api/filters/zip-codes',
+    '/api/filters/school-types',
+    '/api/filters/grade-levels',
+    '/api/filters/demographic-groups',
+    '/api/filters/facets',
+    '/api/search/suggest?q=a'
+]
+
+def _quote(value):
+    return urllib.parse.quote(str(value), safe='')
+
+def hot_paths(base):
+    """Expand the parameterized routes from the base responses ({path: json}) already fetched"""
+    counties = (base.get('/api/filters/counties') or {}).get('data') or []
+    map_counties = ((base.get('/api/map/districts') or {}).get('data') or {}).keys()
+    districts = (base.get('/api/districts') or {}).get('data') or []
+    groups = (base.get('/api/demographic-groups') or {}).get('data') or []
+    subgroup_types = sorted({group['subgroup_type'] for group in groups if group.get('subgroup_type')})
+
+    paths = []
+    for group in groups:
+        if group.get('subgroup_name') == 'All':
+            # The dashboard's state-wide performance table
+            paths.append(f"/api/performance?subgroup_id={group['group_id']}&limit=1000")
+
+    for county in counties:
+        paths.append(f'/api/analytics/district-rankings?county={_quote(county)}')
+        paths.append(f'/api/analytics/subgroup-performance?county={_quote(county)}')
+        paths.append(f'/api/filters/cities?county={_quote(county)}')
+        paths.append(f'/api/filters/zip-codes?county={_quote(county)}')
+
+    for county in map_counties:
+        paths.append(f'/api/map/county/{_quote(county)}')
+
+    for district in districts:
+        paths.append(f"/api/analytics/school-performance?district_id={district['district_id']}")
+        paths.append(f"/api/analytics/subgroup-performance?district_id={district['district_id']}")
+
+    for subgroup_type in subgroup_types:
+        paths.append(f'/api/filters/demographic-groups?subgroup_type={_quote(subgroup_type)}')
+
+    return paths
+
+def local_fetcher(app):
+    """Fetch through the app in this process; fills the response store the app is configured with"""
+    # warm() calls fetch from WARM_WORKERS threads, and a test client (cookie jar, context stack) is not
+    # thread-safe, so each thread gets its own
+    clients = threading.local()
+
+    def fetch(path):
+        client = getattr(clients, 'client', None)
+        if client is None:
+            client = clients.client = app.test_client()
+        # Always recompute, even where a stale copy from the previous dataset version could be served
+        response = client.get(path, environ_overrides={REFRESH_ENVIRON_KEY: True})
+        return response.status_code, response.get_json(silent=True)
+    return fetch
+
+def remote_fetcher(base_url, timeout=60):
+    """Fetch from a running server (WARM_BASE_URL), which fills its own response store"""
+    base_url = base_url.rstrip('/')
+
+    def fetch(path):
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=timeout) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+    return fetch
+
+def warm(fetch, workers=None):
+    """Request every hot path in parallel and report how many succeeded and how long it took"""
+    workers = workers or int(os.getenv('WARM_WORKERS', 8))
+    start = time.perf_counter()
+    failures = []
+
+    def run(paths):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(paths, executor.map(_safe_fetch, [fetch] * len(paths), paths)))
+        for path, (status, _) in results.items():
+            if status != 200:
+                failures.append((path, status))
+        return {path: payload for path, (status, payload) in results.items() if status == 200}
+
+    base = run(BASE_PATHS)
+    expanded = hot_paths(base)
+    run(expanded)
+
+    total = len(BASE_PATHS) + len(expanded)
+    return WarmupReport(total, total - len(failures), len(failures), time.perf_counter() - start, failures)
+
+def _safe_fetch(fetch, path):
+    try:
+        return fetch(path)
+    except Exception as e:
+        return str(e), None
+
+def print_report(report):
+    coverage = report.warmed / report.total * 100 if report.total else 0
+    print(f"Warmed {report.warmed}/{report.total} responses ({coverage:.1f}%) in {report.elapsed:.1f}s")
+    for path, status in report.failures[:20]:
+        print(f"  failed: {path} ({status})")
+
+def warm_after_import(app):
+    """Post-import hook. Warms a running server when WARM_BASE_URL is set, otherwise the shared
+    RESPONSE_CACHE_DIR store; an in-process memory store would be thrown away when the script exits."""
+    base_url = os.getenv('WARM_BASE_URL')
+    if base_url:
+        # Give the server time to notice the new dataset version before it computes anything
+        time.sleep(float(os.getenv('DATASET_VERSION_TTL', 5)))
+        fetch = remote_fetcher(base_url)
+    elif os.getenv('RESPONSE_CACHE_DIR'):
+        fetch = local_fetcher(app)
+    else:
+        print("Skipping cache warm-up (set WARM_BASE_URL or RESPONSE_CACHE_DIR to enable it)")
+        return None
+
+    print("\n=== Warming response cache ===")
+    report = warm(fetch)
+    print_report(report)
+    prune_response_store(app)
+    return report
+
+def prune_response_store(app):
+    """Once the new version is warm, delete the RESPONSE_CACHE_DIR entries of earlier dataset versions.
+    Per-process memory stores age them out by themselves."""
+    store = app.extensions.get('response_store')
+    if not isinstance(store, FileResponseStore):
+        return
+    with app.app_context():
+        version = current_dataset_version()
+    removed = store.prune(version)
+    print(f"Removed {removed} cached responses from earlier dataset versions")
@@ -0,0 +1,117 @@
+#This file implements the ?weighting=students mode of the analytics routes.
+#Each performance record stores its tested-student total (the sum of the five performance level counts) and
+#proficiency/growth multiplied by that total, both computed at import, so a student-weighted average at any level
+#is SUM(weighted value) / SUM(student_count) over the same rows an unweighted AVG() would read, with no extra joins.
+
+"""
+Student-count weighting for performance averages
+"""
+
+import logging
+from sqlalchemy import and_, case, func, inspect, or_, text, update
+from . import db
+from .models import PerformanceRecords
+
+logger = logging.getLogger(__name__)
+
+# records: every row counts once (the original behaviour); students: rows count by tested students
+WEIGHTINGS = ['records', 'students']
+
+# Metric column -> column holding metric * student_count
+WEIGHTED_COLUMNS = {
+    'english_proficiency': 'weighted_proficiency',
+    'english_growth': 'weighted_growth'
+}
+
+# Columns backfill_weights() adds to databases imported before weighting existed
+WEIGHT_COLUMNS = ['student_count'] + list(WEIGHTED_COLUMNS.values())
+
+LEVEL_COUNT_COLUMNS = [f'performance_level_{level}_count' for level in range(1, 6)]
+
+def student_total(level_counts):
+    """Students tested, or None when any level count is suppressed"""
+    if any(count is None for count in level_counts):
+        return None
+    return int(sum(level_counts))
+
+def weight_columns(english_proficiency, english_growth, level_counts):
+    """The weighting columns of one performance record, as keyword arguments for PerformanceRecords"""
+    students = student_total(level_counts)
+    return {
+        'student_count': students,
+        'weighted_proficiency': english_proficiency * students if students is not None and english_proficiency is not None else None,
+        'weighted_growth': english_growth * students if students is not None and english_growth is not None else None
+    }
+
+def students_tested(metric):
+    """SUM of the students behind a weighted average of metric"""
+    weighted = getattr(PerformanceRecords, WEIGHTED_COLUMNS[metric])
+    return func.sum(case((weighted.isnot(None), PerformanceRecords.student_count)))
+
+def average(metric, weighting):
+    """AVG(metric), or its student-weighted equivalent, as a SQL expression"""
+    column = getattr(PerformanceRecords, metric)
+    if weighting != 'students':
+        return func.avg(column)
+    weighted = getattr(PerformanceRecords, WEIGHTED_COLUMNS[metric])
+    return func.sum(weighted) / func.nullif(students_tested(metric), 0)
+
+def has_value(metric, weighting):
+    """Row filter matching the rows average() reads, so groups without usable rows are dropped"""
+    if weighting != 'students':
+        return getattr(PerformanceRecords, metric).isnot(None)
+    return getattr(PerformanceRecords, WEIGHTED_COLUMNS[metric]).isnot(None)
+
+def missing_weight_columns():
+    """Weighting columns the performance_records table does not have yet"""
+    table = PerformanceRecords.__table__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        return []  # created with every column by db.create_all() / the import
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    return [name for name in WEIGHT_COLUMNS if name not in existing]
+
+def check_weight_columns():
+    """Startup check: warn when the database predates the weighting columns. Never migrates, so booting workers
+    neither race on ALTER TABLE nor block on a full-table UPDATE; scripts/build_rollups.py adds them."""
+    missing = missing_weight_columns()
+    if missing:
+        logger.warning(
+            "performance_records lacks the weighting columns %s; ?weighting=students fails until "
+            "python scripts/build_rollups.py has run", ', '.join(missing)
+        )
+    return not missing
+
+def backfill_weights():
+    """Add the weighting columns to a database imported before they existed and fill the rows that lack them.
+
+    Returns the number of columns added. When every row already holds its values (any database imported or
+    backfilled since) nothing is written.
+    """
+    table = PerformanceRecords.__table__
+    missing = missing_weight_columns()
+    with db.engine.begin() as connection:
+        for name in missing:
+            column_type = table.columns[name].type.compile(dialect=db.engine.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}'))
+
+    counts = [getattr(PerformanceRecords, column) for column in LEVEL_COUNT_COLUMNS]
+    complete = and_(*(count.isnot(None) for count in counts))
+    unfilled_students = and_(complete, PerformanceRecords.student_count.is_(None))
+    unfilled_weights = and_(PerformanceRecords.student_count.isnot(None), or_(
+        and_(PerformanceRecords.english_proficiency.isnot(None), PerformanceRecords.weighted_proficiency.is_(None)),
+        and_(PerformanceRecords.english_growth.isnot(None), PerformanceRecords.weighted_growth.is_(None))
+    ))
+    if not missing and db.session.query(PerformanceRecords.record_id).filter(
+        or_(unfilled_students, unfilled_weights)
+    ).first() is None:
+        return 0
+
+    students = sum(counts[1:], counts[0])
+    db.session.execute(update(PerformanceRecords).where(unfilled_students).values(student_count=students))
+    db.session.execute(update(PerformanceRecords).where(unfilled_weights).values(
+        weighted_proficiency=PerformanceRecords.english_proficiency * PerformanceRecords.student_count,
+        weighted_growth=PerformanceRecords.english_growth * PerformanceRecords.student_count
+    ))
+    db.session.commit()
+    return len(missing)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding of the largest API payloads with the default and orjson providers
+
+Usage:
+    python scripts/bench_json.py [repeats]
+
+Each payload is fetched once, then only the encoding step is timed.
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from project import create_website
+from project.json_provider import OrjsonProvider, orjson
+
+PAYLOADS = [
+    '/api/performance?limit=5000',
+    '/api/performance?limit=5000&format=rows',
+    '/api/schools',
+    '/api/districts',
+    '/api/map/districts',
+    '/api/books?limit=500'
+]
+
+
+def best_time(encode, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encode()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(repeats=20):
+    """Time DefaultJSONProvider.dumps() against OrjsonProvider.dumps_bytes() on real responses"""
+    if orjson is None:
+        print("orjson is not installed; nothing to compare")
+        return
+
+    app = create_website()
+    client = app.test_client()
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+
+    print(f"{'payload':<44}{'bytes':>10}{'default ms':>12}{'orjson ms':>11}{'speedup':>9}")
+
+    for path in PAYLOADS:
+        payload = client.get(path).get_json()
+
+        # Row-format payloads arrive as lists; encode them as tuples, the way the route does
+        if isinstance(payload, dict) and 'columns' in payload:
+            payload['data'] = [tuple(row) for row in payload['data']]
+
+        size = len(orjson_provider.dumps_bytes(payload))
+        default_time = best_time(lambda: default_provider.dumps(payload, separators=(',', ':')), repeats)
+        orjson_time = best_time(lambda: orjson_provider.dumps_bytes(payload), repeats)
+
+        print(f"{path:<44}{size:>10,}{default_time * 1000:>12.2f}{orjson_time * 1000:>11.2f}{default_time / orjson_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
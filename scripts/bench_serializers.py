@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark the projections the API routes serve against building the same output from ORM objects
+
+Usage:
+    python scripts/bench_serializers.py [repeats]
+
+Runs against the configured database and prints rows/sec for both paths per resource. The ORM path loads the
+base model and every joined model as objects and reads the output fields off them, as the routes did before
+they used projections; both paths produce identical dicts.
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project import create_website, db
+from project.serializers import PERFORMANCE_API, TEACHER_QUALITY_API, NAEP_API, BOOK_API
+
+RESOURCES = [
+    ('/api/performance', PERFORMANCE_API),
+    ('/api/teacher-quality', TEACHER_QUALITY_API[None]),
+    ('/api/naep', NAEP_API[None]),
+    ('/api/books', BOOK_API)
+]
+
+
+def orm_rows(projection):
+    """The projection's output, built from ORM objects loaded through the same joins"""
+    models = [projection.base] + [target for target, _, _ in projection.joins]
+    query = db.session.query(*models)
+    for target, onclause, outer in projection.joins:
+        query = query.join(target, onclause, isouter=outer)
+
+    fields = [(models.index(column.class_), column.key) for column in projection.columns]
+    result = []
+    for entities in query:
+        entities = entities if len(models) > 1 else (entities,)
+        row = tuple(
+            getattr(entities[index], name) if entities[index] is not None else None for index, name in fields
+        )
+        result.append(projection.shape(row))
+    return result
+
+
+def time_path(serialize, repeats):
+    """Best-of-N wall time for one serialization path, starting each run with an empty session"""
+    best = None
+    rows = 0
+    for _ in range(repeats):
+        db.session.remove()
+        start = time.perf_counter()
+        rows = len(serialize())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows, best
+
+
+def run_benchmark(repeats=3):
+    """Compare rows/sec of ORM objects + dict building with Projection.rows() for each route's projection"""
+    app = create_website()
+
+    with app.app_context():
+        print(f"{'resource':<22}{'rows':>8}{'orm rows/s':>14}{'projected rows/s':>18}{'speedup':>10}")
+
+        for name, projection in RESOURCES:
+            orm_count, orm_time = time_path(lambda: orm_rows(projection), repeats)
+            projected_count, projected_time = time_path(lambda: projection.rows(projection.query()), repeats)
+
+            if not orm_count:
+                print(f"{name:<22}{0:>8}{'-':>14}{'-':>18}{'-':>10}")
+                continue
+
+            orm_rate = orm_count / orm_time
+            projected_rate = projected_count / projected_time
+            print(f"{name:<22}{orm_count:>8}{orm_rate:>14,.0f}{projected_rate:>18,.0f}{projected_rate / orm_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
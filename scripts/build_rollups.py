@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Rebuild the precomputed rollup tables from the performance data already in the database
+
+Usage:
+    python scripts/build_rollups.py
+
+import_data.py does this automatically; run it by hand after changing rollup definitions.
+It also adds and fills the student-weighting columns on databases imported before they existed (once; later
+runs find them filled and skip the UPDATE).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project import create_website
+from project.rollups import build_all_rollups
+from project.weighting import backfill_weights
+from project.versioning import bump_dataset_version
+from project.warmup import warm_after_import
+
+
+def main():
+    """Rebuild every rollup, then let running web processes know the data changed"""
+    print("Building rollups...")
+
+    # Always write to the primary, even if SNAPSHOT_PATH is set in the environment
+    app = create_website(use_snapshot=False)
+
+    with app.app_context():
+        if backfill_weights():
+            print("Added and filled the student-weighting columns")
+        counts = build_all_rollups()
+        version = bump_dataset_version()
+
+        print("\n=== Rollup Summary ===")
+        for table, count in counts.items():
+            print(f"{table}: {count}")
+        print(f"Dataset version: {version}")
+
+        print("\nRollup build completed successfully!")
+
+        warm_after_import(app)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Export the database into a read-only SQLite snapshot for serving without MySQL
+
+Usage:
+    python scripts/export_snapshot.py [output_path]
+
+Serve it with SNAPSHOT_PATH=<output_path> python website.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project import create_website, db
+from project.snapshot import export_snapshot
+
+DEFAULT_SNAPSHOT_PATH = './data/literacy_snapshot.sqlite'
+
+
+def main(path):
+    """Export every table from the primary database into a snapshot file"""
+    print(f"Exporting snapshot to {path}...")
+
+    # Always read from the primary, even if SNAPSHOT_PATH is set in the environment
+    app = create_website(use_snapshot=False)
+
+    with app.app_context():
+        counts = export_snapshot(db.engine, db.metadata, path)
+
+    print("\n=== Snapshot Summary ===")
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"Size: {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+    print("\nSnapshot export completed successfully!")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else os.getenv('SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH))
@@ -12,6 +12,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
 from project import create_website, db
+from project.versioning import bump_dataset_version
+from project.warmup import warm_after_import
 from project.models import Books
 
 
@@ -51,8 +53,8 @@ def import_books():
         df = pd.read_excel('./data/book_reco/Book_Recs.xls')
         print(f"Loaded {len(df)} books from Excel file")
         
-        # Create Flask app context
-        app = create_website()
+        # Create Flask app context on the primary, even if SNAPSHOT_PATH is set in the environment
+        app = create_website(use_snapshot=False)
         
         with app.app_context():
             # Create books table if it doesn't exist
@@ -123,6 +125,9 @@ def import_books():
             # Final commit
             db.session.commit()
             
+            # Let running web processes know the data changed
+            bump_dataset_version()
+            
             # Print import summary
             print(f"\n=== Book Import Summary ===")
             print(f"Books successfully imported: {books_imported}")
@@ -146,6 +151,9 @@ def import_books():
                 print(f"{grade}: {count} books")
             
             print(f"\nBook import completed successfully!")
+
+            # Precompute the hot API responses for the new data
+            warm_after_import(app)
             
     except Exception as e:
         print(f"Error during book import: {e}")
@@ -5,6 +5,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
 from project import create_website, db
+from project.versioning import bump_dataset_version
+from project.warmup import warm_after_import
+from project.partitioning import apply_year_partitioning
+from project.rollups import build_all_rollups
+from project.weighting import weight_columns
 from project.models import (
     Locations, Districts, Schools, DemographicGroups, 
     AcademicYears, PerformanceRecords, TeacherQuality, NAEPAssessments
@@ -69,8 +74,8 @@ def import_data():
     df = pd.read_csv('./data/Mississippi_Literacy_Dataset.csv')
     print(f"Loaded {len(df)} records from CSV")
     
-    # Create Flask app context
-    app = create_website()
+    # Create Flask app context on the primary, even if SNAPSHOT_PATH is set in the environment
+    app = create_website(use_snapshot=False)
     
     with app.app_context():
         # Clear existing data
@@ -87,6 +92,11 @@ def import_data():
                 db.session.add(year_obj)
         db.session.commit()
         
+        # Partition the fact tables by year before any facts are loaded (MySQL, opt-in)
+        year_map = {year.school_year: year.year_id for year in AcademicYears.query.all()}
+        if apply_year_partitioning(db.engine, year_map):
+            print(f"Partitioned fact tables by year: {sorted(year_map)}")
+        
         # Import Locations (County/City/ZIP combinations)
         print("Importing locations...")
         location_combinations = df[['County', 'City', 'ZIP']].dropna().drop_duplicates()
@@ -180,7 +190,6 @@ def import_data():
         
         # Import Performance Records
         print("Importing performance records...")
-        year_map = {year.school_year: year.year_id for year in AcademicYears.query.all()}
         
         performance_columns = [
             'English Proficiency', 'English Growth', 'English Growth Lowest 25%',
@@ -202,25 +211,33 @@ def import_data():
                     row['Subgroup'] in group_map and 
                     int(row['School_Year']) in year_map):
                     
+                    english_proficiency = parse_percentage(row.get('English Proficiency'))
+                    english_growth = parse_percentage(row.get('English Growth'))
+                    level_counts = [
+                        clean_numeric_value(row.get(f'English Performance Students Level {level}'))
+                        for level in range(1, 6)
+                    ]
+                    
                     record = PerformanceRecords(
                         school_id=school_map[school_key],
                         group_id=group_map[row['Subgroup']],
                         year_id=year_map[int(row['School_Year'])],
                         grade_level=str(row['Grade']).strip() if pd.notna(row['Grade']) else None,
-                        english_proficiency=parse_percentage(row.get('English Proficiency')),
-                        english_growth=parse_percentage(row.get('English Growth')),
+                        english_proficiency=english_proficiency,
+                        english_growth=english_growth,
                         english_growth_lowest_25=parse_percentage(row.get('English Growth Lowest 25%')),
                         performance_level_1_pct=parse_percentage(row.get('English Performance Level 1')),
-                        performance_level_1_count=clean_numeric_value(row.get('English Performance Students Level 1')),
+                        performance_level_1_count=level_counts[0],
                         performance_level_2_pct=parse_percentage(row.get('English Performance Level 2')),
-                        performance_level_2_count=clean_numeric_value(row.get('English Performance Students Level 2')),
+                        performance_level_2_count=level_counts[1],
                         performance_level_3_pct=parse_percentage(row.get('English Performance Level 3')),
-                        performance_level_3_count=clean_numeric_value(row.get('English Performance Students Level 3')),
+                        performance_level_3_count=level_counts[2],
                         performance_level_4_pct=parse_percentage(row.get('English Performance Level 4')),
-                        performance_level_4_count=clean_numeric_value(row.get('English Performance Students Level 4')),
+                        performance_level_4_count=level_counts[3],
                         performance_level_5_pct=parse_percentage(row.get('English Performance Level 5')),
-                        performance_level_5_count=clean_numeric_value(row.get('English Performance Students Level 5')),
-                        chronic_absenteeism_pct=parse_percentage(row.get('% Chronic Absenteeism'))
+                        performance_level_5_count=level_counts[4],
+                        chronic_absenteeism_pct=parse_percentage(row.get('% Chronic Absenteeism')),
+                        **weight_columns(english_proficiency, english_growth, level_counts)
                     )
                     db.session.add(record)
             except Exception as e:
@@ -321,6 +338,15 @@ def import_data():
         
         db.session.commit()
         
+        # Precompute the analytics rollups from the imported facts
+        print("Building rollups...")
+        for table, count in build_all_rollups().items():
+            print(f"{table}: {count}")
+        
+        # Let running web processes know the data changed
+        version = bump_dataset_version()
+        print(f"Dataset version: {version}")
+        
         # Print import summary
         print("\n=== Import Summary ===")
         print(f"Locations: {Locations.query.count()}")
@@ -334,5 +360,8 @@ def import_data():
         
         print("\nData import completed successfully!")
 
+        # Precompute the hot API responses for the new data
+        warm_after_import(app)
+
 if __name__ == "__main__":
     import_data()
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+List, archive or drop yearly partitions of the fact tables
+
+Usage:
+    python scripts/manage_partitions.py list
+    python scripts/manage_partitions.py archive 2021
+    python scripts/manage_partitions.py drop 2021
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project import create_website, db
+from project.partitioning import FACT_TABLES, get_partitions, archive_year_partition, drop_year_partition
+
+
+def manage_partitions(command, school_year=None):
+    """Run a partition maintenance command against the configured database"""
+    # Always read and write the primary, even if SNAPSHOT_PATH is set in the environment
+    app = create_website(use_snapshot=False)
+
+    with app.app_context():
+        if db.engine.dialect.name != 'mysql':
+            print("Year partitioning is only available on MySQL")
+            return
+
+        if command == 'list':
+            with db.engine.connect() as connection:
+                for table in FACT_TABLES:
+                    partitions = get_partitions(connection, table)
+                    if partitions:
+                        print(f"{table}: {', '.join(sorted(partitions))}")
+                    else:
+                        print(f"{table}: not partitioned")
+
+        elif command == 'archive':
+            archived = archive_year_partition(db.engine, school_year)
+            print(f"Archived {school_year} into: {', '.join(archived) if archived else 'nothing (no partition found)'}")
+
+        elif command == 'drop':
+            dropped = drop_year_partition(db.engine, school_year)
+            print(f"Dropped {school_year} from: {', '.join(dropped) if dropped else 'nothing (no partition found)'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('list', 'archive', 'drop') or \
+            (sys.argv[1] != 'list' and len(sys.argv) < 3):
+        print(__doc__)
+        sys.exit(1)
+
+    manage_partitions(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None)
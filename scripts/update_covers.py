@@ -9,6 +9,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pandas as pd
 from project import create_website, db
+from project.versioning import bump_dataset_version
+from project.warmup import warm_after_import
 from project.models import Books
 
 
@@ -21,8 +23,8 @@ def update_book_covers():
         df = pd.read_excel('./data/book_reco/Book_Recs.xls')
         print(f"Loaded {len(df)} books from Excel file")
         
-        # Create Flask app context
-        app = create_website()
+        # Create Flask app context on the primary, even if SNAPSHOT_PATH is set in the environment
+        app = create_website(use_snapshot=False)
         
         with app.app_context():
             books_updated = 0
@@ -64,6 +66,9 @@ def update_book_covers():
             # Final commit
             db.session.commit()
             
+            # Let running web processes know the data changed
+            bump_dataset_version()
+            
             print(f"\n=== Book Cover Update Summary ===")
             print(f"Books updated with cover URLs: {books_updated}")
             print(f"Books not found in database: {books_not_found}")
@@ -76,6 +81,9 @@ def update_book_covers():
                 print(f"- {book.title} by {book.author}: {cover_preview}")
             
             print(f"\nBook cover update completed successfully!")
+
+            # Precompute the hot API responses for the new data
+            warm_after_import(app)
             
     except Exception as e:
         print(f"Error during book cover update: {e}")
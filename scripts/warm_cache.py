@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Precompute the hot API responses (every county, district and filter list the dashboard and map request)
+
+Usage:
+    python scripts/warm_cache.py                          # fill RESPONSE_CACHE_DIR through the app in this process
+    python scripts/warm_cache.py http://localhost:5000    # warm a running server's own response store
+
+The import scripts run the same warm-up automatically when WARM_BASE_URL or RESPONSE_CACHE_DIR is set.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project import create_website
+from project.warmup import warm, local_fetcher, remote_fetcher, print_report
+
+
+def warm_cache(base_url=None):
+    """Warm a remote server when a base URL is given, otherwise the response store configured for this app"""
+    base_url = base_url or os.getenv('WARM_BASE_URL')
+
+    if base_url:
+        print(f"Warming {base_url} ...")
+        report = warm(remote_fetcher(base_url))
+    else:
+        if not os.getenv('RESPONSE_CACHE_DIR'):
+            print("Note: RESPONSE_CACHE_DIR is not set, so responses are only cached for this process")
+        report = warm(local_fetcher(create_website()))
+
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    warm_cache(sys.argv[1] if len(sys.argv) > 1 else None)